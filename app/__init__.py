@@ -1,11 +1,140 @@
-from flask import Flask
+import os
+
+def create_app(config=None):
+    # Flask só é importado aqui: os modos agente e CLI não pagam o custo (~0,2 s)
+    from flask import Flask
 
-def create_app():
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'dev-secret-key-taskmonitor-pro-2'
-    
+    app.config['COLETOR_ATIVO'] = True
+    app.config['COLETOR_INTERVALO'] = 1.0
+    # Amostragem adaptativa: rajada com alguém no dashboard ou métrica mudando
+    # rápido, recuo até o máximo com o host ocioso; False mantém o intervalo fixo
+    app.config['COLETOR_ADAPTATIVO'] = True
+    app.config['COLETOR_INTERVALO_RAJADA'] = 0.25
+    app.config['COLETOR_INTERVALO_MAXIMO'] = 5.0
+    # Agendas das partes caras ({'processos': 2.0, 'sensores': 5.0, ...}); None usa as padrão
+    app.config['COLETOR_INTERVALOS_LENTOS'] = None
+    # "host:porta" do processo coletor (modo multi-worker); None coleta neste processo
+    app.config['COLETOR_REMOTO'] = None
+    # PID do supervisor (modo multi-worker): sua árvore nunca é encerrada pelo /encerrar
+    app.config['SUPERVISOR_PID'] = None
+    app.config['IP_PUBLICO_URL'] = os.environ.get('TASKMONITOR_IP_PUBLICO_URL', 'https://api.ipify.org')
+    app.config['IP_PUBLICO_TTL'] = 300.0
+    app.config['METRICAS_ATIVO'] = True
+    app.config['METRICAS_DB'] = 'database/tarefas.db'
+    # Intervalo em segundos ou expressão cron ("0 * * * *"); None desativa a agenda
+    app.config['BACKUP_AGENDA'] = 3600
+    # Histórico por processo: top-K por CPU e por memória a cada tick (0 desativa)
+    app.config['PROCESSOS_HISTORICO_TOP'] = 10
+    app.config['PROCESSOS_HISTORICO_JANELA'] = 3600
+    # Alertas: None usa as regras padrão (app/alertas.py)
+    app.config['ALERTAS_ATIVO'] = True
+    app.config['ALERTAS_REGRAS'] = None
+    # Hub: recebe lotes de agentes (python -m app agente --hub URL); token opcional
+    app.config['HUB_ATIVO'] = False
+    app.config['HUB_TOKEN'] = os.environ.get('TASKMONITOR_HUB_TOKEN')
+    app.config['HUB_TEMPO_OFFLINE'] = 60.0
+    # Histogramas de rotas/coletores (/debug/perf); False desliga os cronômetros
+    app.config['INSTRUMENTACAO_ATIVA'] = True
+    # Conexões simultâneas em /stream (no modo multi-worker com waitress, derivado de --threads)
+    app.config['STREAM_MAX_ASSINANTES'] = 100
+    app.config['BACKUP_RETENCAO'] = {'manter_ultimos': 24, 'por_hora': 24, 'por_dia': 7, 'por_semana': 4}
+    if config:
+        app.config.update(config)
+
+    from .instrumentacao import get_instrumentacao
+    get_instrumentacao().ativa = app.config['INSTRUMENTACAO_ATIVA']
+
+    if app.config['SUPERVISOR_PID']:
+        from .monitor import definir_supervisor
+        definir_supervisor(app.config['SUPERVISOR_PID'])
+
     # Registra apenas o blueprint principal (que já tem todas as rotas)
     from .routes import main
     app.register_blueprint(main)
-    
+
+    # IP público resolvido em segundo plano e servido do cache
+    from .ip_publico import configurar_resolvedor
+    resolvedor = configurar_resolvedor(app.config['IP_PUBLICO_URL'], app.config['IP_PUBLICO_TTL'])
+    if app.config['IP_PUBLICO_URL']:
+        resolvedor.atualizar_em_segundo_plano()
+
+    coletor = None
+    if app.config['COLETOR_REMOTO']:
+        # Worker (modo multi-worker): recebe snapshots do processo coletor e só
+        # lê o histórico; backups são pedidos ao coletor, o único que grava o log
+        from .agendador_backup import definir_agendador
+        from .coletor import definir_coletor, get_coletor
+        from .compartilhado import ColetorRemoto, AgendadorRemoto
+        from .processos import get_tabela
+        host, porta = app.config['COLETOR_REMOTO'].rsplit(':', 1)
+        # Só o processo coletor percorre os processos; o worker espera a tabela dele
+        get_tabela().remota = True
+        if not isinstance(get_coletor(), ColetorRemoto):
+            definir_coletor(ColetorRemoto(host, int(porta))).start()
+        definir_agendador(AgendadorRemoto(host, int(porta)))
+        if app.config['PROCESSOS_HISTORICO_TOP']:
+            from .historico_processos import definir_historico
+            from .compartilhado import HistoricoRemoto
+            definir_historico(HistoricoRemoto(host, int(porta)))
+        coletor = get_coletor()
+        if app.config['METRICAS_ATIVO']:
+            from .metricas import abrir_armazem
+            abrir_armazem(app.config['METRICAS_DB'])
+        if app.config['HUB_ATIVO']:
+            from .frota import definir_frota
+            from .compartilhado import FrotaRemota
+            definir_frota(FrotaRemota(host, int(porta)))
+    else:
+        # Backups agendados e POST /backup executados por uma thread de trabalho
+        from .agendador_backup import iniciar_agendador, PoliticaRetencao
+        retencao = app.config['BACKUP_RETENCAO']
+        iniciar_agendador(app.config['BACKUP_AGENDA'], PoliticaRetencao(**retencao) if retencao else None)
+
+        if app.config['COLETOR_ATIVO']:
+            # Coletor em segundo plano: as rotas leem o snapshot em vez de chamar o psutil
+            from .coletor import iniciar_coletor
+            coletor = iniciar_coletor(app.config['COLETOR_INTERVALO'],
+                                      adaptativo=app.config['COLETOR_ADAPTATIVO'],
+                                      intervalos_lentos=app.config['COLETOR_INTERVALOS_LENTOS'],
+                                      intervalo_rajada=app.config['COLETOR_INTERVALO_RAJADA'],
+                                      intervalo_maximo=app.config['COLETOR_INTERVALO_MAXIMO'])
+
+            # Histórico de métricas no SQLite, alimentado pelo coletor
+            if app.config['METRICAS_ATIVO']:
+                from .metricas import iniciar_armazem
+                armazem = iniciar_armazem(app.config['METRICAS_DB'])
+                coletor.assinar(armazem.registrar_snapshot)
+
+            # Séries por processo dos maiores consumidores
+            if app.config['PROCESSOS_HISTORICO_TOP']:
+                from .historico_processos import iniciar_historico
+                historico = iniciar_historico(top=app.config['PROCESSOS_HISTORICO_TOP'],
+                                              janela=app.config['PROCESSOS_HISTORICO_JANELA'],
+                                              intervalo=coletor.agenda.intervalos['processos'])
+                coletor.assinar(historico.registrar_snapshot)
+
+            # Regras de alerta avaliadas a cada snapshot (antes do /stream,
+            # que publica os alertas ativos junto com o estado)
+            if app.config['ALERTAS_ATIVO']:
+                from .alertas import iniciar_motor
+                caminho = app.config['METRICAS_DB'] if app.config['METRICAS_ATIVO'] else None
+                motor = iniciar_motor(app.config['ALERTAS_REGRAS'], caminho)
+                coletor.assinar(motor.registrar_snapshot)
+
+        # Hub de agentes: séries por host no mesmo armazém de métricas
+        if app.config['HUB_ATIVO']:
+            from .frota import iniciar_frota
+            if app.config['METRICAS_ATIVO']:
+                from .metricas import iniciar_armazem
+                iniciar_armazem(app.config['METRICAS_DB'])
+            iniciar_frota(tempo_offline=app.config['HUB_TEMPO_OFFLINE'])
+
+    # Push para o dashboard (/stream)
+    from .stream import get_difusor
+    get_difusor().max_assinantes = app.config['STREAM_MAX_ASSINANTES']
+    if coletor is not None:
+        coletor.assinar(get_difusor().publicar_snapshot)
+
     return app
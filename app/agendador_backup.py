@@ -0,0 +1,258 @@
+import collections
+import datetime
+import queue
+import threading
+import time
+import uuid
+from .backup_new import criar_backup_novo
+from .registro_backup import get_log
+
+
+class Cron:
+    """Expressão cron de 5 campos (minuto hora dia mês dia-da-semana).
+
+    Suporta `*`, `*/n`, `a-b`, `a-b/n` e listas separadas por vírgula.
+    Dia da semana: 0 = domingo. Como no cron padrão, quando dia e dia da
+    semana são ambos restritos basta um deles casar (`0 0 1 * 1` roda no
+    dia 1 e em toda segunda).
+    """
+
+    LIMITES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+    # Busca até 8 anos: cobre 29/02 mesmo na virada de século sem bissexto
+    ANOS_BUSCA = 8
+
+    def __init__(self, expressao):
+        campos = expressao.split()
+        if len(campos) != 5:
+            raise ValueError(f'Expressão cron inválida: {expressao!r}')
+        self.expressao = expressao
+        self.campos = [self._interpretar(c, *lim) for c, lim in zip(campos, self.LIMITES)]
+        self._dia_ou_semana = not campos[2].startswith('*') and not campos[4].startswith('*')
+
+    @staticmethod
+    def _interpretar(campo, minimo, maximo):
+        valores = set()
+        for parte in campo.split(','):
+            passo = 1
+            if '/' in parte:
+                parte, passo = parte.split('/')
+                passo = int(passo)
+            if parte == '*':
+                inicio, fim = minimo, maximo
+            elif '-' in parte:
+                inicio, fim = (int(v) for v in parte.split('-'))
+            else:
+                inicio = fim = int(parte)
+            if inicio < minimo or fim > maximo:
+                raise ValueError(f'Valor fora do intervalo {minimo}-{maximo}: {campo!r}')
+            valores.update(range(inicio, fim + 1, passo))
+        return valores
+
+    def _dia_casa(self, t):
+        _, _, dias, meses, semana = self.campos
+        if t.month not in meses:
+            return False
+        no_dia, na_semana = t.day in dias, (t.isoweekday() % 7) in semana
+        return no_dia or na_semana if self._dia_ou_semana else no_dia and na_semana
+
+    def proxima(self, depois):
+        """Próximo horário (datetime) estritamente posterior a `depois`"""
+        minutos, horas = self.campos[:2]
+        t = depois.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limite = t + datetime.timedelta(days=366 * self.ANOS_BUSCA)
+        while t < limite:
+            # Pula dias e horas inteiros que não casam em vez de andar minuto a minuto
+            if not self._dia_casa(t):
+                t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif t.hour not in horas:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+            elif t.minute not in minutos:
+                t += datetime.timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f'Expressão cron sem ocorrência: {self.expressao!r}')
+
+
+class PoliticaRetencao:
+    """Quais backups manter: os N últimos e um por hora/dia/semana (o mais recente de cada)"""
+
+    def __init__(self, manter_ultimos=24, por_hora=24, por_dia=7, por_semana=4):
+        self.manter_ultimos = manter_ultimos
+        self.por_hora = por_hora
+        self.por_dia = por_dia
+        self.por_semana = por_semana
+
+    def selecionar(self, itens):
+        """`itens`: [(ts, chave), ...]. Retorna o conjunto de chaves mantidas."""
+        ordenados = sorted(itens, reverse=True)
+        manter = {chave for _, chave in ordenados[:self.manter_ultimos]}
+        regras = (
+            (self.por_hora, lambda d: (d.year, d.month, d.day, d.hour)),
+            (self.por_dia, lambda d: (d.year, d.month, d.day)),
+            (self.por_semana, lambda d: d.isocalendar()[:2])
+        )
+        for quantidade, bucket in regras:
+            vistos = set()
+            for ts, chave in ordenados:
+                if len(vistos) >= quantidade:
+                    break
+                b = bucket(datetime.datetime.fromtimestamp(ts))
+                if b not in vistos:
+                    vistos.add(b)
+                    manter.add(chave)
+        return manter
+
+
+class AgendadorBackup:
+    """Executa backups em uma thread de trabalho com fila limitada.
+
+    Backups agendados (intervalo em segundos ou expressão cron) e os pedidos
+    via `POST /backup` entram na mesma fila; cada tarefa recebe um id para
+    consulta do status. Após cada backup agendado a política de retenção
+    é aplicada ao log.
+    """
+
+    def __init__(self, agenda=None, retencao=None, tamanho_fila=4, historico=100):
+        self.cron = Cron(agenda) if isinstance(agenda, str) else None
+        if self.cron is not None:
+            # `0 0 31 2 *` é sintaticamente válida: falha aqui, na partida, e não na thread da agenda
+            self.cron.proxima(datetime.datetime.now())
+        self.intervalo = agenda if isinstance(agenda, (int, float)) else None
+        self.retencao = retencao
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._tarefas = collections.OrderedDict()
+        self._historico = historico
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._threads = []
+
+    # --- tarefas -------------------------------------------------------
+
+    def enviar(self, origem='manual'):
+        """Enfileira um backup. Retorna o dict da tarefa ou None se a fila estiver cheia."""
+        tarefa = {
+            'id': uuid.uuid4().hex[:12],
+            'origem': origem,
+            'status': 'pendente',
+            'criado_em': time.time(),
+            'iniciado_em': None,
+            'concluido_em': None,
+            'resultado': None
+        }
+        try:
+            self._fila.put_nowait(tarefa['id'])
+        except queue.Full:
+            return None
+        with self._lock:
+            self._tarefas[tarefa['id']] = tarefa
+            while len(self._tarefas) > self._historico:
+                self._tarefas.popitem(last=False)
+        return dict(tarefa)
+
+    def status(self, tarefa_id):
+        with self._lock:
+            tarefa = self._tarefas.get(tarefa_id)
+            return dict(tarefa) if tarefa else None
+
+    def executar(self):
+        """Backup síncrono (GET /backup), fora da fila"""
+        return criar_backup_novo()
+
+    def _atualizar(self, tarefa_id, **campos):
+        with self._lock:
+            if tarefa_id in self._tarefas:
+                self._tarefas[tarefa_id].update(campos)
+
+    def _trabalhar(self):
+        while not self._parar.is_set():
+            try:
+                tarefa_id = self._fila.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._atualizar(tarefa_id, status='executando', iniciado_em=time.time())
+            resultado = criar_backup_novo()
+            status = 'concluido' if resultado.startswith('✅') else 'erro'
+            self._atualizar(tarefa_id, status=status, resultado=resultado, concluido_em=time.time())
+
+            tarefa = self.status(tarefa_id)
+            if tarefa and tarefa['origem'] == 'agendado' and self.retencao is not None:
+                try:
+                    removidos = self.podar()
+                    if removidos:
+                        print(f"[INFO] Retenção de backups: {removidos} registro(s) removido(s)")
+                except Exception as e:
+                    print(f"❌ Erro ao aplicar retenção de backups: {e}")
+
+    def podar(self):
+        """Aplica a política de retenção ao log de backups.
+
+        Os backups antigos importados ficam de fora: são o histórico que a
+        exportação precisa e seus originais já foram movidos.
+        """
+        log = get_log()
+        itens = []
+        preservados = set()
+        for segmento in log.segmentos():
+            legado = log.legado(segmento)
+            for ts, offset, _ in log.indice(segmento):
+                if legado:
+                    preservados.add((segmento, offset))
+                else:
+                    itens.append((ts, (segmento, offset)))
+        return log.podar(self.retencao.selecionar(itens) | preservados)
+
+    # --- agenda --------------------------------------------------------
+
+    def _proxima_execucao(self, agora):
+        if self.cron is not None:
+            proxima = self.cron.proxima(datetime.datetime.fromtimestamp(agora))
+            return proxima.timestamp()
+        return agora + self.intervalo
+
+    def _agendar(self):
+        proxima = self._proxima_segura()
+        while not self._parar.wait(max(0.0, proxima - time.time())):
+            if self.enviar('agendado') is None:
+                print("[INFO] Backup agendado ignorado: fila de backups cheia")
+            proxima = self._proxima_segura()
+
+    def _proxima_segura(self):
+        """Como _proxima_execucao, mas um erro não derruba a thread da agenda: tenta de novo em 1 min"""
+        agora = time.time()
+        try:
+            return self._proxima_execucao(agora)
+        except Exception as e:
+            print(f"❌ Erro ao calcular o próximo backup agendado: {e}")
+            return agora + 60
+
+    def iniciar(self):
+        self._threads = [threading.Thread(target=self._trabalhar, name='taskmonitor-backup', daemon=True)]
+        if self.cron is not None or self.intervalo:
+            self._threads.append(threading.Thread(target=self._agendar, name='taskmonitor-agenda', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+
+_agendador = None
+
+
+def iniciar_agendador(agenda=None, retencao=None):
+    global _agendador
+    if _agendador is None:
+        _agendador = AgendadorBackup(agenda, retencao).iniciar()
+    return _agendador
+
+
+def definir_agendador(agendador):
+    """Instala outro agendador (ex.: AgendadorRemoto nos workers)"""
+    global _agendador
+    _agendador = agendador
+    return agendador
+
+
+def get_agendador():
+    return _agendador
@@ -0,0 +1,322 @@
+import collections
+import operator
+import sqlite3
+import threading
+import time
+import uuid
+from .metricas import conectar, extrair_metricas
+
+# Regras padrão (sobrescritas por app.config['ALERTAS_REGRAS'])
+REGRAS_PADRAO = [
+    {'nome': 'cpu_alta', 'metrica': 'cpu', 'limite': 90, 'janela': 30, 'duracao': 60, 'histerese': 10},
+    {'nome': 'memoria_alta', 'metrica': 'memoria', 'limite': 85, 'duracao': 30, 'histerese': 5},
+    {'nome': 'disco_cheio', 'metrica': 'disco', 'limite': 80, 'histerese': 2, 'severidade': 'critico'},
+    # Memória subindo mais de 0,5 ponto percentual por segundo ao longo de 1 minuto
+    {'nome': 'memoria_subindo', 'metrica': 'memoria', 'tipo': 'taxa', 'limite': 0.5, 'janela': 60, 'histerese': 0.3}
+]
+
+OPERADORES = {'>': operator.gt, '<': operator.lt}
+AGREGACOES = ('ultimo', 'media', 'maximo', 'minimo')
+
+
+def criar_tabela_alertas(conn):
+    """Cria a tabela de eventos de alerta (idempotente)"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS alertas_eventos (
+        id TEXT PRIMARY KEY,
+        ts REAL NOT NULL,
+        regra TEXT NOT NULL,
+        metrica TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        valor REAL NOT NULL,
+        limite REAL NOT NULL,
+        severidade TEXT NOT NULL,
+        mensagem TEXT NOT NULL
+    )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_alertas_eventos_ts ON alertas_eventos (ts)')
+    conn.commit()
+
+
+class JanelaDeslizante:
+    """Agregados de uma janela de tempo atualizados em O(1) (amortizado) por amostra.
+
+    A soma é mantida de forma incremental; máximo e mínimo usam deques
+    monotônicos, então nenhum agregado percorre a janela inteira.
+    """
+
+    def __init__(self, segundos):
+        self.segundos = segundos
+        self._amostras = collections.deque()
+        self._maximos = collections.deque()
+        self._minimos = collections.deque()
+        self._soma = 0.0
+
+    def adicionar(self, ts, valor):
+        self._amostras.append((ts, valor))
+        self._soma += valor
+        while self._maximos and self._maximos[-1][1] <= valor:
+            self._maximos.pop()
+        self._maximos.append((ts, valor))
+        while self._minimos and self._minimos[-1][1] >= valor:
+            self._minimos.pop()
+        self._minimos.append((ts, valor))
+
+        corte = ts - self.segundos
+        while self._amostras[0][0] < corte:
+            self._soma -= self._amostras.popleft()[1]
+        while self._maximos[0][0] < corte:
+            self._maximos.popleft()
+        while self._minimos[0][0] < corte:
+            self._minimos.popleft()
+
+    def __len__(self):
+        return len(self._amostras)
+
+    def ultimo(self):
+        return self._amostras[-1][1]
+
+    def media(self):
+        return self._soma / len(self._amostras)
+
+    def maximo(self):
+        return self._maximos[0][1]
+
+    def minimo(self):
+        return self._minimos[0][1]
+
+    def taxa(self):
+        """Variação por segundo entre a amostra mais antiga e a mais recente da janela"""
+        (t0, v0), (t1, v1) = self._amostras[0], self._amostras[-1]
+        return (v1 - v0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def cobertura(self):
+        """Quantos segundos a janela já cobre"""
+        return self._amostras[-1][0] - self._amostras[0][0]
+
+
+class Regra:
+    """Regra de alerta sobre uma métrica.
+
+    - tipo `limite`: compara o agregado da janela (`ultimo`, `media`,
+      `maximo` ou `minimo`) com o limite;
+    - tipo `taxa`: compara a variação por segundo ao longo da janela.
+
+    A condição precisa valer por `duracao` segundos seguidos para disparar.
+    Com histerese, o alerta só é resolvido quando o valor volta para além
+    de `limite - histerese` (ou `limite + histerese` para o operador `<`),
+    evitando disparos em sequência com o valor oscilando no limite.
+    """
+
+    def __init__(self, nome, metrica, limite, operador='>', tipo='limite', janela=0,
+                 agregacao='media', duracao=0, histerese=0.0, severidade='aviso'):
+        if operador not in OPERADORES:
+            raise ValueError(f'Operador inválido: {operador!r}')
+        if tipo not in ('limite', 'taxa'):
+            raise ValueError(f'Tipo de regra inválido: {tipo!r}')
+        if agregacao not in AGREGACOES:
+            raise ValueError(f'Agregação inválida: {agregacao!r}')
+        if tipo == 'taxa' and not janela:
+            raise ValueError(f'Regra {nome!r}: tipo "taxa" exige janela')
+        self.nome = nome
+        self.metrica = metrica
+        self.limite = limite
+        self.operador = operador
+        self.tipo = tipo
+        self.janela = janela
+        self.agregacao = agregacao if janela else 'ultimo'
+        self.duracao = duracao
+        self.histerese = histerese
+        self.severidade = severidade
+        sinal = -1 if operador == '>' else 1
+        self.limite_resolucao = limite + sinal * histerese
+
+        self.disparado = False
+        self._pendente_desde = None
+
+    def valor(self, janela):
+        if self.tipo == 'taxa':
+            return janela.taxa()
+        return getattr(janela, self.agregacao)()
+
+    def avaliar(self, ts, valor):
+        """Atualiza o estado com o valor atual; retorna 'disparado', 'resolvido' ou None"""
+        comparar = OPERADORES[self.operador]
+        if not self.disparado:
+            if not comparar(valor, self.limite):
+                self._pendente_desde = None
+                return None
+            if self._pendente_desde is None:
+                self._pendente_desde = ts
+            if ts - self._pendente_desde >= self.duracao:
+                self.disparado = True
+                return 'disparado'
+            return None
+        # Disparado: resolve só depois de atravessar o limite com a histerese
+        if comparar(valor, self.limite_resolucao) or valor == self.limite_resolucao:
+            return None
+        self.disparado = False
+        self._pendente_desde = None
+        return 'resolvido'
+
+    def descrever(self):
+        return {
+            'nome': self.nome,
+            'metrica': self.metrica,
+            'tipo': self.tipo,
+            'operador': self.operador,
+            'limite': self.limite,
+            'limite_resolucao': self.limite_resolucao,
+            'janela': self.janela,
+            'agregacao': self.agregacao,
+            'duracao': self.duracao,
+            'severidade': self.severidade,
+            'disparado': self.disparado
+        }
+
+
+class MotorAlertas:
+    """Avalia as regras a cada snapshot do coletor, sem consultar o histórico.
+
+    Cada (métrica, janela) tem uma única `JanelaDeslizante` compartilhada
+    pelas regras que a usam. Eventos de disparo/resolução são gravados no
+    SQLite e os alertas ativos são anexados ao snapshot (`alertas`), de
+    onde seguem para o /stream e para os workers.
+    """
+
+    def __init__(self, regras, caminho=None, historico=50):
+        self.regras = [r if isinstance(r, Regra) else Regra(**r) for r in regras]
+        self.caminho = caminho
+        self._janelas = {}
+        for regra in self.regras:
+            chave = (regra.metrica, regra.janela)
+            if chave not in self._janelas:
+                self._janelas[chave] = JanelaDeslizante(regra.janela)
+        self._ativos = {}
+        self._recentes = collections.deque(maxlen=historico)
+        self._anterior = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+        if caminho:
+            conn = conectar(caminho)
+            criar_tabela_alertas(conn)
+            conn.close()
+
+    def processar(self, ts, valores):
+        """Alimenta as janelas e avalia as regras; retorna os eventos gerados"""
+        for (metrica, _), janela in self._janelas.items():
+            if metrica in valores:
+                janela.adicionar(ts, valores[metrica])
+
+        eventos = []
+        for regra in self.regras:
+            janela = self._janelas[(regra.metrica, regra.janela)]
+            # Sem amostra nova (ex.: taxa de rede no primeiro snapshot) não há o que avaliar
+            if regra.metrica not in valores or not len(janela):
+                continue
+            if regra.tipo == 'taxa' and janela.cobertura() < regra.janela / 2:
+                continue
+            valor = regra.valor(janela)
+            estado = regra.avaliar(ts, valor)
+            if estado is not None:
+                eventos.append(self._evento(regra, estado, ts, valor))
+
+        for evento in eventos:
+            self._registrar(evento)
+        return eventos
+
+    def registrar_snapshot(self, snapshot):
+        """Assinante do coletor (deve ser registrado antes do /stream e dos workers)"""
+        valores = extrair_metricas(snapshot, self._anterior)
+        self._anterior = snapshot
+        self.processar(snapshot['coletado_em'], valores)
+        snapshot['alertas'] = self.estado()
+
+    def _evento(self, regra, estado, ts, valor):
+        if estado == 'disparado':
+            unidade = '/s' if regra.tipo == 'taxa' else ''
+            mensagem = f"{regra.metrica} {regra.operador} {regra.limite}{unidade} (atual: {round(valor, 2)}{unidade})"
+        else:
+            mensagem = f"{regra.metrica} normalizado (atual: {round(valor, 2)})"
+        return {
+            'id': uuid.uuid4().hex[:12],
+            'ts': ts,
+            'regra': regra.nome,
+            'metrica': regra.metrica,
+            'estado': estado,
+            'valor': round(valor, 2),
+            'limite': regra.limite,
+            'severidade': regra.severidade,
+            'mensagem': mensagem
+        }
+
+    def _registrar(self, evento):
+        with self._lock:
+            if evento['estado'] == 'disparado':
+                self._ativos[evento['regra']] = evento
+            else:
+                self._ativos.pop(evento['regra'], None)
+            self._recentes.appendleft(evento)
+        print(f"[INFO] Alerta {evento['estado']}: {evento['regra']} - {evento['mensagem']}")
+        if self.caminho:
+            try:
+                self._gravar(evento)
+            except sqlite3.Error as e:
+                print(f"❌ Erro ao gravar evento de alerta: {e}")
+
+    def _gravar(self, evento):
+        # Conexão própria da thread do coletor; eventos são raros, grava na hora
+        if self._conn is None:
+            self._conn = conectar(self.caminho)
+        self._conn.execute('''
+        INSERT INTO alertas_eventos (id, ts, regra, metrica, estado, valor, limite, severidade, mensagem)
+        VALUES (:id, :ts, :regra, :metrica, :estado, :valor, :limite, :severidade, :mensagem)
+        ''', evento)
+        self._conn.commit()
+
+    def ativos(self):
+        with self._lock:
+            return list(self._ativos.values())
+
+    def recentes(self, n=10):
+        with self._lock:
+            return list(self._recentes)[:n]
+
+    def estado(self):
+        """Resumo anexado ao snapshot: alertas ativos e últimos eventos"""
+        return {'ativos': self.ativos(), 'recentes': self.recentes(5)}
+
+
+def consultar_eventos(caminho, limite=50, desde=None):
+    """Eventos gravados, do mais recente para o mais antigo"""
+    conn = sqlite3.connect(caminho, timeout=10)
+    conn.row_factory = sqlite3.Row
+    try:
+        linhas = conn.execute('''
+        SELECT id, ts, regra, metrica, estado, valor, limite, severidade, mensagem
+        FROM alertas_eventos
+        WHERE ts >= ?
+        ORDER BY ts DESC
+        LIMIT ?
+        ''', (desde or 0, limite)).fetchall()
+    except sqlite3.OperationalError:
+        # Tabela ainda não criada (motor de alertas nunca rodou neste banco)
+        return []
+    finally:
+        conn.close()
+    return [dict(linha) for linha in linhas]
+
+
+_motor = None
+
+
+def iniciar_motor(regras=None, caminho=None):
+    global _motor
+    if _motor is None:
+        _motor = MotorAlertas(REGRAS_PADRAO if regras is None else regras, caminho)
+    return _motor
+
+
+def get_motor():
+    return _motor
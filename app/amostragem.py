@@ -0,0 +1,130 @@
+import collections
+import math
+import time
+
+MODOS = ('rajada', 'normal', 'ocioso')
+
+# Agendas próprias das partes caras da coleta (segundos)
+INTERVALOS_LENTOS = {
+    'processos': 2.0,    # varredura de todos os processos (tabela_processos)
+    'sensores': 5.0,     # WMI/hwmon, bateria, frequência da CPU
+    'sistema': 30.0,     # IP local, boot, núcleos físicos
+    'particoes': 30.0    # uso de todas as partições montadas
+}
+
+# Métricas (em pontos percentuais) cuja variação entre ticks dispara a rajada
+METRICAS_VARIACAO = ('cpu', 'memoria')
+
+
+class AmostragemAdaptativa:
+    """Escolhe o intervalo do próximo tick do coletor (contadores baratos).
+
+    - rajada (`intervalo_rajada`): alguém olhou o dashboard nos últimos
+      `tempo_espectador` s, ou CPU/memória suavizadas (EWMA de `suavizacao`
+      s) variaram mais que `limiar_variacao` pontos no último `suavizacao`
+      s; dura `duracao_rajada` s após o último gatilho;
+    - normal (`intervalo`): o padrão;
+    - ocioso: ninguém olhando e CPU abaixo de `limiar_ocioso` há
+      `tempo_para_ocioso` s; o intervalo dobra a cada tick até
+      `intervalo_maximo`. Qualquer atividade volta ao normal.
+    """
+
+    def __init__(self, intervalo=1.0, intervalo_rajada=0.25, intervalo_maximo=5.0,
+                 limiar_variacao=10.0, limiar_ocioso=5.0, tempo_para_ocioso=30.0,
+                 duracao_rajada=10.0, tempo_espectador=10.0, suavizacao=1.0):
+        self.intervalo = intervalo
+        self.intervalo_rajada = min(intervalo_rajada, intervalo)
+        self.intervalo_maximo = max(intervalo_maximo, intervalo)
+        self.limiar_variacao = limiar_variacao
+        self.limiar_ocioso = limiar_ocioso
+        self.tempo_para_ocioso = tempo_para_ocioso
+        self.duracao_rajada = duracao_rajada
+        self.tempo_espectador = tempo_espectador
+        self.suavizacao = suavizacao
+        self.modo = 'normal'
+        self.intervalo_atual = intervalo
+        self.ticks = collections.Counter()
+        self._espectador_em = None
+        self._rajada_ate = 0.0
+        self._ocioso_desde = None
+        self._suavizado = None
+        self._historico = collections.deque()
+
+    def registrar_espectador(self, agora=None):
+        """Chamado pelas rotas do dashboard (e pelo /stream a cada quadro)"""
+        self._espectador_em = time.monotonic() if agora is None else agora
+
+    def assistido(self, agora):
+        return self._espectador_em is not None and agora - self._espectador_em <= self.tempo_espectador
+
+    def variacao(self, status, agora):
+        """Quanto CPU/memória suavizadas mudaram no último `suavizacao` s.
+
+        Em 250 ms o cpu_percent é ruidoso: comparar leituras cruas de ticks
+        seguidos renovava a rajada indefinidamente num host ocupado. A EWMA
+        usa o tempo real entre ticks, então vale para qualquer intervalo.
+        """
+        if self._suavizado is None:
+            self._suavizado = {m: status[m] for m in METRICAS_VARIACAO}
+        else:
+            alfa = 1 - math.exp(-max(0.0, agora - self._historico[-1][0]) / self.suavizacao)
+            self._suavizado = {m: s + alfa * (status[m] - s) for m, s in self._suavizado.items()}
+        self._historico.append((agora, self._suavizado))
+        # Referência: o valor suavizado mais recente com pelo menos `suavizacao` s
+        while len(self._historico) > 2 and agora - self._historico[1][0] >= self.suavizacao:
+            self._historico.popleft()
+        inicio, referencia = self._historico[0]
+        if agora - inicio < self.suavizacao:
+            return 0.0
+        return max(abs(self._suavizado[m] - referencia[m]) for m in METRICAS_VARIACAO)
+
+    def proximo(self, status, agora=None):
+        """Recebe o `status` da amostra recém-coletada; retorna o intervalo até o próximo tick"""
+        if agora is None:
+            agora = time.monotonic()
+        assistido = self.assistido(agora)
+
+        variacao = self.variacao(status, agora)
+        if assistido or variacao >= self.limiar_variacao:
+            self._rajada_ate = agora + self.duracao_rajada
+
+        if status['cpu'] < self.limiar_ocioso and not assistido:
+            if self._ocioso_desde is None:
+                self._ocioso_desde = agora
+        else:
+            self._ocioso_desde = None
+
+        if agora < self._rajada_ate:
+            self.modo, self.intervalo_atual = 'rajada', self.intervalo_rajada
+        elif self._ocioso_desde is not None and agora - self._ocioso_desde >= self.tempo_para_ocioso:
+            base = self.intervalo_atual if self.modo == 'ocioso' else self.intervalo
+            self.modo, self.intervalo_atual = 'ocioso', min(base * 2, self.intervalo_maximo)
+        else:
+            self.modo, self.intervalo_atual = 'normal', self.intervalo
+        self.ticks[self.modo] += 1
+        return self.intervalo_atual
+
+    def estado(self):
+        return {
+            'modo': self.modo,
+            'intervalo': self.intervalo_atual,
+            'intervalo_base': self.intervalo,
+            'intervalo_rajada': self.intervalo_rajada,
+            'intervalo_maximo': self.intervalo_maximo,
+            'ticks': dict(self.ticks)
+        }
+
+
+class AgendaPartes:
+    """Quando cada parte cara da coleta vence (relógio monotônico)"""
+
+    def __init__(self, intervalos=None):
+        self.intervalos = dict(INTERVALOS_LENTOS, **(intervalos or {}))
+        self._proxima = {nome: 0.0 for nome in self.intervalos}
+
+    def vencidas(self, agora):
+        """Partes a executar neste tick (já reagendadas)"""
+        nomes = [nome for nome, proxima in self._proxima.items() if agora >= proxima]
+        for nome in nomes:
+            self._proxima[nome] = agora + self.intervalos[nome]
+        return nomes
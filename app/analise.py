@@ -0,0 +1,315 @@
+import math
+import time
+from .metricas import RESOLUCOES
+from .opcionais import carregar
+
+# Métricas em % (a previsão usa 100 como limite quando nenhum é informado)
+METRICAS_PERCENTUAIS = ('cpu', 'memoria', 'disco')
+
+ANALISES = ('percentis', 'ewma', 'zscore', 'sazonal', 'tendencia', 'mudanca')
+
+DIAS_SEMANA = ('segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'domingo')
+
+# Linhas lidas por análise (um mês em 1 s tem ~2,6 milhões)
+LIMITE_LINHAS_ANALISE = 5_000_000
+
+# Anomalias devolvidas por análise (as de maior |z|)
+MAX_ANOMALIAS = 50
+
+# Folga (s) na checagem de retenção: `to` padrão é lido na rota antes do `agora`
+# daqui, e a poda só roda a cada compactação (60 s por padrão)
+FOLGA_RETENCAO = 60
+
+# A busca do ponto de mudança trabalha sobre no máximo isso de pontos (médias por bloco)
+MAX_PONTOS_MUDANCA = 20000
+
+
+def escolher_resolucao_analise(inicio, fim, retencao, agora=None):
+    """Resolução mais fina cuja retenção cobre o intervalo (sem o limite de pontos dos gráficos)"""
+    if agora is None:
+        agora = time.time()
+    for resolucao in sorted(RESOLUCOES):
+        # Inclusivo: uma janela exatamente do tamanho da retenção fica nesta resolução
+        if agora - inicio <= retencao[resolucao] + FOLGA_RETENCAO and (fim - inicio) / resolucao <= LIMITE_LINHAS_ANALISE:
+            return resolucao
+    return max(RESOLUCOES)
+
+
+def carregar_serie(armazem, metrica, inicio, fim, resolucao):
+    """Lê a série do SQLite direto para um array estruturado do NumPy.
+
+    `np.fromiter` consome o cursor sem montar a lista de tuplas; `ts` e
+    `valores` são visões (sem cópia) das colunas desse mesmo array.
+    """
+    np = carregar('numpy')
+    tipo = np.dtype([('ts', 'f8'), ('minimo', 'f8'), ('maximo', 'f8'), ('media', 'f8')])
+    dados = np.fromiter(armazem.iterar(metrica, inicio, fim, resolucao), dtype=tipo)
+    return dados['ts'], dados['media']
+
+
+def percentis(valores, ps=(50, 90, 95, 99)):
+    np = carregar('numpy')
+    if not len(valores):
+        return {}
+    resultado = {f'p{p}': float(v) for p, v in zip(ps, np.percentile(valores, ps))}
+    resultado.update({
+        'minimo': float(valores.min()),
+        'maximo': float(valores.max()),
+        'media': float(valores.mean()),
+        'desvio': float(valores.std())
+    })
+    return resultado
+
+
+def ewma(valores, alfa=0.1):
+    """Média móvel exponencial y[i] = alfa*x[i] + (1-alfa)*y[i-1], sem laço por amostra.
+
+    Dentro de um bloco, y[i] = b^i * (b*y0 + alfa * cumsum(x[j] * b^-j)),
+    com b = 1-alfa. Os blocos são curtos o bastante para b^-j não estourar
+    o float64; o último valor de cada bloco alimenta o seguinte.
+    """
+    np = carregar('numpy')
+    x = np.asarray(valores, dtype=np.float64)
+    n = len(x)
+    if not 0 < alfa <= 1:
+        raise ValueError('alfa deve estar em (0, 1]')
+    if n == 0 or alfa == 1:
+        return x.copy()
+    b = 1.0 - alfa
+    tamanho = max(1, min(n, int(600 / -math.log(b))))
+    potencias = b ** np.arange(tamanho)
+    inversas = 1.0 / potencias
+    saida = np.empty(n)
+    anterior = x[0]
+    for inicio in range(0, n, tamanho):
+        bloco = x[inicio:inicio + tamanho]
+        k = len(bloco)
+        acumulado = b * anterior + alfa * np.cumsum(bloco * inversas[:k])
+        saida[inicio:inicio + k] = potencias[:k] * acumulado
+        anterior = saida[inicio + k - 1]
+    return saida
+
+
+def zscore_movel(valores, janela):
+    """z de cada ponto em relação à média/desvio dos `janela` pontos anteriores (NaN no início)"""
+    np = carregar('numpy')
+    n = len(valores)
+    z = np.full(n, np.nan)
+    if n <= janela or janela < 2:
+        return z
+    # Centralizar antes das somas acumuladas evita cancelamento na variância
+    x = valores - valores.mean()
+    s1 = np.concatenate(([0.0], np.cumsum(x)))
+    s2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    soma = s1[janela:n] - s1[:n - janela]
+    media = soma / janela
+    variancia = np.maximum((s2[janela:n] - s2[:n - janela]) / janela - media * media, 0.0)
+    desvio = np.sqrt(variancia)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z[janela:] = np.where(desvio > 1e-9, (x[janela:] - media) / desvio, np.nan)
+    return z
+
+
+def hora_da_semana(ts, deslocamento):
+    """0 = segunda 00h ... 167 = domingo 23h (1/1/1970 foi uma quinta: +72 h)"""
+    np = carregar('numpy')
+    return ((np.floor_divide(ts + deslocamento, 3600)).astype(np.int64) + 72) % 168
+
+
+def rotulo_hora_semana(slot):
+    return f'{DIAS_SEMANA[slot // 24]} {slot % 24:02d}:00'
+
+
+def _anomalias(ts, valores, z, limiar):
+    """Pontos com |z| >= limiar, os mais extremos primeiro"""
+    np = carregar('numpy')
+    indices = np.flatnonzero(np.abs(np.nan_to_num(z)) >= limiar)
+    if len(indices) > MAX_ANOMALIAS:
+        indices = indices[np.argsort(-np.abs(z[indices]))[:MAX_ANOMALIAS]]
+    indices = indices[np.argsort(-np.abs(z[indices]))]
+    return [{'ts': float(ts[i]), 'valor': round(float(valores[i]), 3), 'z': round(float(z[i]), 2)}
+            for i in indices]
+
+
+def anomalias_sazonais(ts, valores, desde, limiar=3.0, deslocamento=0, minimo_amostras=3):
+    """Compara os pontos a partir de `desde` com o normal da mesma hora da semana.
+
+    O normal (média e desvio por hora da semana) vem só dos pontos antigos
+    (ts < desde), então uma anomalia recente não contamina a própria base.
+    """
+    np = carregar('numpy')
+    slots = hora_da_semana(ts, deslocamento)
+    base = ts < desde
+    centro = valores[base].mean() if base.any() else 0.0
+    x = valores - centro
+    contagem = np.bincount(slots[base], minlength=168)
+    soma = np.bincount(slots[base], weights=x[base], minlength=168)
+    soma2 = np.bincount(slots[base], weights=x[base] ** 2, minlength=168)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = soma / contagem
+        desvio = np.sqrt(np.maximum(soma2 / contagem - media ** 2, 0.0))
+    suficiente = contagem >= minimo_amostras
+    media[~suficiente] = np.nan
+
+    recentes = ~base
+    slots_recentes = slots[recentes]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (x[recentes] - media[slots_recentes]) / desvio[slots_recentes]
+    z[~np.isfinite(z)] = np.nan
+
+    resultado = {
+        'desde': float(desde),
+        'slots_com_base': int(suficiente.sum()),
+        'anomalias': _anomalias(ts[recentes], valores[recentes], z, limiar)
+    }
+    if len(ts):
+        slot = int(slots[-1])
+        resultado['atual'] = {
+            'hora_semana': rotulo_hora_semana(slot),
+            'valor': round(float(valores[-1]), 3),
+            'normal_media': None if math.isnan(media[slot]) else round(float(media[slot] + centro), 3),
+            'normal_desvio': None if math.isnan(media[slot]) else round(float(desvio[slot]), 3),
+            'amostras_base': int(contagem[slot]),
+            'z': None if not recentes[-1] or math.isnan(z[-1]) else round(float(z[-1]), 2)
+        }
+    return resultado
+
+
+def tendencia_linear(ts, valores, limite=None):
+    """Reta de mínimos quadrados; com `limite`, quando (e em quantos dias) ele será atingido"""
+    np = carregar('numpy')
+    if len(ts) < 2:
+        return None
+    t = (ts - ts[-1]) / 86400.0
+    dt = t - t.mean()
+    dx = valores - valores.mean()
+    sxx = float(dt @ dt)
+    if sxx == 0:
+        return None
+    inclinacao = float(dt @ dx) / sxx
+    atual = float(valores.mean() - inclinacao * t.mean())
+    sst = float(dx @ dx)
+    residuos = dx - inclinacao * dt
+    resultado = {
+        'inclinacao_por_dia': round(inclinacao, 6),
+        'valor_ajustado_atual': round(atual, 3),
+        'r2': round(1 - float(residuos @ residuos) / sst, 4) if sst > 0 else None
+    }
+    if limite is not None:
+        dias = None
+        if atual >= limite:
+            dias = 0.0
+        elif inclinacao > 0:
+            dias = (limite - atual) / inclinacao
+        resultado.update({
+            'limite': limite,
+            'dias_ate_limite': round(dias, 2) if dias is not None else None,
+            'atinge_limite_em': float(ts[-1] + dias * 86400) if dias is not None else None
+        })
+    return resultado
+
+
+def _reduzir(ts, valores, maximo):
+    """Médias por bloco para no máximo `maximo` pontos"""
+    np = carregar('numpy')
+    n = len(ts)
+    if n <= maximo:
+        return ts, valores
+    passo = math.ceil(n / maximo)
+    inicios = np.arange(0, n, passo)
+    contagem = np.diff(np.append(inicios, n))
+    return np.add.reduceat(ts, inicios) / contagem, np.add.reduceat(valores, inicios) / contagem
+
+
+def inicio_tendencia(ts, valores, minimo_segmento=None):
+    """Quando a série saiu de um patamar estável e começou a subir/descer.
+
+    Ajusta "constante até k, reta depois de k" para todos os k de uma vez
+    (somas de prefixo/sufixo) e escolhe o k de menor erro total.
+    """
+    np = carregar('numpy')
+    ts, valores = _reduzir(ts, valores, MAX_PONTOS_MUDANCA)
+    n = len(ts)
+    m = minimo_segmento or max(3, n // 50)
+    if n < 2 * m + 1:
+        return None
+    t = (ts - ts[0]) / 86400.0
+    x = valores - valores.mean()
+
+    def acumulada(v):
+        return np.concatenate(([0.0], np.cumsum(v)))
+
+    # Prefixo [0, k): erro do ajuste constante
+    px, px2 = acumulada(x), acumulada(x * x)
+    k = np.arange(m, n - m + 1)
+    erro_antes = px2[k] - px[k] ** 2 / k
+
+    # Sufixo [k, n): erro da regressão linear
+    pt, pt2, ptx = acumulada(t), acumulada(t * t), acumulada(t * x)
+    c = n - k
+    st, st2 = pt[n] - pt[k], pt2[n] - pt2[k]
+    sx, sx2, stx = px[n] - px[k], px2[n] - px2[k], ptx[n] - ptx[k]
+    sxx = st2 - st ** 2 / c
+    sxy = stx - st * sx / c
+    syy = sx2 - sx ** 2 / c
+    with np.errstate(divide='ignore', invalid='ignore'):
+        erro_depois = np.where(sxx > 0, syy - sxy ** 2 / sxx, syy)
+        inclinacoes = np.where(sxx > 0, sxy / sxx, 0.0)
+
+    melhor = int(np.argmin(erro_antes + erro_depois))
+    erro_total = float(px2[n] - px[n] ** 2 / n)
+    indice = int(k[melhor])
+    return {
+        'inicio_em': float(ts[indice]),
+        'nivel_antes': round(float(valores[:indice].mean()), 3),
+        'inclinacao_por_dia_depois': round(float(inclinacoes[melhor]), 6),
+        # Quanto do erro de "série constante" o modelo com mudança explica (0 a 1)
+        'explicado': round(1 - float(erro_antes[melhor] + erro_depois[melhor]) / erro_total, 4) if erro_total > 0 else 0.0
+    }
+
+
+def analisar(armazem, metrica, inicio, fim, analises=ANALISES, resolucao=None, alfa=0.1,
+             janela=3600.0, limiar=3.0, limite=None, recente=3600.0):
+    """Carrega a janela da métrica e roda as análises pedidas (tempos de carga e cálculo inclusos)"""
+    np = carregar('numpy')
+    if resolucao is None:
+        resolucao = escolher_resolucao_analise(inicio, fim, armazem.retencao)
+    t0 = time.perf_counter()
+    ts, valores = carregar_serie(armazem, metrica, inicio, fim, resolucao)
+    t1 = time.perf_counter()
+
+    resultado = {
+        'metrica': metrica,
+        'from': inicio,
+        'to': fim,
+        'resolucao': resolucao,
+        'amostras': int(len(ts))
+    }
+    if len(ts):
+        if 'percentis' in analises:
+            resultado['percentis'] = {k: round(v, 3) for k, v in percentis(valores).items()}
+        if 'ewma' in analises:
+            suavizada = ewma(valores, alfa)
+            resultado['ewma'] = {'alfa': alfa, 'atual': round(float(suavizada[-1]), 3)}
+        if 'zscore' in analises:
+            amostras_janela = max(2, int(janela // resolucao))
+            z = zscore_movel(valores, amostras_janela)
+            resultado['zscore'] = {
+                'janela': janela,
+                'limiar': limiar,
+                'atual': None if np.isnan(z[-1]) else round(float(z[-1]), 2),
+                'anomalias': _anomalias(ts, valores, z, limiar)
+            }
+        if 'sazonal' in analises:
+            # Horário local (o deslocamento do fim da janela vale para ela inteira)
+            deslocamento = time.localtime(fim).tm_gmtoff
+            resultado['sazonal'] = anomalias_sazonais(ts, valores, fim - recente, limiar, deslocamento)
+        if 'tendencia' in analises:
+            if limite is None and metrica.split('@')[0] in METRICAS_PERCENTUAIS:
+                limite = 100.0
+            resultado['tendencia'] = tendencia_linear(ts, valores, limite)
+        if 'mudanca' in analises:
+            resultado['mudanca'] = inicio_tendencia(ts, valores)
+    t2 = time.perf_counter()
+    resultado['duracao_ms'] = {'carga': round((t1 - t0) * 1000, 1), 'calculo': round((t2 - t1) * 1000, 1)}
+    return resultado
@@ -1,136 +1,207 @@
 import datetime
 import os
-import psutil
-from .monitor import get_status
+from .coletor import get_snapshot
+from .historico_processos import get_historico
+from .processos import get_tabela
+from .registro_backup import get_log
 
 
-def criar_backup_novo():
+def montar_registro(snapshot, top_processos, agora=None, consumidores=None):
     """
-    Cria backup completo do sistema com formato detalhado.
-    Inclui: CPU, Memória, Disco, Rede, Uptime, Top 10 Processos + Novos sensores.
+    Monta o registro estruturado de um backup (mesmo esquema dos antigos
+    backup/system_data_*.json, acrescido dos sensores e, se houver histórico
+    de processos, dos maiores consumidores da última hora).
     """
-    try:
-        os.makedirs('backups', exist_ok=True)
-        
-        # Obtém dados do sistema
-        dados = get_status()
-        
-        # Dados adicionais
-        cpu_info = psutil.cpu_freq()
-        mem = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        net = psutil.net_io_counters()
-        boot_time = datetime.datetime.fromtimestamp(psutil.boot_time())
-        uptime_seconds = (datetime.datetime.now() - boot_time).total_seconds()
-        uptime_hours = uptime_seconds / 3600
-        
-        # IP Local
-        try:
-            addrs = psutil.net_if_addrs()
-            ip_local = next((addr.address for iface in addrs.values() 
-                           for addr in iface if addr.family == 2 and not addr.address.startswith('127.')), 'N/A')
-        except:
-            ip_local = 'N/A'
-        
-        # Top 10 processos
-        processos = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                processos.append(proc.info)
-            except:
-                pass
-        top_processos = sorted(processos, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:10]
-        
-        # Gera timestamp e nome do arquivo
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        nome_arquivo = f'backups/resumo_backup_{timestamp}.txt'
-        
-        # Formata conteúdo
-        conteudo = f"""============================================================
-BACKUP TASKMONITOR PRO 2 - {timestamp}
+    if agora is None:
+        agora = datetime.datetime.now()
+    dados = snapshot['status']
+    mem = snapshot['memoria']
+    disk = snapshot['disco']
+    net = snapshot['rede']
+    boot_time = datetime.datetime.fromtimestamp(snapshot['boot_time'])
+
+    return {
+        'timestamp': agora.isoformat(),
+        'data_backup': agora.strftime('%Y%m%d_%H%M%S'),
+        'idade_dados': snapshot['idade_snapshot'],
+        'cpu': {
+            'uso_percent': dados['cpu'],
+            'nucleos': snapshot['cpu_nucleos'],
+            'frequencia_mhz': snapshot['cpu_frequencia']
+        },
+        'memoria': {
+            'total_gb': round(mem['total'] / (1024**3), 2),
+            'usado_gb': round(mem['usado'] / (1024**3), 2),
+            'disponivel_gb': round(mem['disponivel'] / (1024**3), 2),
+            'percent_usado': mem['percent']
+        },
+        'disco': {
+            'total_gb': round(disk['total'] / (1024**3), 2),
+            'usado_gb': round(disk['usado'] / (1024**3), 2),
+            'livre_gb': round(disk['livre'] / (1024**3), 2),
+            'percent_usado': disk['percent']
+        },
+        'rede': {
+            'ip_local': net['ip_local'],
+            'bytes_enviados': net['bytes_enviados'],
+            'bytes_recebidos': net['bytes_recebidos']
+        },
+        'sistema': {
+            'boot_time': boot_time.isoformat(),
+            'uptime_horas': round((agora - boot_time).total_seconds() / 3600, 2),
+            'nome_so': os.name
+        },
+        'sensores': {
+            'cpu_temperatura': dados['cpu_temperatura'],
+            'ram_frequencia': dados['ram_frequencia'],
+            'ram_energia': dados['ram_energia'],
+            'bateria': dados['bateria']
+        },
+        'processos_top10': [
+            {
+                'pid': proc['pid'],
+                'nome': proc['name'],
+                'cpu_percent': proc['cpu_percent'],
+                'memory_percent': proc['memory_percent']
+            }
+            for proc in top_processos
+        ],
+        'consumidores_ultima_hora': consumidores or []
+    }
+
+
+def renderizar_resumo(registro):
+    """Gera o relatório em texto (formato dos antigos resumo_backup_*.txt) a partir de um registro"""
+    agora = datetime.datetime.fromisoformat(registro['timestamp'])
+    boot_time = datetime.datetime.fromisoformat(registro['sistema']['boot_time'])
+    cpu = registro['cpu']
+    mem = registro['memoria']
+    disk = registro['disco']
+    net = registro['rede']
+    sensores = registro.get('sensores', {})
+    cpu_temperatura = sensores.get('cpu_temperatura', 'N/A')
+    ram_frequencia = sensores.get('ram_frequencia', 'N/A')
+    ram_energia = sensores.get('ram_energia', 'N/A')
+    bateria = sensores.get('bateria', 'N/A')
+
+    conteudo = f"""============================================================
+BACKUP TASKMONITOR PRO 2 - {registro['data_backup']}
 ============================================================
 
-🕐 Data/Hora do Backup: {datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
+🕐 Data/Hora do Backup: {agora.strftime('%d/%m/%Y %H:%M:%S')}
+"""
+    if 'idade_dados' in registro:
+        conteudo += f"⏳ Idade dos dados: {registro['idade_dados']:.1f} s\n"
 
+    conteudo += f"""
 ============================================================
 RESUMO DO SISTEMA
 ============================================================
 
 💻 CPU:
-   - Uso Atual: {dados['cpu']}%
-   - Núcleos: {psutil.cpu_count(logical=False)}
-   - Frequência: {int(cpu_info.current) if cpu_info else 0} MHz
+   - Uso Atual: {cpu['uso_percent']}%
+   - Núcleos: {cpu['nucleos']}
+   - Frequência: {int(cpu['frequencia_mhz'] or 0)} MHz
 
 🧠 MEMÓRIA:
-   - Total: {mem.total / (1024**3):.2f} GB
-   - Usado: {mem.used / (1024**3):.2f} GB ({mem.percent}%)
-   - Disponível: {mem.available / (1024**3):.2f} GB
+   - Total: {mem['total_gb']:.2f} GB
+   - Usado: {mem['usado_gb']:.2f} GB ({mem['percent_usado']}%)
+   - Disponível: {mem['disponivel_gb']:.2f} GB
 
 💾 DISCO:
-   - Total: {disk.total / (1024**3):.2f} GB
-   - Usado: {disk.used / (1024**3):.2f} GB ({disk.percent}%)
-   - Livre: {disk.free / (1024**3):.2f} GB
+   - Total: {disk['total_gb']:.2f} GB
+   - Usado: {disk['usado_gb']:.2f} GB ({disk['percent_usado']}%)
+   - Livre: {disk['livre_gb']:.2f} GB
 
 🌐 REDE:
-   - IP Local: {ip_local}
-   - Bytes Enviados: {net.bytes_sent:,}
-   - Bytes Recebidos: {net.bytes_recv:,}
+   - IP Local: {net['ip_local']}
+   - Bytes Enviados: {net['bytes_enviados']:,}
+   - Bytes Recebidos: {net['bytes_recebidos']:,}
 
 ⏱️ SISTEMA:
    - Boot: {boot_time.strftime('%d/%m/%Y %H:%M:%S')}
-   - Uptime: {uptime_hours:.2f} horas
+   - Uptime: {registro['sistema']['uptime_horas']:.2f} horas
 
 ============================================================
 SENSORES AVANÇADOS
 ============================================================
 
 🌡️ TEMPERATURA CPU:
-   - Valor: {dados['cpu_temperatura']}{'°C' if dados['cpu_temperatura'] != 'N/A' else ''}
+   - Valor: {cpu_temperatura}{'°C' if cpu_temperatura != 'N/A' else ''}
 
 ⚡ FREQUÊNCIA RAM:
-   - Valor: {dados['ram_frequencia']}{' MHz' if dados['ram_frequencia'] != 'N/A' else ''}
+   - Valor: {ram_frequencia}{' MHz' if ram_frequencia != 'N/A' else ''}
 
 🔋 ENERGIA RAM:
-   - Consumo Total: {dados['ram_energia']['total_watts'] if isinstance(dados['ram_energia'], dict) else dados['ram_energia']}{' W' if isinstance(dados['ram_energia'], dict) and dados['ram_energia']['total_watts'] != 'N/A' else ''}
+   - Consumo Total: {ram_energia['total_watts'] if isinstance(ram_energia, dict) else ram_energia}{' W' if isinstance(ram_energia, dict) and ram_energia['total_watts'] != 'N/A' else ''}
 """
-        
-        # Adiciona bateria se disponível
-        if dados['bateria'] != 'N/A' and isinstance(dados['bateria'], dict):
-            status_plugado = "Conectado na tomada" if dados['bateria']['plugged'] else "Usando bateria"
-            tempo_restante = ""
-            if dados['bateria']['time_left'] and dados['bateria']['time_left'] > 0:
-                minutos = dados['bateria']['time_left'] // 60
-                tempo_restante = f" ({minutos} min restantes)"
-            
-            conteudo += f"""
+
+    # Adiciona bateria se disponível
+    if bateria != 'N/A' and isinstance(bateria, dict):
+        status_plugado = "Conectado na tomada" if bateria['plugged'] else "Usando bateria"
+        tempo_restante = ""
+        if bateria['time_left'] and bateria['time_left'] > 0:
+            minutos = bateria['time_left'] // 60
+            tempo_restante = f" ({minutos} min restantes)"
+
+        conteudo += f"""
 🔋 BATERIA:
-   - Carga: {dados['bateria']['percent']}%
+   - Carga: {bateria['percent']}%
    - Status: {status_plugado}{tempo_restante}
 """
-        else:
-            conteudo += f"""
+    else:
+        conteudo += f"""
 🔋 BATERIA:
    - Status: N/A (Desktop ou sensor não disponível)
 """
-        
-        # Top 10 processos
-        conteudo += """
+
+    # Top 10 processos
+    conteudo += """
 ============================================================
 TOP 10 PROCESSOS (por uso de CPU)
 ============================================================
 
 """
-        for i, proc in enumerate(top_processos, 1):
-            conteudo += f"""{i}. {proc['name']} (PID: {proc['pid']})
+    for i, proc in enumerate(registro['processos_top10'], 1):
+        conteudo += f"""{i}. {proc['nome']} (PID: {proc['pid']})
    CPU: {proc['cpu_percent'] or 0:.1f}% | RAM: {proc['memory_percent'] or 0:.1f}%
 
 """
-        
-        # Salva o backup
-        with open(nome_arquivo, 'w', encoding='utf-8') as f:
-            f.write(conteudo)
-        
-        return f"✅ Backup criado com sucesso: {nome_arquivo}"
-    
+
+    if registro.get('consumidores_ultima_hora'):
+        conteudo += """============================================================
+MAIORES CONSUMIDORES (última hora)
+============================================================
+
+"""
+        for i, proc in enumerate(registro['consumidores_ultima_hora'], 1):
+            conteudo += f"""{i}. {proc['name']} (PID: {proc['pid']})
+   CPU média: {proc['cpu_medio']:.1f}% | RAM máx.: {proc['rss_max'] / (1024**2):.1f} MB
+
+"""
+    return conteudo
+
+
+def criar_backup_novo():
+    """
+    Cria backup completo do sistema e o grava no log append-only de backups.
+    Inclui: CPU, Memória, Disco, Rede, Uptime, Top 10 Processos + Novos sensores.
+    """
+    try:
+        # Obtém dados do sistema a partir do snapshot do coletor
+        snapshot = get_snapshot()
+
+        # Top 10 processos (tabela incremental mantida pelo coletor)
+        top_processos = get_tabela().top(10, 'cpu_percent')
+
+        # Quem mais consumiu na última hora (histórico por processo, se ativo)
+        historico = get_historico()
+        consumidores = historico.top_consumidores(3600, 10) if historico is not None else None
+
+        registro = montar_registro(snapshot, top_processos, consumidores=consumidores)
+        segmento, offset, tamanho = get_log().anexar(registro)
+
+        return f"✅ Backup criado com sucesso: {segmento}@{offset} ({tamanho} bytes)"
+
     except Exception as e:
-        return f"❌ Erro ao criar backup: {str(e)}"
\ No newline at end of file
+        return f"❌ Erro ao criar backup: {str(e)}"
@@ -0,0 +1,449 @@
+import collections
+import contextlib
+import datetime
+import http.client
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+import psutil
+
+VERSAO_FORMATO = 1
+
+SECOES = ('coletores', 'processos', 'http')
+
+# Rotas do teste de carga (o /processos com busca usa o índice e a paginação)
+ROTAS_HTTP = ('/status', '/processos', '/processos?q=worker&limite=50', '/logs')
+
+# Métrica comparada com a execução de referência em cada seção
+METRICA_COMPARACAO = {'coletores': 'mediana_ms', 'processos': 'mediana_ms', 'http': 'p99_ms'}
+
+# Diferenças abaixo disso (ms) são ruído, mesmo que passem da tolerância relativa
+DIFERENCA_MINIMA_MS = 0.1
+
+
+def percentil(ordenados, p):
+    """Percentil por posição (nearest-rank) de uma lista já ordenada"""
+    if not ordenados:
+        return None
+    posicao = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[posicao]
+
+
+def resumir(tempos):
+    """Tempos em segundos -> estatísticas em milissegundos"""
+    ordenados = sorted(t * 1000 for t in tempos)
+    return {
+        'n': len(ordenados),
+        'media_ms': round(statistics.fmean(ordenados), 3),
+        'mediana_ms': round(statistics.median(ordenados), 3),
+        'p95_ms': round(percentil(ordenados, 95), 3),
+        'p99_ms': round(percentil(ordenados, 99), 3),
+        'max_ms': round(ordenados[-1], 3)
+    }
+
+
+def medir_alocacoes(funcao, repeticoes):
+    """Pico e memória retida (KB, mediana por chamada) via tracemalloc"""
+    ja_ativo = tracemalloc.is_tracing()
+    if not ja_ativo:
+        tracemalloc.start()
+    picos = []
+    retidos = []
+    try:
+        for _ in range(repeticoes):
+            tracemalloc.reset_peak()
+            antes, _ = tracemalloc.get_traced_memory()
+            funcao()
+            depois, pico = tracemalloc.get_traced_memory()
+            picos.append(pico - antes)
+            retidos.append(depois - antes)
+    finally:
+        if not ja_ativo:
+            tracemalloc.stop()
+    return {
+        'alocacao_pico_kb': round(statistics.median(picos) / 1024, 1),
+        'alocacao_retida_kb': round(statistics.median(retidos) / 1024, 1)
+    }
+
+
+def medir(funcao, repeticoes=30, aquecimento=2, alocacoes=True):
+    """Latência de `funcao` (após aquecimento) e, numa passada separada, suas alocações"""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    resultado = resumir(tempos)
+    # tracemalloc deixa tudo mais lento: não pode estar ativo durante a cronometragem
+    if alocacoes:
+        resultado.update(medir_alocacoes(funcao, min(repeticoes, 5)))
+    return resultado
+
+
+# --- coletores -------------------------------------------------------------
+
+def benchmark_coletores(repeticoes=30):
+    """Latência e alocações de cada coletor chamado diretamente (sem thread do coletor)"""
+    from . import monitor
+    from .backup_new import criar_backup_novo
+    from .processos import get_tabela
+
+    def backup():
+        resultado = criar_backup_novo()
+        if resultado.startswith('❌'):
+            raise RuntimeError(resultado)
+
+    casos = {
+        'get_status': monitor.get_status,
+        'get_processes': monitor.get_processes,
+        'coletar_amostra': monitor.coletar_amostra,
+        'coletar_contadores': monitor.coletar_contadores,
+        'interfaces': monitor._coletar_interfaces,
+        'discos_io': monitor._coletar_discos_io,
+        'particoes': monitor._coletar_particoes,
+        'tabela_processos.atualizar': get_tabela().atualizar,
+        'criar_backup_novo': backup
+    }
+    return {nome: medir(funcao, repeticoes) for nome, funcao in casos.items()}
+
+
+# --- processos sintéticos ----------------------------------------------------
+
+NOMES_SINTETICOS = ('python', 'worker', 'postgres', 'nginx', 'chrome', 'java', 'node', 'sshd',
+                    'bash', 'systemd', 'redis-server', 'gunicorn', 'celery', 'dockerd', 'containerd')
+
+_TemposCPU = collections.namedtuple('_TemposCPU', 'user system')
+_Memoria = collections.namedtuple('_Memoria', 'rss vms')
+_IO = collections.namedtuple('_IO', 'read_bytes write_bytes')
+_MemoriaSistema = collections.namedtuple('_MemoriaSistema', 'total available percent used free')
+
+
+class _ProcessoSintetico:
+    """O subconjunto da API de `psutil.Process` usado pela tabela e pelo histórico"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._nome = NOMES_SINTETICOS[pid % len(NOMES_SINTETICOS)]
+        self._cpu = 0.0
+        self._io = 0
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def create_time(self):
+        return 1_700_000_000.0 + self.pid
+
+    def name(self):
+        return self._nome
+
+    def username(self):
+        return 'root' if self.pid % 3 == 0 else 'app'
+
+    def exe(self):
+        return f'/usr/bin/{self._nome}'
+
+    def cmdline(self):
+        return [f'/usr/bin/{self._nome}', '--id', str(self.pid)]
+
+    def ppid(self):
+        # Árvore com ~8 filhos por nó, a partir do PID 1
+        return self.pid // 8 if self.pid > 1 else 0
+
+    def cpu_times(self):
+        self._cpu += (self.pid % 17) * 0.0005
+        return _TemposCPU(self._cpu * 0.7, self._cpu * 0.3)
+
+    def memory_info(self):
+        return _Memoria((self.pid % 97 + 1) * 1024 * 1024, (self.pid % 97 + 1) * 4 * 1024 * 1024)
+
+    def io_counters(self):
+        self._io += self.pid % 13 * 4096
+        return _IO(self._io, self._io // 2)
+
+    def num_threads(self):
+        return self.pid % 9 + 1
+
+    def num_fds(self):
+        return self.pid % 50 + 3
+
+    num_handles = num_fds
+
+
+class PsutilSintetico:
+    """Substitui o psutil no módulo de processos com `n` processos sintéticos.
+
+    Só a listagem/leitura de processos é falsa; exceções e demais funções
+    vêm do psutil real.
+    """
+
+    def __init__(self, n=5000):
+        self._processos = {pid: _ProcessoSintetico(pid) for pid in range(1, n + 1)}
+
+    def __getattr__(self, nome):
+        return getattr(psutil, nome)
+
+    def pids(self):
+        return list(self._processos)
+
+    def Process(self, pid):
+        try:
+            return self._processos[pid]
+        except KeyError:
+            raise psutil.NoSuchProcess(pid) from None
+
+    def virtual_memory(self):
+        total = 64 * 1024 ** 3
+        return _MemoriaSistema(total, total // 2, 50.0, total // 2, total // 2)
+
+    def cpu_count(self, logical=True):
+        return 16
+
+
+@contextlib.contextmanager
+def processos_sinteticos(n=5000):
+    """Instala o PsutilSintetico em `app.processos` (e no histórico) durante o bloco"""
+    from . import historico_processos, processos
+    falso = PsutilSintetico(n)
+    originais = processos.psutil, historico_processos.psutil
+    processos.psutil = historico_processos.psutil = falso
+    try:
+        yield falso
+    finally:
+        processos.psutil, historico_processos.psutil = originais
+
+
+def benchmark_processos(n=5000, repeticoes=30):
+    """Tabela, índice, busca, ordenação, agrupamento e paginação com `n` processos"""
+    from .processos import TabelaProcessos, IndiceProcessos, agrupar, paginar
+
+    resultados = {}
+    with processos_sinteticos(n):
+        # Primeiro tick: cria as n entradas (lê os atributos estáveis de cada processo)
+        resultados['atualizar_primeiro_tick'] = medir(lambda: TabelaProcessos().atualizar(),
+                                                      max(3, repeticoes // 5), aquecimento=1)
+        tabela = TabelaProcessos()
+        tabela.atualizar()
+        resultados['atualizar'] = medir(tabela.atualizar, repeticoes)
+        linhas = tabela.listar()
+        resultados['top_50'] = medir(lambda: tabela.top(50, 'cpu_percent'), repeticoes)
+        resultados['indice'] = medir(lambda: IndiceProcessos(linhas), repeticoes)
+        indice = IndiceProcessos(linhas)
+        resultados['buscar'] = medir(lambda: indice.buscar('worker'), repeticoes)
+        resultados['ordenar'] = medir(lambda: IndiceProcessos(linhas).ordenar('rss'), repeticoes)
+        resultados['agrupar'] = medir(lambda: agrupar(linhas), repeticoes)
+        itens, chaves = indice.ordenar('cpu_percent')
+
+        def percorrer():
+            cursor = None
+            while True:
+                _, cursor = paginar(itens, chaves, 50, cursor, decrescente=True)
+                if cursor is None:
+                    break
+
+        resultados['paginar_tudo_50'] = medir(percorrer, repeticoes)
+        resultados['arvore_raiz'] = medir(lambda: indice.arvore(1), repeticoes)
+    for resultado in resultados.values():
+        resultado['processos'] = n
+    return resultados
+
+
+# --- HTTP --------------------------------------------------------------------
+
+def _cliente(host, porta, caminhos, requisicoes, tempos, erros):
+    conexao = None
+    for i in range(requisicoes):
+        caminho = caminhos[i % len(caminhos)]
+        inicio = time.perf_counter()
+        try:
+            if conexao is None:
+                conexao = http.client.HTTPConnection(host, porta, timeout=30)
+            conexao.request('GET', caminho)
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status != 200:
+                erros[caminho] += 1
+            if resposta.will_close:
+                conexao.close()
+                conexao = None
+        except (OSError, http.client.HTTPException):
+            erros[caminho] += 1
+            if conexao is not None:
+                conexao.close()
+            conexao = None
+            continue
+        tempos[caminho].append(time.perf_counter() - inicio)
+    if conexao is not None:
+        conexao.close()
+
+
+def carga_http(url, rotas=ROTAS_HTTP, clientes=8, requisicoes=50):
+    """`clientes` threads fazendo `requisicoes` GETs cada; latência e vazão por rota.
+
+    Cada rota é medida separadamente (todos os clientes na mesma rota), para
+    que a vazão de uma rota lenta não contamine as outras.
+    """
+    destino = urllib.parse.urlsplit(url)
+    resultados = {}
+    for rota in rotas:
+        caminho = (destino.path.rstrip('/') or '') + rota
+        tempos = collections.defaultdict(list)
+        erros = collections.Counter()
+        threads = [
+            threading.Thread(target=_cliente, args=(destino.hostname, destino.port or 80, [caminho],
+                                                    requisicoes, tempos, erros))
+            for _ in range(clientes)
+        ]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+        resultado = resumir(tempos[caminho]) if tempos[caminho] else {'n': 0}
+        resultado.update({
+            'clientes': clientes,
+            'erros': erros[caminho],
+            'vazao_rps': round(len(tempos[caminho]) / duracao, 1) if duracao > 0 else None
+        })
+        resultados[rota] = resultado
+    return resultados
+
+
+def benchmark_http(clientes=8, requisicoes=50, processos=5000, url=None):
+    """Teste de carga em um servidor local (ou em `url`, se informado)"""
+    if url is not None:
+        return carga_http(url, clientes=clientes, requisicoes=requisicoes)
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from . import create_app
+    from .backup_new import criar_backup_novo
+    from .coletor import get_coletor
+
+    pilha = contextlib.ExitStack()
+    with pilha:
+        if processos:
+            pilha.enter_context(processos_sinteticos(processos))
+        app = create_app({'IP_PUBLICO_URL': '', 'BACKUP_AGENDA': None})
+        get_coletor().snapshot(timeout=10)
+        # Alguns backups para o /logs ter o que listar
+        for _ in range(10):
+            criar_backup_novo()
+        # Sem a linha de log por requisição (custo de I/O que não é da aplicação)
+        silencioso = type('RequisicaoSilenciosa', (WSGIRequestHandler,), {'log_request': lambda *a, **k: None})
+        servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=silencioso)
+        thread = threading.Thread(target=servidor.serve_forever, name='taskmonitor-benchmark', daemon=True)
+        thread.start()
+        try:
+            resultados = carga_http(f'http://127.0.0.1:{servidor.server_port}',
+                                    clientes=clientes, requisicoes=requisicoes)
+        finally:
+            servidor.shutdown()
+            get_coletor().parar()
+    for resultado in resultados.values():
+        resultado['processos'] = processos or len(psutil.pids())
+    return resultados
+
+
+# --- execução e comparação -----------------------------------------------------
+
+def _commit():
+    try:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=raiz, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def executar_benchmark(secoes=SECOES, repeticoes=30, processos=5000, clientes=8, requisicoes=50, url=None):
+    """Roda as seções pedidas numa pasta temporária (banco e backups descartáveis)"""
+    resultado = {
+        'versao': VERSAO_FORMATO,
+        'criado_em': datetime.datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': psutil.cpu_count(logical=True),
+            'psutil': psutil.__version__,
+            'commit': _commit()
+        },
+        'parametros': {'repeticoes': repeticoes, 'processos': processos, 'clientes': clientes,
+                       'requisicoes': requisicoes, 'url': url},
+        'resultados': {}
+    }
+    pasta_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        try:
+            if 'coletores' in secoes:
+                print("[INFO] Benchmark: coletores...")
+                resultado['resultados']['coletores'] = benchmark_coletores(repeticoes)
+            if 'processos' in secoes:
+                print(f"[INFO] Benchmark: {processos} processos sintéticos...")
+                resultado['resultados']['processos'] = benchmark_processos(processos or 5000, repeticoes)
+            if 'http' in secoes:
+                print(f"[INFO] Benchmark: HTTP ({clientes} clientes x {requisicoes} requisições por rota)...")
+                resultado['resultados']['http'] = benchmark_http(clientes, requisicoes, processos, url)
+        finally:
+            os.chdir(pasta_original)
+    return resultado
+
+
+def comparar(atual, base, tolerancia=0.25):
+    """Casos que ficaram mais de `tolerancia` (fração) mais lentos que a referência"""
+    regressoes = []
+    for secao, casos in atual['resultados'].items():
+        metrica = METRICA_COMPARACAO[secao]
+        anteriores = base.get('resultados', {}).get(secao, {})
+        for caso, medida in casos.items():
+            novo = medida.get(metrica)
+            antigo = anteriores.get(caso, {}).get(metrica)
+            if novo is None or antigo is None:
+                continue
+            if novo > antigo * (1 + tolerancia) and novo - antigo > DIFERENCA_MINIMA_MS:
+                regressoes.append({
+                    'secao': secao,
+                    'caso': caso,
+                    'metrica': metrica,
+                    'base': antigo,
+                    'atual': novo,
+                    'variacao': round(novo / antigo - 1, 3) if antigo else None
+                })
+    return regressoes
+
+
+def salvar_resultado(resultado, caminho):
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+def formatar_resultado(resultado):
+    """Tabela de texto para o terminal"""
+    linhas = []
+    for secao, casos in resultado['resultados'].items():
+        linhas.append(f'\n== {secao} ==')
+        for caso, m in casos.items():
+            if 'n' in m and not m['n']:
+                linhas.append(f'  {caso:<32} sem respostas ({m.get("erros", 0)} erros)')
+                continue
+            texto = f'  {caso:<32} mediana {m["mediana_ms"]:>9.3f} ms  p99 {m["p99_ms"]:>9.3f} ms'
+            if 'alocacao_pico_kb' in m:
+                texto += f'  pico {m["alocacao_pico_kb"]:>9.1f} KB'
+            if 'vazao_rps' in m:
+                texto += f'  {m["vazao_rps"]:>8.1f} req/s  erros {m["erros"]}'
+            linhas.append(texto)
+    return '\n'.join(linhas)
@@ -0,0 +1,201 @@
+import bisect
+import datetime
+import os
+import re
+import struct
+import threading
+from .backup_new import renderizar_resumo
+from .registro_backup import get_log, EXTENSAO_INDICE, TAMANHO_ENTRADA, FORMATO_INDICE
+
+PADRAO_LEGADO = re.compile(r'^resumo_backup_(\d{8}_\d{6})\.txt$')
+
+
+class CatalogoBackup:
+    """Catálogo em memória dos backups, ordenado por data.
+
+    Fontes: o índice do log append-only (lido de forma incremental: só os
+    bytes novos de cada `.idx`) e os antigos `resumo_backup_*.txt`, cuja
+    data vem do nome do arquivo. A sincronização com o disco custa alguns
+    `stat` por consulta, então listar os backups recentes não depende de
+    quantos arquivos existem na pasta.
+    """
+
+    def __init__(self, log=None, pasta_legado='backups'):
+        self.log = log or get_log()
+        self.pasta_legado = pasta_legado
+        self._lock = threading.Lock()
+        self._chaves = []
+        self._itens = {}
+        self._lidos_indice = {}
+        self._mtime_segmentos = None
+        self._mtime_legado = None
+        self._ultimo_segmento = None
+
+    # --- sincronização -------------------------------------------------
+
+    def _adicionar(self, ts, item_id, tamanho, origem, local):
+        if item_id in self._itens:
+            return
+        self._itens[item_id] = {'ts': ts, 'tamanho': tamanho, 'origem': origem, 'local': local}
+        bisect.insort(self._chaves, (ts, item_id))
+
+    def _remover(self, item_id):
+        item = self._itens.pop(item_id, None)
+        if item is not None:
+            posicao = bisect.bisect_left(self._chaves, (item['ts'], item_id))
+            if posicao < len(self._chaves) and self._chaves[posicao][1] == item_id:
+                del self._chaves[posicao]
+
+    def _ler_indice_novo(self, segmento):
+        """Lê apenas as entradas do índice que ainda não foram catalogadas"""
+        caminho = os.path.join(self.log.pasta, segmento + EXTENSAO_INDICE)
+        lidos = self._lidos_indice.get(segmento, 0)
+        try:
+            with open(caminho, 'rb') as f:
+                f.seek(lidos)
+                dados = f.read()
+        except FileNotFoundError:
+            return
+        dados = dados[:len(dados) - len(dados) % TAMANHO_ENTRADA]
+        for ts, offset, tamanho in struct.iter_unpack(FORMATO_INDICE, dados):
+            self._adicionar(ts, f'{segmento}@{offset}', tamanho, 'log', (segmento, offset, tamanho))
+        self._lidos_indice[segmento] = lidos + len(dados)
+
+    def _sincronizar_log(self):
+        mtime = os.stat(self.log.pasta).st_mtime_ns
+        if mtime != self._mtime_segmentos:
+            # Segmento criado ou apagado: relê a lista (raro)
+            segmentos = self.log.segmentos()
+            for segmento in set(self._lidos_indice) - set(segmentos):
+                del self._lidos_indice[segmento]
+                for item_id in [i for i in self._itens if i.startswith(segmento + '@')]:
+                    self._remover(item_id)
+            for segmento in segmentos:
+                self._ler_indice_novo(segmento)
+            self._ultimo_segmento = segmentos[-1] if segmentos else None
+            self._mtime_segmentos = mtime
+        elif self._ultimo_segmento is not None:
+            # Caso comum: só o segmento atual cresce
+            self._ler_indice_novo(self._ultimo_segmento)
+
+    def _sincronizar_legado(self):
+        try:
+            mtime = os.stat(self.pasta_legado).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime_legado:
+            return
+        presentes = set()
+        with os.scandir(self.pasta_legado) as entradas:
+            for entrada in entradas:
+                correspondencia = PADRAO_LEGADO.match(entrada.name)
+                if not correspondencia:
+                    continue
+                presentes.add(entrada.name)
+                if entrada.name not in self._itens:
+                    ts = datetime.datetime.strptime(correspondencia.group(1), '%Y%m%d_%H%M%S').timestamp()
+                    self._adicionar(ts, entrada.name, entrada.stat().st_size, 'texto', entrada.path)
+        for item_id in [i for i, item in self._itens.items() if item['origem'] == 'texto' and i not in presentes]:
+            self._remover(item_id)
+        self._mtime_legado = mtime
+
+    def sincronizar(self):
+        with self._lock:
+            self._sincronizar_log()
+            self._sincronizar_legado()
+
+    # --- consulta ------------------------------------------------------
+
+    def total(self):
+        self.sincronizar()
+        return len(self._chaves)
+
+    def listar(self, limite=10, cursor=None, inicio=None, fim=None):
+        """Página de backups do mais recente para o mais antigo.
+
+        `cursor` é o valor `proximo_cursor` da página anterior; `inicio`/`fim`
+        filtram por data (epoch). Retorna (itens, proximo_cursor).
+        """
+        self.sincronizar()
+        with self._lock:
+            chaves = self._chaves
+            limite_superior = len(chaves)
+            if fim is not None:
+                limite_superior = bisect.bisect_right(chaves, (fim, '\uffff'))
+            if cursor is not None:
+                limite_superior = min(limite_superior, bisect.bisect_left(chaves, decodificar_cursor(cursor)))
+            limite_inferior = 0
+            if inicio is not None:
+                limite_inferior = bisect.bisect_left(chaves, (inicio, ''))
+
+            posicao_inicial = max(limite_inferior, limite_superior - limite)
+            pagina = chaves[posicao_inicial:limite_superior]
+            itens = [self._descrever(ts, item_id) for ts, item_id in reversed(pagina)]
+
+        proximo = None
+        if pagina and posicao_inicial > limite_inferior:
+            proximo = codificar_cursor(pagina[0])
+        return itens, proximo
+
+    def _descrever(self, ts, item_id):
+        item = self._itens[item_id]
+        return {
+            'id': item_id,
+            'ts': ts,
+            'data': datetime.datetime.fromtimestamp(ts).strftime('%d/%m/%Y %H:%M:%S'),
+            'tamanho': item['tamanho'],
+            'origem': item['origem']
+        }
+
+    def iterar(self, inicio=None, fim=None):
+        """(ts, id, item) dos backups entre `inicio` e `fim`, do mais antigo para o mais recente"""
+        self.sincronizar()
+        with self._lock:
+            posicao_inicial = 0 if inicio is None else bisect.bisect_left(self._chaves, (inicio, ''))
+            posicao_final = len(self._chaves) if fim is None else bisect.bisect_right(self._chaves, (fim, '\uffff'))
+            itens = [(ts, item_id, self._itens[item_id]) for ts, item_id in self._chaves[posicao_inicial:posicao_final]]
+        yield from itens
+
+    def obter(self, item_id):
+        self.sincronizar()
+        return self._itens.get(item_id)
+
+    def conteudo(self, item_id, tamanho_bloco=8192):
+        """Gerador com o texto de um backup, lido sob demanda"""
+        item = self.obter(item_id)
+        if item is None:
+            raise KeyError(item_id)
+        if item['origem'] == 'log':
+            registro = self.log.ler(*item['local'])
+            # Backups antigos importados guardam o texto original
+            yield registro.get('texto_legado') or renderizar_resumo(registro)
+            return
+        with open(item['local'], 'r', encoding='utf-8') as f:
+            while True:
+                bloco = f.read(tamanho_bloco)
+                if not bloco:
+                    break
+                yield bloco
+
+
+def codificar_cursor(chave):
+    ts, item_id = chave
+    return f'{ts!r}|{item_id}'
+
+
+def decodificar_cursor(cursor):
+    ts, item_id = cursor.split('|', 1)
+    return float(ts), item_id
+
+
+_catalogo = None
+_lock = threading.Lock()
+
+
+def get_catalogo():
+    global _catalogo
+    if _catalogo is None:
+        with _lock:
+            if _catalogo is None:
+                _catalogo = CatalogoBackup()
+    return _catalogo
@@ -0,0 +1,252 @@
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from .opcionais import importar_opcional
+
+# Espera entre verificações dos processos filhos (segundos)
+INTERVALO_SUPERVISAO = 1.0
+
+
+def _ignorar_ctrl_c():
+    # Ctrl+C chega a todo o grupo de processos; quem encerra os filhos é o supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def executar_coletor(porta_coletor, config):
+    """Processo coletor: único que chama o psutil, grava métricas e backups"""
+    _ignorar_ctrl_c()
+    from . import create_app
+    from .coletor import get_coletor
+    from .compartilhado import ServidorSnapshots
+
+    create_app(config)
+    servidor = ServidorSnapshots(get_coletor(), '127.0.0.1', porta_coletor)
+    print(f"[INFO] Coletor publicando snapshots em {servidor.endereco[0]}:{servidor.endereco[1]}")
+    servidor.servir()
+
+
+def limite_stream(threads):
+    """Conexões /stream aceitas por worker do waitress.
+
+    Cada cliente SSE prende uma thread enquanto estiver conectado: no máximo
+    metade das threads vai para o stream, sempre sobrando ao menos 2 para
+    as demais requisições. Além disso, /stream responde 503 e o dashboard
+    volta ao polling.
+    """
+    return max(0, min(threads // 2, threads - 2))
+
+
+def executar_worker(sock, porta_coletor, config, threads):
+    """Processo worker: serve HTTP a partir dos snapshots do coletor"""
+    _ignorar_ctrl_c()
+    from . import create_app
+
+    config = dict(config, COLETOR_REMOTO=f'127.0.0.1:{porta_coletor}')
+    waitress = importar_opcional('waitress')
+    if waitress is not None:
+        config['STREAM_MAX_ASSINANTES'] = limite_stream(threads)
+    app = create_app(config)
+    if waitress is not None:
+        waitress.serve(app, sockets=[sock], threads=threads)
+    else:
+        from werkzeug.serving import make_server
+        host, porta = sock.getsockname()[:2]
+        make_server(host, porta, app, threaded=True, fd=sock.fileno()).serve_forever()
+
+
+def serve(args):
+    """Sobe o coletor e N workers compartilhando o mesmo socket de escuta"""
+    # Coletor e workers protegem a árvore do supervisor no /encerrar
+    config = {'COLETOR_INTERVALO': args.intervalo, 'HUB_ATIVO': args.hub, 'SUPERVISOR_PID': os.getpid()}
+    sock = socket.create_server((args.host, args.port))
+    sock.set_inheritable(True)
+
+    coletor = multiprocessing.Process(
+        target=executar_coletor, args=(args.porta_coletor, config), name='taskmonitor-coletor')
+    coletor.start()
+
+    def iniciar_worker(n):
+        worker = multiprocessing.Process(
+            target=executar_worker, args=(sock, args.porta_coletor, config, args.threads),
+            name=f'taskmonitor-worker-{n}')
+        worker.start()
+        return worker
+
+    workers = [iniciar_worker(n) for n in range(args.workers)]
+    print(f"[INFO] TaskMonitor em http://{args.host}:{args.port} ({args.workers} worker(s))")
+
+    try:
+        while True:
+            time.sleep(INTERVALO_SUPERVISAO)
+            # Reinicia processos que morreram
+            if not coletor.is_alive():
+                print(f"❌ Processo coletor encerrou (código {coletor.exitcode}), reiniciando")
+                coletor = multiprocessing.Process(
+                    target=executar_coletor, args=(args.porta_coletor, config), name='taskmonitor-coletor')
+                coletor.start()
+            for n, worker in enumerate(workers):
+                if not worker.is_alive():
+                    print(f"❌ Worker {n} encerrou (código {worker.exitcode}), reiniciando")
+                    workers[n] = iniciar_worker(n)
+    except KeyboardInterrupt:
+        print("[INFO] Encerrando TaskMonitor...")
+    finally:
+        for processo in [coletor] + workers:
+            processo.terminate()
+        for processo in [coletor] + workers:
+            processo.join(5)
+        sock.close()
+
+
+def agente(args):
+    """Modo agente (sem interface web): coleta e envia lotes para um hub"""
+    from .coletor import iniciar_coletor
+    from .frota import Agente
+
+    coletor = iniciar_coletor(args.intervalo)
+    enviador = Agente(args.hub, args.id, args.envio, args.token)
+    coletor.assinar(enviador.registrar_snapshot)
+    enviador.iniciar()
+    print(f"[INFO] Agente '{enviador.host_id}' enviando para {args.hub} a cada {args.envio:.0f} s")
+    try:
+        while True:
+            time.sleep(INTERVALO_SUPERVISAO)
+    except KeyboardInterrupt:
+        print("[INFO] Encerrando agente (enviando amostras pendentes)...")
+        coletor.parar()
+        enviador.parar()
+
+
+def partida(args):
+    """Mede a partida a frio de cada modo e falha se passar do orçamento"""
+    from .partida import verificar_partida
+
+    orcamento = {}
+    if args.orcamento_pacote is not None:
+        orcamento['pacote'] = args.orcamento_pacote
+    if args.orcamento_cli is not None:
+        orcamento['cli'] = args.orcamento_cli
+    if args.orcamento_agente is not None:
+        orcamento['agente'] = args.orcamento_agente
+    if args.orcamento_servidor is not None:
+        orcamento['servidor'] = args.orcamento_servidor
+    ok, resultados = verificar_partida(orcamento, args.repeticoes)
+    for r in resultados:
+        extra = f" (importou {', '.join(r['proibidos_carregados'])})" if r['proibidos_carregados'] else ''
+        print(f"{'✅' if r['ok'] else '❌'} {r['modo']:<9} {r['segundos']:.3f} s / orçamento {r['orcamento']:.1f} s{extra}")
+    raise SystemExit(0 if ok else 1)
+
+
+def benchmark(args):
+    """Roda o benchmark, salva o JSON e compara com uma execução de referência"""
+    import datetime
+    import json
+    import os
+    from .benchmark import SECOES, comparar, executar_benchmark, formatar_resultado, salvar_resultado
+
+    secoes = [s for s in args.secoes.split(',') if s]
+    invalidas = [s for s in secoes if s not in SECOES]
+    if invalidas:
+        raise SystemExit(f"❌ Seções inválidas: {', '.join(invalidas)} (use {', '.join(SECOES)})")
+    saida = os.path.abspath(args.saida or os.path.join(
+        'benchmarks', f'benchmark_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.json'))
+
+    resultado = executar_benchmark(secoes, args.repeticoes, args.processos, args.clientes,
+                                   args.requisicoes, args.url)
+    print(formatar_resultado(resultado))
+    salvar_resultado(resultado, saida)
+    print(f"\n[INFO] Resultado salvo em {saida}")
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            regressoes = comparar(resultado, json.load(f), args.tolerancia)
+        for r in regressoes:
+            print(f"❌ Regressão em {r['secao']}/{r['caso']}: {r['metrica']} {r['base']} -> {r['atual']} "
+                  f"(+{r['variacao'] * 100:.0f}%)")
+        if regressoes:
+            raise SystemExit(1)
+        print(f"✅ Sem regressões acima de {args.tolerancia * 100:.0f}% em relação a {args.base}")
+
+
+def importar_legado(args):
+    """Converte os backups antigos (system_data_*.json, resumo_backup_*.txt, backup_*.txt) para o log"""
+    from .exportacao import importar_legado as importar
+
+    pastas = [p for p in args.pastas.split(',') if p]
+    importados, erros = importar(pastas, args.log, mover=not args.manter)
+    print(f"{'✅' if not erros else '⚠️'} {importados} backups importados para {args.log}"
+          + (f", {erros} com erro" if erros else ''))
+    if importados and args.manter:
+        print("[INFO] Originais mantidos: eles aparecerão em dobro em /logs e /api/backups")
+    raise SystemExit(1 if erros else 0)
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog='taskmonitor', description='TaskMonitor Pro')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_serve = subcomandos.add_parser('serve', help='servidor de produção (coletor + workers)')
+    p_serve.add_argument('--host', default='127.0.0.1')
+    p_serve.add_argument('--port', type=int, default=5000)
+    p_serve.add_argument('--workers', type=int, default=2, help='processos HTTP (padrão: 2)')
+    p_serve.add_argument('--threads', type=int, default=8, help='threads por worker (waitress; metade delas, no máximo, para o /stream)')
+    p_serve.add_argument('--porta-coletor', type=int, default=5055,
+                         help='porta local onde o coletor publica os snapshots')
+    p_serve.add_argument('--intervalo', type=float, default=1.0, help='intervalo de coleta em segundos')
+    p_serve.add_argument('--hub', action='store_true', help='aceita lotes de agentes (/api/agentes/ingestao)')
+    p_serve.set_defaults(funcao=serve)
+
+    p_agente = subcomandos.add_parser('agente', help='coleta sem interface web e envia para um hub')
+    p_agente.add_argument('--hub', required=True, help='URL do TaskMonitor hub (ex.: http://10.0.0.5:5000)')
+    p_agente.add_argument('--id', default=None, help='identificador do host (padrão: hostname)')
+    p_agente.add_argument('--intervalo', type=float, default=1.0, help='intervalo de coleta em segundos')
+    p_agente.add_argument('--envio', type=float, default=10.0, help='segundos entre envios de lote')
+    p_agente.add_argument('--token', default=None, help='token do hub (HUB_TOKEN)')
+    p_agente.set_defaults(funcao=agente)
+
+    p_partida = subcomandos.add_parser('partida', help='verifica o tempo de partida a frio de cada modo')
+    p_partida.add_argument('--repeticoes', type=int, default=3, help='partidas por modo (vale a mais rápida)')
+    p_partida.add_argument('--orcamento-pacote', type=float, default=None, help='limite do `import app` (s)')
+    p_partida.add_argument('--orcamento-cli', type=float, default=None, help='limite do modo CLI (s)')
+    p_partida.add_argument('--orcamento-agente', type=float, default=None, help='limite do modo agente (s)')
+    p_partida.add_argument('--orcamento-servidor', type=float, default=None, help='limite do create_app (s)')
+    p_partida.set_defaults(funcao=partida)
+
+    p_bench = subcomandos.add_parser('benchmark', help='mede coletores, processos e rotas HTTP (salva JSON)')
+    p_bench.add_argument('--secoes', default='coletores,processos,http',
+                         help='seções separadas por vírgula (coletores, processos, http)')
+    p_bench.add_argument('--saida', default=None, help='arquivo JSON (padrão: benchmarks/benchmark_<data>.json)')
+    p_bench.add_argument('--base', default=None, help='JSON de uma execução anterior para comparar')
+    p_bench.add_argument('--tolerancia', type=float, default=0.25,
+                         help='piora relativa aceita antes de acusar regressão (padrão: 0.25)')
+    p_bench.add_argument('--repeticoes', type=int, default=30, help='chamadas cronometradas por caso')
+    p_bench.add_argument('--processos', type=int, default=5000,
+                         help='processos sintéticos (0 usa os processos reais no teste HTTP)')
+    p_bench.add_argument('--clientes', type=int, default=8, help='clientes HTTP simultâneos')
+    p_bench.add_argument('--requisicoes', type=int, default=50, help='requisições por cliente e rota')
+    p_bench.add_argument('--url', default=None, help='testa um servidor já em execução em vez de um local')
+    p_bench.set_defaults(funcao=benchmark)
+
+    p_importar = subcomandos.add_parser('importar-legado',
+                                        help='converte os backups antigos (.json/.txt) para o log de backups')
+    p_importar.add_argument('--pastas', default='backup,backups', help='pastas com os backups antigos')
+    p_importar.add_argument('--log', default='backups/segmentos', help='pasta do log de backups')
+    p_importar.add_argument('--manter', action='store_true',
+                            help='não move os originais para <pasta>/importados/')
+    p_importar.set_defaults(funcao=importar_legado)
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'workers', 1) < 1:
+        parser.error('--workers deve ser >= 1')
+    args.funcao(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import threading
+import time
+from . import monitor
+from .amostragem import AmostragemAdaptativa, AgendaPartes
+from .instrumentacao import get_instrumentacao
+from .sensores import get_gerenciador
+from .processos import get_tabela
+from .taxas import CalculadoraTaxas
+
+
+class Coletor(threading.Thread):
+    """Thread de fundo que coleta o estado do sistema.
+
+    As rotas leem o último snapshot publicado em vez de chamar o psutil
+    a cada requisição. Os contadores baratos são lidos a cada tick, com o
+    intervalo ajustado pela `AmostragemAdaptativa` (rajada com alguém
+    olhando ou métrica mudando rápido, recuo com o host ocioso); processos,
+    sensores e partições seguem agendas próprias, mais lentas. Cada
+    snapshot leva em `amostragem` o tempo que representa e o que foi
+    atualizado nele.
+    """
+
+    def __init__(self, intervalo=1.0, adaptativo=True, intervalos_lentos=None, **opcoes_amostragem):
+        super().__init__(name='taskmonitor-coletor', daemon=True)
+        self.intervalo = intervalo
+        self.amostragem = AmostragemAdaptativa(intervalo, **opcoes_amostragem) if adaptativo else None
+        self.agenda = AgendaPartes(intervalos_lentos)
+        self._parar = threading.Event()
+        self._snapshot = None
+        self._pronto = threading.Event()
+        self._assinantes = []
+        self._taxas = CalculadoraTaxas()
+        self._partes = {}
+        self._ultimo_tick = None
+        self._processos_em = None
+        self._cpu = monitor.MedidorCpu()
+
+    def assinar(self, callback):
+        """Registra uma função chamada (na thread do coletor) a cada novo snapshot"""
+        if callback not in self._assinantes:
+            self._assinantes.append(callback)
+
+    def registrar_espectador(self):
+        """Alguém está olhando o dashboard: passa (ou continua) na amostragem rápida"""
+        if self.amostragem is not None:
+            self.amostragem.registrar_espectador()
+
+    @property
+    def intervalo_atual(self):
+        return self.amostragem.intervalo_atual if self.amostragem is not None else self.intervalo
+
+    def run(self):
+        # Sonda os backends de sensores na própria thread do coletor (WMI/COM)
+        get_gerenciador()
+        while not self._parar.is_set():
+            inicio = time.monotonic()
+            intervalo = self.coletar()
+            decorrido = time.monotonic() - inicio
+            get_instrumentacao().registrar_tick(decorrido, intervalo)
+            self._parar.wait(max(0.0, intervalo - decorrido))
+
+    def _coletar_partes(self, agora):
+        """Executa as partes caras vencidas; retorna os nomes das que foram atualizadas"""
+        instrumentacao = get_instrumentacao()
+        atualizadas = []
+        for nome in self.agenda.vencidas(agora):
+            try:
+                if nome == 'processos':
+                    with instrumentacao.medir('coletores', 'tabela_processos'):
+                        get_tabela().atualizar()
+                    self._processos_em = time.time()
+                else:
+                    self._partes[nome] = monitor.PARTES_LENTAS[nome]()
+                atualizadas.append(nome)
+            except Exception as e:
+                instrumentacao.contar(f'erros.{nome}')
+                print(f"❌ Erro ao coletar {nome}: {e}")
+                self._partes.setdefault(nome, monitor.PARTES_VAZIAS.get(nome))
+        return atualizadas
+
+    def coletar(self):
+        """Executa uma coleta, publica o novo snapshot e retorna o intervalo até a próxima"""
+        instrumentacao = get_instrumentacao()
+        agora = time.monotonic()
+        try:
+            contadores = monitor.coletar_contadores(self._cpu)
+            atualizadas = self._coletar_partes(agora)
+            dados = monitor.montar_amostra(contadores, self._partes)
+        except Exception as e:
+            instrumentacao.contar('erros.coletor')
+            print(f"❌ Erro no coletor: {e}")
+            return self.intervalo_atual
+        dados['coletado_em'] = time.time()
+        dados['_monotonic'] = time.monotonic()
+        # Contadores cumulativos de rede/disco -> taxas por segundo
+        dados['taxas'] = self._taxas.atualizar(dados, dados['_monotonic'])
+
+        # Tempo que esta amostra representa: desde a anterior, limitado a dois
+        # intervalos (uma pausa longa não vira uma amostra de minutos); a primeira vale um intervalo
+        previsto = self.intervalo_atual
+        representa = previsto
+        if self._ultimo_tick is not None:
+            representa = min(agora - self._ultimo_tick, 2 * previsto)
+        self._ultimo_tick = agora
+        intervalo = self.amostragem.proximo(dados['status'], agora) if self.amostragem is not None else self.intervalo
+        modo = self.amostragem.modo if self.amostragem is not None else 'fixo'
+        instrumentacao.contar(f'coletor.modo.{modo}')
+        dados['amostragem'] = {
+            'modo': modo,
+            'intervalo': round(representa, 3),
+            'proximo': intervalo,
+            'atualizados': atualizadas,
+            'processos_em': self._processos_em,
+            'intervalos_lentos': self.agenda.intervalos
+        }
+        # A troca da referência é atômica; leitores nunca veem um snapshot parcial
+        self._snapshot = dados
+        self._pronto.set()
+
+        for callback in self._assinantes:
+            nome = getattr(callback, '__qualname__', repr(callback))
+            try:
+                with instrumentacao.medir('assinantes', nome):
+                    callback(dados)
+            except Exception as e:
+                instrumentacao.contar(f'erros.assinantes.{nome}')
+                print(f"❌ Erro em assinante do coletor: {e}")
+        return intervalo
+
+    def snapshot(self, timeout=None):
+        """Retorna o último snapshot (aguarda o primeiro, se necessário)"""
+        if self._snapshot is None:
+            self._pronto.wait(timeout)
+        return self._snapshot
+
+    def parar(self):
+        self._parar.set()
+
+
+_coletor = None
+_lock = threading.Lock()
+
+
+def iniciar_coletor(intervalo=1.0, **kwargs):
+    """Inicia o coletor global (apenas uma vez por processo)"""
+    global _coletor
+    with _lock:
+        if _coletor is None or not _coletor.is_alive():
+            _coletor = Coletor(intervalo, **kwargs)
+            _coletor.start()
+    return _coletor
+
+
+def definir_coletor(coletor):
+    """Instala outra fonte de snapshots (ex.: ColetorRemoto nos workers)"""
+    global _coletor
+    with _lock:
+        _coletor = coletor
+    return coletor
+
+
+def get_coletor():
+    return _coletor
+
+
+def get_snapshot():
+    """Retorna o snapshot atual com a idade em segundos.
+
+    Sem coletor ativo (scripts, testes), faz uma coleta síncrona.
+    """
+    dados = _coletor.snapshot(timeout=5) if _coletor is not None else None
+    if dados is None:
+        dados = monitor.coletar_amostra()
+        dados['coletado_em'] = time.time()
+        dados['_monotonic'] = time.monotonic()
+        # Uma única leitura não tem taxas
+        dados['taxas'] = CalculadoraTaxas().atualizar(dados, dados['_monotonic'])
+
+    snapshot = dict(dados)
+    snapshot['idade_snapshot'] = round(time.monotonic() - snapshot.pop('_monotonic'), 3)
+    return snapshot
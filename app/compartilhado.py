@@ -0,0 +1,315 @@
+import json
+import socket
+import struct
+import threading
+import time
+from .agendador_backup import get_agendador
+from .frota import get_frota
+from .historico_processos import get_historico
+from .instrumentacao import get_instrumentacao
+from .processos import get_tabela
+
+# Quadro: tamanho (uint32, big-endian) + JSON
+CABECALHO = struct.Struct('>I')
+
+
+def _quadro(dados):
+    corpo = json.dumps(dados, separators=(',', ':')).encode('utf-8')
+    return CABECALHO.pack(len(corpo)) + corpo
+
+
+def _codificar(snapshot, processos):
+    dados = dict(snapshot)
+    dados.pop('_monotonic', None)
+    return _quadro({'snapshot': dados, 'processos': processos})
+
+
+def _ler_exato(conexao, tamanho):
+    partes = []
+    while tamanho:
+        parte = conexao.recv(min(tamanho, 65536))
+        if not parte:
+            raise ConnectionError('conexão encerrada pelo coletor')
+        partes.append(parte)
+        tamanho -= len(parte)
+    return b''.join(partes)
+
+
+def _ler_quadro(conexao):
+    tamanho, = CABECALHO.unpack(_ler_exato(conexao, CABECALHO.size))
+    return json.loads(_ler_exato(conexao, tamanho))
+
+
+class ServidorSnapshots:
+    """Publica os snapshots do coletor para os workers por um socket local.
+
+    Roda no processo coletor. Cada snapshot é codificado uma única vez;
+    cada worker conectado tem uma thread de envio que sempre manda o quadro
+    mais recente (um worker lento pula quadros em vez de acumulá-los).
+
+    O primeiro quadro de cada conexão diz o que o worker quer: `snapshots`
+    abre o fluxo; os demais (backups, histórico de processos) são pedidos
+    de uma resposta só, atendidos por quem tem o estado: este processo.
+    """
+
+    def __init__(self, coletor, host='127.0.0.1', porta=0):
+        self.coletor = coletor
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._quadro = None
+        self._com_processos = False
+        # Última amostra e última tabela de processos publicadas: o primeiro
+        # quadro de cada conexão sempre leva a tabela, mesmo fora do tick dela
+        self._ultimo = None
+        self._processos = None
+        self._socket = socket.create_server((host, porta))
+        self.endereco = self._socket.getsockname()[:2]
+        coletor.assinar(self.publicar)
+
+    def publicar(self, snapshot):
+        # A tabela de processos tem agenda própria: só vai no quadro quando foi atualizada
+        amostragem = snapshot.get('amostragem')
+        processos = None
+        if amostragem is None or 'processos' in amostragem['atualizados']:
+            processos = get_tabela().listar()
+        quadro = _codificar(snapshot, processos)
+        with self._cond:
+            self._seq += 1
+            self._quadro = quadro
+            self._com_processos = processos is not None
+            self._ultimo = snapshot
+            if processos is not None:
+                self._processos = processos
+            self._cond.notify_all()
+
+    def _enviar(self, conexao):
+        visto = 0
+        while True:
+            with self._cond:
+                while self._seq == visto:
+                    self._cond.wait()
+                primeiro = visto == 0
+                visto, quadro = self._seq, self._quadro
+                if primeiro and not self._com_processos and self._processos is not None:
+                    # Worker novo (ou reconectado): sem isso ficaria sem processos até o próximo tick deles
+                    ultimo, processos = self._ultimo, self._processos
+                    quadro = None
+            if quadro is None:
+                quadro = _codificar(ultimo, processos)
+            conexao.sendall(quadro)
+
+    def _responder(self, pedido):
+        tipo = pedido.get('tipo')
+        if tipo in ('backup', 'status_backup', 'backup_sincrono'):
+            agendador = get_agendador()
+            if agendador is None:
+                return {'erro': 'Agendador de backups desativado'}
+            if tipo == 'backup':
+                return {'resultado': agendador.enviar(pedido.get('origem', 'manual'))}
+            if tipo == 'status_backup':
+                return {'resultado': agendador.status(pedido.get('id'))}
+            return {'resultado': agendador.executar()}
+        if tipo in ('historico_processo', 'top_consumidores'):
+            historico = get_historico()
+            if historico is None:
+                return {'erro': 'Histórico de processos desativado'}
+            if tipo == 'historico_processo':
+                return {'resultado': historico.serie(pedido['pid'], pedido.get('create_time'), pedido.get('desde'))}
+            try:
+                return {'resultado': historico.top_consumidores(pedido['janela'], pedido['n'], pedido['ordem'])}
+            except ValueError as e:
+                return {'erro': str(e)}
+        if tipo in ('ingestao', 'frota'):
+            frota = get_frota()
+            if frota is None:
+                return {'erro': 'Hub desativado'}
+            if tipo == 'frota':
+                return {'resultado': frota.visao_geral()}
+            try:
+                return {'resultado': frota.ingerir(pedido['lote'], pedido.get('origem'))}
+            except (KeyError, TypeError, ValueError) as e:
+                return {'erro': f'Lote inválido: {e}'}
+        if tipo == 'espectador':
+            self.coletor.registrar_espectador()
+            return {'resultado': True}
+        if tipo == 'perf':
+            instrumentacao = get_instrumentacao()
+            if pedido.get('zerar'):
+                instrumentacao.zerar()
+            if pedido.get('profiler') is True:
+                instrumentacao.profiler.iniciar(pedido.get('intervalo'))
+            elif pedido.get('profiler') is False:
+                instrumentacao.profiler.parar()
+            return {'resultado': instrumentacao.estado()}
+        return {'erro': f'Pedido desconhecido: {tipo!r}'}
+
+    def _atender(self, conexao):
+        try:
+            conexao.settimeout(10)
+            pedido = _ler_quadro(conexao)
+            conexao.settimeout(None)
+            if pedido.get('tipo') == 'snapshots':
+                self._enviar(conexao)
+            else:
+                conexao.sendall(_quadro(self._responder(pedido)))
+        except (OSError, ConnectionError, ValueError):
+            pass
+        finally:
+            conexao.close()
+
+    def servir(self):
+        """Aceita workers indefinidamente (bloqueia)"""
+        while True:
+            conexao, _ = self._socket.accept()
+            conexao.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._atender, args=(conexao,), name='taskmonitor-envio', daemon=True).start()
+
+    def iniciar(self):
+        threading.Thread(target=self.servir, name='taskmonitor-servidor-snapshots', daemon=True).start()
+        return self
+
+
+class ColetorRemoto(threading.Thread):
+    """Fonte de snapshots dos workers: recebe do processo coletor em vez de chamar o psutil.
+
+    Expõe a mesma interface do `Coletor` (`snapshot()`, `assinar()`), então
+    rotas, stream e demais assinantes funcionam sem mudanças.
+    """
+
+    def __init__(self, host='127.0.0.1', porta=5055, espera_reconexao=1.0):
+        super().__init__(name='taskmonitor-coletor-remoto', daemon=True)
+        self.endereco = (host, porta)
+        self.espera_reconexao = espera_reconexao
+        self._snapshot = None
+        self._pronto = threading.Event()
+        self._assinantes = []
+        self._espectador_em = 0.0
+
+    def assinar(self, callback):
+        if callback not in self._assinantes:
+            self._assinantes.append(callback)
+
+    def snapshot(self, timeout=None):
+        if self._snapshot is None:
+            self._pronto.wait(timeout)
+        return self._snapshot
+
+    def registrar_espectador(self):
+        """Avisa o processo coletor que há alguém no dashboard (no máximo a cada 2 s)"""
+        agora = time.monotonic()
+        if agora - self._espectador_em < 2.0:
+            return
+        self._espectador_em = agora
+        threading.Thread(target=self._avisar_espectador, name='taskmonitor-espectador', daemon=True).start()
+
+    def _avisar_espectador(self):
+        try:
+            pedir(self.endereco, {'tipo': 'espectador'}, timeout=5.0)
+        except (OSError, ConnectionError, ValueError, RuntimeError):
+            pass
+
+    def _receber(self, conexao):
+        conexao.sendall(_quadro({'tipo': 'snapshots'}))
+        while True:
+            quadro = _ler_quadro(conexao)
+            dados = quadro['snapshot']
+            # Converte a data da coleta para o relógio monotônico deste processo
+            dados['_monotonic'] = time.monotonic() - max(0.0, time.time() - dados['coletado_em'])
+            if quadro['processos'] is not None:
+                atualizado_em = dados.get('amostragem', {}).get('processos_em') or dados['coletado_em']
+                get_tabela().carregar(quadro['processos'], atualizado_em)
+            self._snapshot = dados
+            self._pronto.set()
+            for callback in self._assinantes:
+                try:
+                    callback(dados)
+                except Exception as e:
+                    print(f"❌ Erro em assinante do coletor: {e}")
+
+    def run(self):
+        avisado = False
+        while True:
+            try:
+                with socket.create_connection(self.endereco, timeout=10) as conexao:
+                    conexao.settimeout(None)
+                    avisado = False
+                    self._receber(conexao)
+            except (OSError, ConnectionError, ValueError) as e:
+                # Avisa uma vez por queda, não a cada tentativa
+                if not avisado:
+                    print(f"[INFO] Coletor remoto indisponível em {self.endereco[0]}:{self.endereco[1]}: {e}")
+                    avisado = True
+            time.sleep(self.espera_reconexao)
+
+
+def pedir(endereco, pedido, timeout=60.0):
+    """Envia um pedido ao processo coletor e retorna o campo `resultado` da resposta"""
+    with socket.create_connection(endereco, timeout=timeout) as conexao:
+        conexao.sendall(_quadro(pedido))
+        resposta = _ler_quadro(conexao)
+    if 'erro' in resposta:
+        raise RuntimeError(resposta['erro'])
+    return resposta['resultado']
+
+
+class AgendadorRemoto:
+    """Agendador de backups dos workers: repassa os pedidos ao processo coletor.
+
+    Mesma interface usada pelas rotas (`enviar`, `status`, `executar`).
+    """
+
+    def __init__(self, host='127.0.0.1', porta=5055, timeout=60.0):
+        self.endereco = (host, porta)
+        self.timeout = timeout
+
+    def enviar(self, origem='manual'):
+        return pedir(self.endereco, {'tipo': 'backup', 'origem': origem}, self.timeout)
+
+    def status(self, tarefa_id):
+        return pedir(self.endereco, {'tipo': 'status_backup', 'id': tarefa_id}, self.timeout)
+
+    def executar(self):
+        try:
+            return pedir(self.endereco, {'tipo': 'backup_sincrono'}, self.timeout)
+        except (OSError, ConnectionError, ValueError, RuntimeError) as e:
+            return f"❌ Erro ao criar backup: {str(e)}"
+
+
+class HistoricoRemoto:
+    """Histórico de processos dos workers: consulta o processo coletor"""
+
+    def __init__(self, host='127.0.0.1', porta=5055, timeout=10.0):
+        self.endereco = (host, porta)
+        self.timeout = timeout
+
+    def serie(self, pid, create_time=None, desde=None):
+        return pedir(self.endereco, {'tipo': 'historico_processo', 'pid': pid,
+                                     'create_time': create_time, 'desde': desde}, self.timeout)
+
+    def top_consumidores(self, janela=3600.0, n=10, ordem='cpu'):
+        try:
+            return pedir(self.endereco, {'tipo': 'top_consumidores', 'janela': janela, 'n': n,
+                                         'ordem': ordem}, self.timeout)
+        except RuntimeError as e:
+            if str(e).startswith('Ordem inválida'):
+                raise ValueError(str(e))
+            raise
+
+
+class FrotaRemota:
+    """Hub nos workers: a frota (e a gravação das séries) fica no processo coletor"""
+
+    def __init__(self, host='127.0.0.1', porta=5055, timeout=30.0):
+        self.endereco = (host, porta)
+        self.timeout = timeout
+
+    def ingerir(self, lote, origem=None):
+        try:
+            return pedir(self.endereco, {'tipo': 'ingestao', 'lote': lote, 'origem': origem}, self.timeout)
+        except RuntimeError as e:
+            if str(e).startswith('Lote inválido'):
+                raise ValueError(str(e))
+            raise
+
+    def visao_geral(self):
+        return pedir(self.endereco, {'tipo': 'frota'}, self.timeout)
@@ -0,0 +1,456 @@
+import csv
+import datetime
+import io
+import itertools
+import json
+import os
+import re
+from .metricas import RESOLUCOES
+from .opcionais import carregar
+from .registro_backup import LogBackup, SUFIXO_LEGADO
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+FONTES = ('metricas', 'backups')
+
+# Colunas de cada fonte: (nome, tipo) com tipo 'i' (inteiro), 'f' (real) ou 's' (texto)
+COLUNAS_METRICAS = (
+    ('ts', 'i'), ('metrica', 's'), ('resolucao', 'i'),
+    ('minimo', 'f'), ('maximo', 'f'), ('media', 'f')
+)
+
+COLUNAS_BACKUP = (
+    ('ts', 'f'),
+    ('cpu_percent', 'f'), ('cpu_nucleos', 'i'), ('cpu_frequencia_mhz', 'f'),
+    ('memoria_total_gb', 'f'), ('memoria_usado_gb', 'f'), ('memoria_disponivel_gb', 'f'), ('memoria_percent', 'f'),
+    ('disco_total_gb', 'f'), ('disco_usado_gb', 'f'), ('disco_livre_gb', 'f'), ('disco_percent', 'f'),
+    ('rede_ip_local', 's'), ('rede_bytes_enviados', 'i'), ('rede_bytes_recebidos', 'i'),
+    ('uptime_horas', 'f'),
+    ('cpu_temperatura', 'f'), ('ram_frequencia_mhz', 'f'), ('ram_energia_w', 'f'), ('bateria_percent', 'f')
+)
+
+# Linhas por bloco enviado (CSV/NDJSON) e por row group (Parquet)
+LINHAS_POR_BLOCO = 2000
+LINHAS_POR_GRUPO = 50000
+
+# Backups antigos aceitos pela importação
+PADRAO_JSON_LEGADO = re.compile(r'^system_data_.*\.json$')
+PADRAO_TEXTO_LEGADO = re.compile(r'^(resumo_backup|backup)_.*\.txt$')
+PASTA_IMPORTADOS = 'importados'
+PADRAO_DATA_LEGADO = re.compile(r'_(\d{8}_\d{6})\.')
+
+PADRAO_NUMERO = re.compile(r'-?\d[\d,]*(?:\.\d+)?')
+PADRAO_PERCENT = re.compile(r'\((-?[\d.]+)%\)')
+PADRAO_PROCESSO = re.compile(r'^\d+\. (.+) \(PID: (\d+)\)$')
+
+
+def resolucao_padrao(inicio, retencao, agora):
+    """Resolução mais fina cuja retenção ainda cobre `inicio`"""
+    for resolucao in sorted(RESOLUCOES):
+        if inicio >= agora - retencao[resolucao]:
+            return resolucao
+    return max(RESOLUCOES)
+
+
+# --- fontes -------------------------------------------------------------
+
+def linhas_metricas(armazem, metricas, inicio, fim, resolucao):
+    """Linhas do histórico, uma métrica por vez, lidas do cursor sob demanda"""
+    for metrica in metricas:
+        for ts, minimo, maximo, media in armazem.iterar(metrica, inicio, fim, resolucao):
+            yield ts, metrica, resolucao, minimo, maximo, media
+
+
+def registros_backup(catalogo, inicio=None, fim=None):
+    """(ts, registro) dos backups do catálogo em ordem cronológica (os .txt são convertidos na hora)"""
+    for ts, item_id, item in catalogo.iterar(inicio, fim):
+        try:
+            if item['origem'] == 'log':
+                registro = catalogo.log.ler(*item['local'])
+            else:
+                registro = ler_backup_texto(item['local'])
+        except Exception as e:
+            print(f"❌ Erro ao ler backup {item_id}: {e}")
+            continue
+        yield ts, registro
+
+
+def _numero(valor):
+    """Sensores e campos antigos podem vir como 'N/A'"""
+    return valor if isinstance(valor, (int, float)) and not isinstance(valor, bool) else None
+
+
+def achatar_registro(ts, registro):
+    """Registro de backup (esquema de montar_registro) como linha na ordem de COLUNAS_BACKUP"""
+    cpu = registro.get('cpu') or {}
+    mem = registro.get('memoria') or {}
+    disk = registro.get('disco') or {}
+    net = registro.get('rede') or {}
+    sensores = registro.get('sensores') or {}
+    energia = sensores.get('ram_energia')
+    bateria = sensores.get('bateria')
+    return (
+        ts,
+        _numero(cpu.get('uso_percent')), _numero(cpu.get('nucleos')), _numero(cpu.get('frequencia_mhz')),
+        _numero(mem.get('total_gb')), _numero(mem.get('usado_gb')), _numero(mem.get('disponivel_gb')),
+        _numero(mem.get('percent_usado')),
+        _numero(disk.get('total_gb')), _numero(disk.get('usado_gb')), _numero(disk.get('livre_gb')),
+        _numero(disk.get('percent_usado')),
+        net.get('ip_local'), _numero(net.get('bytes_enviados')), _numero(net.get('bytes_recebidos')),
+        _numero((registro.get('sistema') or {}).get('uptime_horas')),
+        _numero(sensores.get('cpu_temperatura')),
+        _numero(sensores.get('ram_frequencia')),
+        _numero(energia.get('total_watts')) if isinstance(energia, dict) else None,
+        _numero(bateria.get('percent')) if isinstance(bateria, dict) else None
+    )
+
+
+def colunas_backup(metricas=None):
+    """Índices das colunas pedidas: `cpu` seleciona cpu_percent, cpu_nucleos... (ts sempre vai)"""
+    if not metricas:
+        return list(range(len(COLUNAS_BACKUP)))
+    indices = [
+        i for i, (nome, _) in enumerate(COLUNAS_BACKUP)
+        if i == 0 or any(nome == m or nome.startswith(m + '_') for m in metricas)
+    ]
+    return indices if len(indices) > 1 else None
+
+
+def linhas_backup(registros, indices):
+    for ts, registro in registros:
+        linha = achatar_registro(ts, registro)
+        yield tuple(linha[i] for i in indices)
+
+
+# --- formatos -----------------------------------------------------------
+
+def _lotes(linhas, tamanho):
+    linhas = iter(linhas)
+    while True:
+        lote = list(itertools.islice(linhas, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def gerar_csv(colunas, linhas, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Gerador de blocos CSV (cabeçalho + linhas); memória limitada a um bloco"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    escritor.writerow([nome for nome, _ in colunas])
+    for lote in _lotes(linhas, linhas_por_bloco):
+        escritor.writerows(lote)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _json_texto(valor):
+    return 'null' if valor is None else json.dumps(valor, ensure_ascii=False)
+
+
+def _json_numero(valor):
+    return 'null' if valor is None else repr(valor)
+
+
+def gerar_ndjson(colunas, linhas, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Gerador de blocos NDJSON; o objeto de cada linha sai de um molde pronto (sem dict nem json.dumps por linha)"""
+    molde = '{' + ','.join(f'{json.dumps(nome)}:%s' for nome, _ in colunas) + '}'
+    codificadores = [_json_texto if tipo == 's' else _json_numero for _, tipo in colunas]
+    for lote in _lotes(linhas, linhas_por_bloco):
+        yield ''.join(
+            molde % tuple(codificar(valor) for codificar, valor in zip(codificadores, linha)) + '\n'
+            for linha in lote
+        ).encode('utf-8')
+
+
+class _SaidaBlocos:
+    """Arquivo só de escrita que acumula bytes até serem retirados (destino do ParquetWriter)"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        self._buffer += dados
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def writable(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def retirar(self):
+        dados = bytes(self._buffer)
+        self._buffer.clear()
+        return dados
+
+
+def gerar_parquet(colunas, linhas, linhas_por_grupo=LINHAS_POR_GRUPO):
+    """Gerador de Parquet: cada `linhas_por_grupo` linhas viram um row group enviado em seguida"""
+    pa = carregar('pyarrow')
+    pq = carregar('pyarrow.parquet')
+    tipos = {'i': pa.int64(), 'f': pa.float64(), 's': pa.string()}
+    esquema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas])
+    saida = _SaidaBlocos()
+    escritor = pq.ParquetWriter(saida, esquema, compression='zstd')
+
+    def grupo(valores):
+        escritor.write_batch(pa.record_batch(valores, schema=esquema))
+        return saida.retirar()
+
+    valores = [[] for _ in colunas]
+    try:
+        for linha in linhas:
+            for coluna, valor in zip(valores, linha):
+                coluna.append(valor)
+            if len(valores[0]) >= linhas_por_grupo:
+                yield grupo(valores)
+                valores = [[] for _ in colunas]
+        if valores[0]:
+            yield grupo(valores)
+    finally:
+        escritor.close()
+    yield saida.retirar()
+
+
+def exportar(formato, colunas, linhas):
+    """Gerador de bytes no formato pedido"""
+    if formato == 'csv':
+        return gerar_csv(colunas, linhas)
+    if formato == 'ndjson':
+        return gerar_ndjson(colunas, linhas)
+    if formato == 'parquet':
+        return gerar_parquet(colunas, linhas)
+    raise ValueError(f'Formato inválido: {formato}')
+
+
+# --- backups antigos ----------------------------------------------------
+
+def _pares_texto(texto):
+    """Campos 'Chave: valor' dos relatórios antigos.
+
+    Linhas como '💻 CPU:' abrem uma seção e os itens '- Uso Atual: 2.7%'
+    viram 'cpu.uso atual'; os títulos entre linhas '====' fecham a seção.
+    Retorna (pares, processos do top 10).
+    """
+    pares = {}
+    processos = []
+    secao = ''
+    bloco = ''
+    for linha in texto.splitlines():
+        linha = linha.strip()
+        if not linha or linha.startswith('='):
+            continue
+        processo = PADRAO_PROCESSO.match(linha)
+        if processo:
+            if bloco.startswith('TOP'):
+                processos.append({'pid': int(processo.group(2)), 'nome': processo.group(1),
+                                  'cpu_percent': None, 'memory_percent': None})
+            continue
+        if processos and bloco.startswith('TOP') and linha.startswith('CPU:') and '|' in linha:
+            cpu, ram = linha.split('|', 1)
+            processos[-1]['cpu_percent'] = _extrair_numero(cpu)
+            processos[-1]['memory_percent'] = _extrair_numero(ram)
+            continue
+        if ':' not in linha:
+            bloco, secao = linha, ''
+            continue
+        # Remove emojis e marcadores do começo
+        linha = linha.lstrip('-• ').lstrip()
+        while linha and not linha[0].isalnum():
+            linha = linha[1:].lstrip()
+        if linha.endswith(':'):
+            secao = linha[:-1].lower()
+            continue
+        chave, _, valor = linha.partition(': ')
+        chave = chave.lower()
+        pares[f'{secao}.{chave}' if secao else chave] = valor.strip()
+    return pares, processos
+
+
+def _extrair_numero(texto):
+    if texto is None:
+        return None
+    correspondencia = PADRAO_NUMERO.search(texto)
+    if not correspondencia:
+        return None
+    numero = correspondencia.group(0).replace(',', '')
+    return float(numero) if '.' in numero else int(numero)
+
+
+def _extrair_percent(texto):
+    correspondencia = PADRAO_PERCENT.search(texto or '')
+    return float(correspondencia.group(1)) if correspondencia else None
+
+
+def _data_texto(texto):
+    return datetime.datetime.strptime(texto.strip(), '%d/%m/%Y %H:%M:%S')
+
+
+def ler_backup_texto(caminho):
+    """Converte um resumo_backup_*.txt ou backup_*.txt no esquema de montar_registro.
+
+    Campos que o relatório não tem ficam None; o texto original vai junto
+    (`texto_legado`) para ser exibido como antes em /logs.
+    """
+    with open(caminho, 'r', encoding='utf-8') as f:
+        texto = f.read()
+    pares, processos = _pares_texto(texto)
+    if 'data/hora do backup' in pares:
+        data = _data_texto(pares['data/hora do backup'])
+    elif 'data/hora' in pares:
+        data = _data_texto(pares['data/hora'])
+    else:
+        raise ValueError(f'{os.path.basename(caminho)} não parece um backup do TaskMonitor')
+
+    def numero(*chaves):
+        for chave in chaves:
+            if chave in pares:
+                return _extrair_numero(pares[chave])
+        return None
+
+    boot = pares.get('sistema.boot')
+    energia = numero('energia ram.consumo total', 'energia ram')
+    bateria = numero('bateria.carga')
+    temperatura = numero('temperatura cpu.valor', 'temperatura cpu')
+    frequencia_ram = numero('frequência ram.valor', 'frequência ram')
+    return {
+        'timestamp': data.isoformat(),
+        'data_backup': data.strftime('%Y%m%d_%H%M%S'),
+        'cpu': {
+            'uso_percent': numero('cpu.uso atual', 'cpu'),
+            'nucleos': numero('cpu.núcleos'),
+            'frequencia_mhz': numero('cpu.frequência')
+        },
+        'memoria': {
+            'total_gb': numero('memória.total'),
+            'usado_gb': numero('memória.usado'),
+            'disponivel_gb': numero('memória.disponível'),
+            'percent_usado': _extrair_percent(pares.get('memória.usado')) or numero('memória')
+        },
+        'disco': {
+            'total_gb': numero('disco.total'),
+            'usado_gb': numero('disco.usado'),
+            'livre_gb': numero('disco.livre'),
+            'percent_usado': _extrair_percent(pares.get('disco.usado')) or numero('disco')
+        },
+        'rede': {
+            'ip_local': pares.get('rede.ip local'),
+            'bytes_enviados': numero('rede.bytes enviados'),
+            'bytes_recebidos': numero('rede.bytes recebidos')
+        },
+        'sistema': {
+            'boot_time': _data_texto(boot).isoformat() if boot else None,
+            'uptime_horas': numero('sistema.uptime'),
+            'nome_so': None
+        },
+        'sensores': {
+            'cpu_temperatura': temperatura if temperatura is not None else 'N/A',
+            'ram_frequencia': frequencia_ram if frequencia_ram is not None else 'N/A',
+            'ram_energia': {'total_watts': energia} if energia is not None else 'N/A',
+            'bateria': {'percent': bateria, 'plugged': None, 'time_left': None} if bateria is not None else 'N/A'
+        },
+        'processos_top10': processos,
+        'consumidores_ultima_hora': [],
+        'importado_de': os.path.basename(caminho),
+        'texto_legado': texto
+    }
+
+
+def ler_backup_json(caminho):
+    """backup/system_data_*.json já usa o esquema de montar_registro"""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        registro = json.load(f)
+    if 'timestamp' not in registro:
+        registro['timestamp'] = datetime.datetime.fromtimestamp(os.path.getmtime(caminho)).isoformat()
+    registro['importado_de'] = os.path.basename(caminho)
+    return registro
+
+
+def arquivos_legado(pastas):
+    """(caminho, leitor) dos backups antigos encontrados nas pastas"""
+    for pasta in pastas:
+        if not os.path.isdir(pasta):
+            continue
+        for nome in sorted(os.listdir(pasta)):
+            if PADRAO_JSON_LEGADO.match(nome):
+                yield os.path.join(pasta, nome), ler_backup_json
+            elif PADRAO_TEXTO_LEGADO.match(nome):
+                yield os.path.join(pasta, nome), ler_backup_texto
+
+
+def chave_legado(caminho, registro):
+    """Identifica o snapshot: o sufixo _AAAAMMDD_HHMMSS do nome ou o data_backup.
+
+    O backup antigo gravava cada snapshot duas vezes (system_data_X.json e
+    resumo_backup_X.txt); a hora do texto pode diferir do JSON em um segundo,
+    por isso o sufixo do nome vem primeiro.
+    """
+    correspondencia = PADRAO_DATA_LEGADO.search(os.path.basename(caminho))
+    if correspondencia:
+        return correspondencia.group(1)
+    return registro.get('data_backup') or registro['timestamp']
+
+
+def importar_legado(pastas=('backup', 'backups'), pasta_log='backups/segmentos', mover=True):
+    """
+    Grava os backups antigos (.json e .txt) no log append-only, em ordem
+    cronológica e num segmento próprio. Um registro por snapshot: entre o
+    JSON e o resumo .txt do mesmo backup fica o JSON. Com `mover`, os
+    originais (cópias inclusive) vão para `<pasta>/importados/` (assim não
+    aparecem duas vezes no catálogo nem são importados de novo).
+    Retorna (importados, erros).
+    """
+    por_snapshot = {}
+    copias = []
+    erros = 0
+    for caminho, leitor in arquivos_legado(pastas):
+        try:
+            registro = leitor(caminho)
+            ts = datetime.datetime.fromisoformat(registro['timestamp']).timestamp()
+        except Exception as e:
+            print(f"❌ Erro ao importar {caminho}: {e}")
+            erros += 1
+            continue
+        chave = chave_legado(caminho, registro)
+        atual = por_snapshot.get(chave)
+        if atual is not None and (leitor is not ler_backup_json or atual[1].endswith('.json')):
+            copias.append(caminho)
+            continue
+        if atual is not None:
+            copias.append(atual[1])
+        por_snapshot[chave] = (ts, caminho, registro)
+    if not por_snapshot:
+        return 0, erros
+
+    lidos = sorted(por_snapshot.values(), key=lambda item: item[0])
+    # Segmentos com o sufixo de legado: a retenção dos backups agendados não os poda
+    log = LogBackup(pasta_log, idade_maxima=float('inf'), sufixo=SUFIXO_LEGADO)
+    try:
+        for ts, caminho, registro in lidos:
+            log.anexar(registro, ts)
+    finally:
+        log.fechar()
+
+    if mover:
+        for caminho in [caminho for _, caminho, _ in lidos] + copias:
+            destino = os.path.join(os.path.dirname(caminho), PASTA_IMPORTADOS)
+            os.makedirs(destino, exist_ok=True)
+            os.replace(caminho, os.path.join(destino, os.path.basename(caminho)))
+    return len(lidos), erros
@@ -0,0 +1,227 @@
+import collections
+import gzip
+import json
+import platform
+import socket
+import threading
+import time
+from .metricas import extrair_metricas, get_armazem
+from .opcionais import carregar
+from .processos import get_tabela
+
+VERSAO_PROTOCOLO = 1
+
+# Processos enviados em cada lote (os maiores por CPU na última amostra)
+TOP_PROCESSOS_AGENTE = 5
+
+
+class Agente:
+    """Modo agente: coleta localmente e envia lotes comprimidos para um hub.
+
+    Assina o coletor, reduz cada snapshot às métricas numéricas (as mesmas
+    gravadas no histórico local) e, a cada `intervalo_envio` segundos, envia
+    o lote em um único POST com corpo JSON + gzip. Se o hub estiver fora do
+    ar, as amostras ficam em um buffer limitado e vão no próximo envio.
+    """
+
+    def __init__(self, hub, host_id=None, intervalo_envio=10.0, token=None,
+                 max_amostras=3600, timeout=10.0):
+        self.url = hub.rstrip('/') + '/api/agentes/ingestao'
+        self.host_id = host_id or socket.gethostname()
+        self.intervalo_envio = intervalo_envio
+        self.token = token
+        self.timeout = timeout
+        self._amostras = collections.deque(maxlen=max_amostras)
+        self._anterior = None
+        self._ultimo = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self.enviados = 0
+        self.falhas = 0
+
+    def registrar_snapshot(self, snapshot):
+        """Assinante do coletor"""
+        valores = extrair_metricas(snapshot, self._anterior)
+        self._anterior = snapshot
+        temperatura = snapshot['status'].get('cpu_temperatura')
+        if isinstance(temperatura, (int, float)):
+            valores['temperatura'] = temperatura
+        with self._lock:
+            amostra = [round(snapshot['coletado_em'], 3), valores]
+            intervalo = snapshot.get('amostragem', {}).get('intervalo')
+            if intervalo is not None:
+                # Terceiro elemento opcional: tempo que a amostra representa (peso nos rollups)
+                amostra.append(round(intervalo, 3))
+            self._amostras.append(amostra)
+            self._ultimo = snapshot
+
+    def _montar_lote(self):
+        with self._lock:
+            amostras = list(self._amostras)
+            snapshot = self._ultimo
+        if not amostras:
+            return None, 0
+        hardware = snapshot['hardware'] if snapshot else {}
+        lote = {
+            'versao': VERSAO_PROTOCOLO,
+            'host': {
+                'id': self.host_id,
+                'hostname': socket.gethostname(),
+                'so': f'{platform.system()} {platform.release()}',
+                'boot_time': snapshot['boot_time'] if snapshot else None,
+                'processador': hardware.get('processador'),
+                'memoria_total': snapshot['memoria']['total'] if snapshot else None,
+                'disco_total': snapshot['disco']['total'] if snapshot else None
+            },
+            'amostras': amostras,
+            'processos': [
+                {'pid': p['pid'], 'name': p['name'], 'cpu_percent': p['cpu_percent'],
+                 'memory_percent': p['memory_percent']}
+                for p in get_tabela().top(TOP_PROCESSOS_AGENTE, 'cpu_percent')
+            ]
+        }
+        return lote, len(amostras)
+
+    def enviar(self):
+        """Envia o buffer atual; retorna o número de amostras aceitas pelo hub"""
+        lote, quantidade = self._montar_lote()
+        if lote is None:
+            return 0
+        corpo = gzip.compress(json.dumps(lote, separators=(',', ':')).encode('utf-8'))
+        cabecalhos = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+        if self.token:
+            cabecalhos['X-TaskMonitor-Token'] = self.token
+        resposta = carregar('requests').post(self.url, data=corpo, headers=cabecalhos, timeout=self.timeout)
+        resposta.raise_for_status()
+        # Só descarta o que foi enviado; amostras novas chegadas no meio ficam
+        with self._lock:
+            for _ in range(min(quantidade, len(self._amostras))):
+                self._amostras.popleft()
+        self.enviados += quantidade
+        return quantidade
+
+    def _loop(self):
+        espera = self.intervalo_envio
+        while not self._parar.wait(espera):
+            try:
+                self.enviar()
+                espera = self.intervalo_envio
+            except Exception as e:
+                self.falhas += 1
+                # Backoff até 5 minutos; o buffer segura as amostras nesse meio-tempo
+                espera = min(espera * 2, 300.0)
+                print(f"❌ Erro ao enviar para o hub ({self.url}): {e}. Nova tentativa em {espera:.0f} s")
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._loop, name='taskmonitor-agente', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        try:
+            self.enviar()
+        except Exception as e:
+            print(f"❌ Erro no envio final para o hub: {e}")
+
+
+class Frota:
+    """Hub: recebe lotes de vários agentes e mantém a visão geral da frota.
+
+    As amostras de cada host vão para o armazém de métricas com o nome
+    `<metrica>@<host>` (ex.: `cpu@servidor-01`), então histórico, rollups
+    e `/api/series` funcionam por host sem tabelas novas. O estado mais
+    recente de cada host fica em memória para a visão geral.
+    """
+
+    def __init__(self, tempo_offline=60.0):
+        self.tempo_offline = tempo_offline
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def ingerir(self, lote, origem=None):
+        """Registra um lote de um agente; retorna o número de amostras aceitas"""
+        if lote.get('versao') != VERSAO_PROTOCOLO:
+            raise ValueError(f"Versão de protocolo não suportada: {lote.get('versao')!r}")
+        host = lote['host']
+        host_id = str(host['id'])
+        if not host_id or '@' in host_id:
+            raise ValueError(f'Identificador de host inválido: {host_id!r}')
+        amostras = lote['amostras']
+
+        armazem = get_armazem()
+        ultimo = {}
+        ultimo_ts = None
+        for amostra in amostras:
+            ts, valores = amostra[0], amostra[1]
+            intervalo = float(amostra[2]) if len(amostra) > 2 and amostra[2] else None
+            numericos = {m: float(v) for m, v in valores.items() if isinstance(v, (int, float))}
+            if armazem is not None:
+                armazem.registrar(ts, {f'{m}@{host_id}': v for m, v in numericos.items()}, intervalo)
+            if ultimo_ts is None or ts >= ultimo_ts:
+                ultimo_ts = ts
+            ultimo.update(numericos)
+
+        with self._lock:
+            estado = self._hosts.setdefault(host_id, {'amostras_recebidas': 0, 'lotes': 0})
+            estado.update({
+                'info': host,
+                'origem': origem,
+                'visto_em': time.time(),
+                'ultima_amostra_em': max(ultimo_ts or 0, estado.get('ultima_amostra_em') or 0),
+                'processos': lote.get('processos', [])
+            })
+            estado['valores'] = dict(estado.get('valores', {}), **ultimo)
+            estado['amostras_recebidas'] += len(amostras)
+            estado['lotes'] += 1
+        return len(amostras)
+
+    def visao_geral(self):
+        """Um resumo por host, ordenado por id"""
+        agora = time.time()
+        with self._lock:
+            hosts = []
+            for host_id, estado in sorted(self._hosts.items()):
+                visto_ha = agora - estado['visto_em']
+                hosts.append({
+                    'id': host_id,
+                    'hostname': estado['info'].get('hostname'),
+                    'so': estado['info'].get('so'),
+                    'processador': estado['info'].get('processador'),
+                    'online': visto_ha <= self.tempo_offline,
+                    'visto_ha': round(visto_ha, 1),
+                    'ultima_amostra_em': estado['ultima_amostra_em'],
+                    'origem': estado['origem'],
+                    'valores': estado['valores'],
+                    'series': sorted(f'{m}@{host_id}' for m in estado['valores']),
+                    'processos': estado['processos'],
+                    'amostras_recebidas': estado['amostras_recebidas'],
+                    'lotes': estado['lotes']
+                })
+        return {
+            'hosts': hosts,
+            'total': len(hosts),
+            'online': sum(1 for h in hosts if h['online'])
+        }
+
+
+_frota = None
+
+
+def iniciar_frota(**kwargs):
+    global _frota
+    if _frota is None:
+        _frota = Frota(**kwargs)
+    return _frota
+
+
+def definir_frota(frota):
+    """Instala outra implementação (ex.: FrotaRemota nos workers)"""
+    global _frota
+    _frota = frota
+    return frota
+
+
+def get_frota():
+    return _frota
@@ -0,0 +1,272 @@
+import math
+import sys
+import threading
+import time
+from array import array
+import psutil
+from .processos import get_tabela
+
+# Campos guardados por amostra e o tipo do array de cada um
+CAMPOS = (
+    ('ts', 'd'),
+    ('cpu', 'f'),
+    ('rss', 'd'),
+    ('io_leitura', 'f'),
+    ('io_escrita', 'f'),
+    ('threads', 'f'),
+    ('fds', 'f')
+)
+
+
+class SerieProcesso:
+    """Série de um processo em buffers circulares de `array` (sem um dict por amostra).
+
+    Os arrays crescem até `capacidade` e, a partir daí, a posição mais
+    antiga é sobrescrita. Valores indisponíveis (ex.: I/O sem permissão)
+    ficam como NaN.
+    """
+
+    def __init__(self, pid, create_time, nome, capacidade):
+        self.pid = pid
+        self.create_time = create_time
+        self.nome = nome
+        self.capacidade = capacidade
+        self.arrays = {campo: array(tipo) for campo, tipo in CAMPOS}
+        self._inicio = 0
+        self.ultima_amostra = None
+        self._io_anterior = None
+
+    def __len__(self):
+        return len(self.arrays['ts'])
+
+    def adicionar(self, valores):
+        if len(self) < self.capacidade:
+            for campo, _ in CAMPOS:
+                self.arrays[campo].append(valores[campo])
+        else:
+            for campo, _ in CAMPOS:
+                self.arrays[campo][self._inicio] = valores[campo]
+            self._inicio = (self._inicio + 1) % self.capacidade
+        self.ultima_amostra = valores['ts']
+
+    def taxa_io(self, ts, lido, escrito):
+        """Bytes/s de leitura e escrita desde a última amostra deste processo"""
+        anterior, self._io_anterior = self._io_anterior, (ts, lido, escrito)
+        if anterior is None or lido is None:
+            return math.nan, math.nan
+        decorrido = ts - anterior[0]
+        if decorrido <= 0 or anterior[1] is None:
+            return math.nan, math.nan
+        return max(0.0, (lido - anterior[1]) / decorrido), max(0.0, (escrito - anterior[2]) / decorrido)
+
+    def _ordem(self):
+        n = len(self)
+        return [(self._inicio + i) % n for i in range(n)] if n else []
+
+    def colunas(self, desde=None):
+        """Amostras em ordem cronológica, como {campo: [valores]} (NaN -> None)"""
+        indices = self._ordem()
+        ts = self.arrays['ts']
+        if desde is not None:
+            indices = [i for i in indices if ts[i] >= desde]
+        return {
+            campo: [None if math.isnan(self.arrays[campo][i]) else round(self.arrays[campo][i], 2) for i in indices]
+            for campo, _ in CAMPOS
+        }
+
+    def resumo(self, desde, intervalo):
+        """Consumo acumulado desde `desde`: CPU média no período, RSS máximo e bytes de I/O"""
+        ts = self.arrays['ts']
+        cpu_tempo = lido = escrito = 0.0
+        rss_max = 0.0
+        amostras = 0
+        anterior = None
+        for i in self._ordem():
+            if ts[i] < desde:
+                anterior = ts[i]
+                continue
+            # Cada amostra vale o tempo desde a anterior (limitado, para lacunas fora do top-K)
+            dt = min(ts[i] - anterior, 2 * intervalo) if anterior is not None else intervalo
+            anterior = ts[i]
+            amostras += 1
+            cpu_tempo += self.arrays['cpu'][i] * dt
+            rss_max = max(rss_max, self.arrays['rss'][i])
+            if not math.isnan(self.arrays['io_leitura'][i]):
+                lido += self.arrays['io_leitura'][i] * dt
+                escrito += self.arrays['io_escrita'][i] * dt
+        return {
+            'amostras': amostras,
+            'cpu_tempo': cpu_tempo,
+            'rss_max': rss_max,
+            'io_lido': lido,
+            'io_escrito': escrito
+        }
+
+
+class HistoricoProcessos:
+    """Séries por processo dos top-K consumidores de cada tick.
+
+    A cada snapshot, os K maiores por CPU e os K maiores por memória são
+    amostrados (CPU, RSS, I/O, threads, descritores/handles). A chave é
+    (pid, create_time), então um PID reutilizado não mistura processos.
+    Séries sem amostra nova há mais de `janela` segundos são descartadas.
+    """
+
+    def __init__(self, top=10, janela=3600.0, intervalo=1.0, max_processos=200):
+        self.top = top
+        self.janela = janela
+        self.intervalo = intervalo
+        self.max_processos = max_processos
+        self.capacidade = int(janela / intervalo) + 1
+        self._series = {}
+        self._lock = threading.Lock()
+        self._ultima_limpeza = 0.0
+        self._inicio = None
+
+    def _ler(self, proc):
+        """Leituras extras (só para os top-K): I/O, threads e descritores"""
+        with proc.oneshot():
+            try:
+                io = proc.io_counters()
+                lido, escrito = io.read_bytes, io.write_bytes
+            except (psutil.AccessDenied, AttributeError):
+                lido = escrito = None
+            threads = proc.num_threads()
+            try:
+                fds = proc.num_handles() if sys.platform == 'win32' else proc.num_fds()
+            except psutil.AccessDenied:
+                fds = math.nan
+        return lido, escrito, threads, fds
+
+    def registrar(self, ts):
+        if self._inicio is None:
+            self._inicio = ts
+        tabela = get_tabela()
+        escolhidos = {}
+        for linha in tabela.top(self.top, 'cpu_percent') + tabela.top(self.top, 'rss'):
+            escolhidos[(linha['pid'], linha['create_time'])] = linha
+
+        for chave, linha in escolhidos.items():
+            proc = tabela.processo(linha['pid'])
+            if proc is None:
+                continue
+            try:
+                lido, escrito, threads, fds = self._ler(proc)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+                continue
+            with self._lock:
+                serie = self._series.get(chave)
+                if serie is None:
+                    serie = self._series[chave] = SerieProcesso(
+                        linha['pid'], linha['create_time'], linha['name'], self.capacidade)
+                io_leitura, io_escrita = serie.taxa_io(ts, lido, escrito)
+                serie.adicionar({
+                    'ts': ts,
+                    'cpu': linha['cpu_percent'],
+                    'rss': linha['rss'],
+                    'io_leitura': io_leitura,
+                    'io_escrita': io_escrita,
+                    'threads': threads,
+                    'fds': fds
+                })
+
+        if ts - self._ultima_limpeza >= 60:
+            self._limpar(ts)
+            self._ultima_limpeza = ts
+
+    def registrar_snapshot(self, snapshot):
+        """Assinante do coletor (só nos ticks em que a tabela de processos foi atualizada)"""
+        amostragem = snapshot.get('amostragem')
+        if amostragem is not None and 'processos' not in amostragem['atualizados']:
+            return
+        self.registrar(snapshot['coletado_em'])
+
+    def _limpar(self, agora):
+        with self._lock:
+            for chave in [c for c, s in self._series.items() if agora - s.ultima_amostra > self.janela]:
+                del self._series[chave]
+            # Limite de memória: descarta as séries sem amostra há mais tempo
+            excesso = len(self._series) - self.max_processos
+            if excesso > 0:
+                for chave, _ in sorted(self._series.items(), key=lambda item: item[1].ultima_amostra)[:excesso]:
+                    del self._series[chave]
+
+    # --- consultas -----------------------------------------------------
+
+    def serie(self, pid, create_time=None, desde=None):
+        """Série do processo (a mais recente, se o PID foi reutilizado) ou None"""
+        with self._lock:
+            candidatas = [s for (p, c), s in self._series.items()
+                          if p == pid and (create_time is None or c == create_time)]
+            if not candidatas:
+                return None
+            serie = max(candidatas, key=lambda s: s.create_time)
+            return {
+                'pid': serie.pid,
+                'name': serie.nome,
+                'create_time': serie.create_time,
+                'instancias': len(candidatas),
+                'series': serie.colunas(desde)
+            }
+
+    def top_consumidores(self, janela=3600.0, n=10, ordem='cpu'):
+        """Maiores consumidores dos últimos `janela` segundos.
+
+        `cpu`: CPU média no período (% da máquina, considerando só os ticks
+        em que o processo estava no top-K); `memoria`: maior RSS;
+        `io`: bytes lidos + escritos.
+        """
+        chaves = {
+            'cpu': lambda r: r['cpu_medio'],
+            'memoria': lambda r: r['rss_max'],
+            'io': lambda r: r['io_lido'] + r['io_escrito']
+        }
+        if ordem not in chaves:
+            raise ValueError(f'Ordem inválida: {ordem!r} (use cpu, memoria ou io)')
+        agora = time.time()
+        desde = agora - janela
+        # Logo após iniciar, a média é sobre o tempo já observado, não a janela inteira
+        periodo = min(janela, agora - self._inicio) if self._inicio is not None else janela
+        with self._lock:
+            resultados = []
+            for serie in self._series.values():
+                if serie.ultima_amostra < desde:
+                    continue
+                resumo = serie.resumo(desde, self.intervalo)
+                if not resumo['amostras']:
+                    continue
+                resultados.append({
+                    'pid': serie.pid,
+                    'name': serie.nome,
+                    'create_time': serie.create_time,
+                    'amostras': resumo['amostras'],
+                    'cpu_medio': round(resumo['cpu_tempo'] / max(periodo, self.intervalo), 2),
+                    'rss_max': int(resumo['rss_max']),
+                    'io_lido': int(resumo['io_lido']),
+                    'io_escrito': int(resumo['io_escrito'])
+                })
+        # Quem não consumiu nada no critério escolhido não entra no ranking
+        resultados = [r for r in resultados if chaves[ordem](r) > 0]
+        resultados.sort(key=chaves[ordem], reverse=True)
+        return resultados[:n]
+
+
+_historico = None
+
+
+def iniciar_historico(**kwargs):
+    global _historico
+    if _historico is None:
+        _historico = HistoricoProcessos(**kwargs)
+    return _historico
+
+
+def definir_historico(historico):
+    """Instala outra fonte (ex.: HistoricoRemoto nos workers)"""
+    global _historico
+    _historico = historico
+    return historico
+
+
+def get_historico():
+    return _historico
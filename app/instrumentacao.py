@@ -0,0 +1,281 @@
+import bisect
+import collections
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+
+# Limites superiores dos buckets dos histogramas (ms); o último bucket é +inf
+LIMITES_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Arquivos onde uma thread parada esperando (Event.wait, select, accept...) aparece no topo da pilha
+ARQUIVOS_OCIOSOS = ('threading.py', 'selectors.py', 'socket.py', 'socketserver.py', 'queue.py', 'ssl.py')
+
+
+def _arredondar(valor):
+    return round(valor, 3) if valor is not None else None
+
+
+class Histograma:
+    """Contagem de durações em buckets fixos (escala ~logarítmica).
+
+    Memória constante, registro O(log buckets); os percentis são
+    aproximados pelo limite superior do bucket onde caem.
+    """
+
+    __slots__ = ('contagens', 'n', 'soma', 'maximo', 'ultimo')
+
+    def __init__(self):
+        self.zerar()
+
+    def zerar(self):
+        self.contagens = [0] * (len(LIMITES_MS) + 1)
+        self.n = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+        self.ultimo = 0.0
+
+    def registrar(self, ms):
+        self.contagens[bisect.bisect_left(LIMITES_MS, ms)] += 1
+        self.n += 1
+        self.soma += ms
+        self.ultimo = ms
+        if ms > self.maximo:
+            self.maximo = ms
+
+    def percentil(self, p):
+        if not self.n:
+            return None
+        alvo = p / 100 * self.n
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo and contagem:
+                # O bucket +inf (e o pior caso em geral) é limitado pelo máximo visto
+                return min(LIMITES_MS[i], self.maximo) if i < len(LIMITES_MS) else self.maximo
+        return self.maximo
+
+    def resumo(self):
+        return {
+            'n': self.n,
+            'media_ms': round(self.soma / self.n, 3) if self.n else None,
+            'p50_ms': _arredondar(self.percentil(50)),
+            'p95_ms': _arredondar(self.percentil(95)),
+            'p99_ms': _arredondar(self.percentil(99)),
+            'max_ms': round(self.maximo, 3),
+            'ultimo_ms': round(self.ultimo, 3),
+            'total_s': round(self.soma / 1000, 3),
+            'buckets': {
+                (str(LIMITES_MS[i]) if i < len(LIMITES_MS) else '+inf'): c
+                for i, c in enumerate(self.contagens) if c
+            }
+        }
+
+
+class ProfilerAmostragem:
+    """Profiler por amostragem de pilhas (desligado por padrão).
+
+    Uma thread lê `sys._current_frames()` a cada `intervalo` segundos e
+    conta as pilhas de todas as outras threads. Nada é instrumentado: com
+    o profiler desligado o custo é zero. Threads paradas esperando
+    (Event.wait, select, accept) são ignoradas.
+    """
+
+    def __init__(self, intervalo=0.01, max_pilhas=2000, profundidade=48):
+        self.intervalo = intervalo
+        self.max_pilhas = max_pilhas
+        self.profundidade = profundidade
+        self._pilhas = collections.Counter()
+        self._funcoes = collections.Counter()
+        self._amostras = 0
+        self._iniciado_em = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self, intervalo=None):
+        if intervalo:
+            self.intervalo = max(0.001, float(intervalo))
+        if not self.ativo:
+            with self._lock:
+                self._pilhas.clear()
+                self._funcoes.clear()
+                self._amostras = 0
+            self._iniciado_em = time.time()
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name='taskmonitor-profiler', daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.amostrar()
+
+    @staticmethod
+    def _rotulo(frame):
+        codigo = frame.f_code
+        return f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})'
+
+    def amostrar(self):
+        proprio = threading.get_ident()
+        nomes = {t.ident: t.name for t in threading.enumerate()}
+        pilhas = []
+        for ident, frame in sys._current_frames().items():
+            if ident == proprio or os.path.basename(frame.f_code.co_filename) in ARQUIVOS_OCIOSOS:
+                continue
+            topo = f'{self._rotulo(frame)} linha {frame.f_lineno}'
+            pilha = []
+            while frame is not None and len(pilha) < self.profundidade:
+                pilha.append(self._rotulo(frame))
+                frame = frame.f_back
+            pilha.reverse()
+            pilhas.append((nomes.get(ident, str(ident)) + ';' + ';'.join(pilha), topo))
+        with self._lock:
+            self._amostras += 1
+            for pilha, topo in pilhas:
+                if pilha not in self._pilhas and len(self._pilhas) >= self.max_pilhas:
+                    pilha = '(outras)'
+                self._pilhas[pilha] += 1
+                self._funcoes[topo] += 1
+
+    def estado(self, n=25):
+        with self._lock:
+            total = sum(self._funcoes.values())
+            return {
+                'ativo': self.ativo,
+                'intervalo': self.intervalo,
+                'amostras': self._amostras,
+                'iniciado_em': self._iniciado_em,
+                'funcoes': [
+                    {'funcao': funcao, 'amostras': c, 'percent': round(c / total * 100, 1)}
+                    for funcao, c in self._funcoes.most_common(n)
+                ],
+                # Formato "collapsed" (thread;f1;f2 N), aceito por ferramentas de flame graph
+                'pilhas': [f'{pilha} {c}' for pilha, c in self._pilhas.most_common(n)]
+            }
+
+
+class Instrumentacao:
+    """Histogramas de duração por categoria (rotas, coletores, coletor, ...) e contadores.
+
+    Registrar custa um `perf_counter` e um incremento de bucket sob lock
+    (~1 µs); `ativa = False` desliga tudo sem tirar os decoradores. Os
+    histogramas nunca são removidos (só zerados), então os decoradores
+    guardam a referência e não precisam procurá-los a cada chamada.
+    """
+
+    def __init__(self):
+        self.ativa = True
+        self.iniciado_em = time.time()
+        self.profiler = ProfilerAmostragem()
+        self._histogramas = {}
+        self._contadores = collections.Counter()
+        self._lock = threading.Lock()
+
+    def histograma(self, categoria, nome):
+        chave = (categoria, nome)
+        histograma = self._histogramas.get(chave)
+        if histograma is None:
+            with self._lock:
+                histograma = self._histogramas.setdefault(chave, Histograma())
+        return histograma
+
+    def registrar(self, categoria, nome, segundos):
+        histograma = self.histograma(categoria, nome)
+        with self._lock:
+            histograma.registrar(segundos * 1000)
+
+    def contar(self, nome, n=1):
+        with self._lock:
+            self._contadores[nome] += n
+
+    def registrar_tick(self, decorrido, intervalo):
+        """Duração de um tick do coletor; conta atraso quando passou do intervalo"""
+        self.registrar('coletor', 'tick', decorrido)
+        with self._lock:
+            self._contadores['coletor.ticks'] += 1
+            if decorrido > intervalo:
+                self._contadores['coletor.atrasos'] += 1
+
+    @contextlib.contextmanager
+    def medir(self, categoria, nome):
+        if not self.ativa:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(categoria, nome, time.perf_counter() - inicio)
+
+    def cronometrado(self, categoria, nome=None):
+        """Decorador: registra a duração de cada chamada (e conta exceções que escapam)"""
+        def decorador(funcao):
+            rotulo = nome or funcao.__name__
+            histograma = self.histograma(categoria, rotulo)
+            lock = self._lock
+            relogio = time.perf_counter
+
+            @functools.wraps(funcao)
+            def envolvida(*args, **kwargs):
+                if not self.ativa:
+                    return funcao(*args, **kwargs)
+                inicio = relogio()
+                try:
+                    return funcao(*args, **kwargs)
+                except Exception:
+                    self.contar(f'erros.{categoria}.{rotulo}')
+                    raise
+                finally:
+                    decorrido = relogio() - inicio
+                    with lock:
+                        histograma.registrar(decorrido * 1000)
+            return envolvida
+        return decorador
+
+    def estado(self):
+        with self._lock:
+            categorias = {}
+            for (categoria, nome), histograma in sorted(self._histogramas.items()):
+                if histograma.n:
+                    categorias.setdefault(categoria, {})[nome] = histograma.resumo()
+            contadores = dict(self._contadores)
+        return {
+            'pid': os.getpid(),
+            'ativa': self.ativa,
+            'iniciado_em': self.iniciado_em,
+            'categorias': categorias,
+            'contadores': contadores,
+            'profiler': self.profiler.estado()
+        }
+
+    def zerar(self):
+        with self._lock:
+            for histograma in self._histogramas.values():
+                histograma.zerar()
+            self._contadores.clear()
+            self.iniciado_em = time.time()
+
+
+_instrumentacao = Instrumentacao()
+
+
+def get_instrumentacao():
+    return _instrumentacao
+
+
+def cronometrado(categoria, nome=None):
+    """Atalho para `get_instrumentacao().cronometrado(...)` (uso em decoradores de módulo)"""
+    return _instrumentacao.cronometrado(categoria, nome)
@@ -0,0 +1,95 @@
+import threading
+import time
+from .instrumentacao import get_instrumentacao
+from .opcionais import carregar
+
+URL_PADRAO = 'https://api.ipify.org'
+
+
+class ResolvedorIPPublico:
+    """Resolve o IP público com cache e atualização em segundo plano.
+
+    `obter()` nunca bloqueia: devolve o valor em cache e, se ele estiver
+    vencido, dispara uma única atualização compartilhada por todas as
+    requisições concorrentes. Falhas também ficam em cache (`ttl_falha`)
+    para não martelar o serviço quando não há rede.
+    """
+
+    def __init__(self, url=URL_PADRAO, ttl=300.0, ttl_falha=60.0, timeout=3.0):
+        self.url = url
+        self.ttl = ttl
+        self.ttl_falha = ttl_falha
+        self.timeout = timeout
+        self._valor = None
+        self._expira_em = 0.0
+        self._atualizado_em = None
+        self._erro = None
+        self._lock = threading.Lock()
+        self._atualizando = None
+
+    def obter(self):
+        """Retorna o IP em cache (ou 'N/A'), agendando atualização se vencido"""
+        # URL vazia desativa a consulta (ambientes sem acesso externo)
+        if self.url and time.monotonic() >= self._expira_em:
+            self.atualizar_em_segundo_plano()
+        return self._valor or 'N/A'
+
+    def atualizar_em_segundo_plano(self):
+        """Dispara a atualização se nenhuma estiver em andamento; retorna a thread"""
+        with self._lock:
+            if self._atualizando is None:
+                self._atualizando = threading.Thread(
+                    target=self._atualizar, name='taskmonitor-ip-publico', daemon=True)
+                self._atualizando.start()
+            return self._atualizando
+
+    def atualizar(self):
+        """Atualiza de forma síncrona (aguarda a atualização em andamento, se houver)"""
+        self.atualizar_em_segundo_plano().join(self.timeout + 1)
+        return self._valor or 'N/A'
+
+    def _atualizar(self):
+        try:
+            with get_instrumentacao().medir('externos', 'ip_publico'):
+                resposta = carregar('requests').get(self.url, timeout=self.timeout)
+            resposta.raise_for_status()
+            ip = resposta.text.strip()
+            if not ip:
+                raise ValueError('resposta vazia')
+            self._valor = ip
+            self._erro = None
+            self._atualizado_em = time.time()
+            self._expira_em = time.monotonic() + self.ttl
+        except Exception as e:
+            # Mantém o último IP conhecido, mas só tenta de novo após ttl_falha
+            get_instrumentacao().contar('erros.externos.ip_publico')
+            self._erro = str(e)
+            self._expira_em = time.monotonic() + self.ttl_falha
+        finally:
+            with self._lock:
+                self._atualizando = None
+
+    def estado(self):
+        return {
+            'ip_publico': self._valor or 'N/A',
+            'atualizado_em': self._atualizado_em,
+            'erro': self._erro
+        }
+
+
+_resolvedor = ResolvedorIPPublico()
+
+
+def configurar_resolvedor(url=URL_PADRAO, ttl=300.0, ttl_falha=60.0, timeout=3.0):
+    """Substitui o resolvedor global (endpoint configurável/stub em testes)"""
+    global _resolvedor
+    _resolvedor = ResolvedorIPPublico(url, ttl, ttl_falha, timeout)
+    return _resolvedor
+
+
+def get_resolvedor():
+    return _resolvedor
+
+
+def get_ip_publico():
+    return _resolvedor.obter()
@@ -0,0 +1,304 @@
+import os
+import sqlite3
+import threading
+import time
+from .taxas import discos_inteiros
+
+# Resoluções (segundos) -> tabela. Cada nível guarda mínimo/máximo/média por bucket.
+RESOLUCOES = {
+    1: 'metricas_1s',
+    60: 'metricas_1m',
+    3600: 'metricas_1h'
+}
+
+# Retenção padrão de cada nível, em segundos
+RETENCAO_PADRAO = {
+    1: 2 * 86400,
+    60: 30 * 86400,
+    3600: 400 * 86400
+}
+
+
+def criar_tabelas(conn):
+    """Cria as tabelas de séries temporais (idempotente)"""
+    for tabela in RESOLUCOES.values():
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {tabela} (
+            metrica TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            minimo REAL NOT NULL,
+            maximo REAL NOT NULL,
+            media REAL NOT NULL,
+            amostras INTEGER NOT NULL,
+            cobertura REAL,
+            PRIMARY KEY (metrica, ts)
+        ) WITHOUT ROWID
+        ''')
+        # Bancos anteriores à amostragem adaptativa: linhas sem cobertura valem 1 s por amostra
+        colunas = [linha[1] for linha in conn.execute(f'PRAGMA table_info({tabela})')]
+        if 'cobertura' not in colunas:
+            conn.execute(f'ALTER TABLE {tabela} ADD COLUMN cobertura REAL')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS metricas_estado (
+        chave TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL
+    )
+    ''')
+    conn.commit()
+
+
+def conectar(caminho):
+    conn = sqlite3.connect(caminho, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def extrair_metricas(snapshot, anterior=None):
+    """Converte um snapshot do coletor em {metrica: valor}.
+
+    Rede e I/O de disco vêm das taxas (bytes/s) calculadas pelo coletor; sem
+    elas (snapshots antigos), as de rede são derivadas do snapshot anterior.
+    """
+    valores = {
+        'cpu': snapshot['status']['cpu'],
+        'memoria': snapshot['memoria']['percent'],
+        'disco': snapshot['disco']['percent']
+    }
+    taxas = snapshot.get('taxas')
+    if taxas is not None:
+        total = taxas['rede_total']
+        if 'bytes_enviados_s' in total:
+            valores['rede_enviado'] = total['bytes_enviados_s']
+        if 'bytes_recebidos_s' in total:
+            valores['rede_recebido'] = total['bytes_recebidos_s']
+        discos = discos_inteiros(taxas['discos']).values()
+        if discos:
+            valores['disco_leitura'] = sum(d.get('bytes_lidos_s', 0) for d in discos)
+            valores['disco_escrita'] = sum(d.get('bytes_escritos_s', 0) for d in discos)
+            valores['disco_iops'] = sum(d.get('iops', 0) for d in discos)
+    elif anterior is not None:
+        decorrido = snapshot['coletado_em'] - anterior['coletado_em']
+        if decorrido > 0:
+            for chave, metrica in (('bytes_enviados', 'rede_enviado'), ('bytes_recebidos', 'rede_recebido')):
+                delta = snapshot['rede'][chave] - anterior['rede'][chave]
+                if delta >= 0:
+                    valores[metrica] = delta / decorrido
+    return valores
+
+
+class ArmazemMetricas:
+    """Armazém de séries temporais no SQLite (WAL).
+
+    As amostras do coletor são agregadas em memória por segundo e gravadas
+    em lote pela thread de fundo, que também compacta 1 s -> 1 min -> 1 h
+    e apaga o que passou da retenção de cada nível.
+    """
+
+    def __init__(self, caminho='database/tarefas.db', retencao=None,
+                 intervalo_gravacao=5.0, intervalo_compactacao=60.0):
+        self.caminho = caminho
+        self.retencao = dict(RETENCAO_PADRAO, **(retencao or {}))
+        self.intervalo_gravacao = intervalo_gravacao
+        self.intervalo_compactacao = intervalo_compactacao
+        self._buffer = {}
+        self._lock = threading.Lock()
+        # Menor segundo gravado desde a última compactação (amostras atrasadas do hub)
+        self._sujo_desde = None
+        self._anterior = None
+        self._parar = threading.Event()
+        self._thread = None
+        self._leitura = threading.local()
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        conn = conectar(caminho)
+        criar_tabelas(conn)
+        conn.close()
+
+    # --- escrita -------------------------------------------------------
+
+    def registrar(self, ts, valores, intervalo=None):
+        """Acumula valores no bucket de 1 s correspondente (sem tocar no disco).
+
+        `intervalo` é o tempo (s) que a amostra representa: com a amostragem
+        adaptativa um bucket pode ter 4 amostras de 0,25 s ou uma de 5 s, e
+        a média dos rollups é ponderada por esse tempo (coluna `cobertura`),
+        não pelo número de amostras. Sem ele, vale 1 s (cadência fixa).
+        """
+        segundo = int(ts)
+        peso = intervalo if intervalo else 1.0
+        with self._lock:
+            for metrica, valor in valores.items():
+                chave = (metrica, segundo)
+                bucket = self._buffer.get(chave)
+                if bucket is None:
+                    self._buffer[chave] = [valor, valor, valor * peso, 1, peso]
+                else:
+                    bucket[0] = min(bucket[0], valor)
+                    bucket[1] = max(bucket[1], valor)
+                    bucket[2] += valor * peso
+                    bucket[3] += 1
+                    bucket[4] += peso
+
+    def registrar_snapshot(self, snapshot):
+        """Assinante do coletor"""
+        intervalo = snapshot.get('amostragem', {}).get('intervalo')
+        self.registrar(snapshot['coletado_em'], extrair_metricas(snapshot, self._anterior), intervalo)
+        self._anterior = snapshot
+
+    def gravar(self, conn):
+        """Grava o buffer em uma única transação (executemany)"""
+        with self._lock:
+            buffer, self._buffer = self._buffer, {}
+        if not buffer:
+            return 0
+        linhas = [
+            (metrica, ts, minimo, maximo, soma / cobertura, n, cobertura)
+            for (metrica, ts), (minimo, maximo, soma, n, cobertura) in buffer.items()
+        ]
+        # Um segundo pode ter sido gravado parcialmente no lote anterior: mescla
+        conn.executemany('''
+        INSERT INTO metricas_1s (metrica, ts, minimo, maximo, media, amostras, cobertura)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (metrica, ts) DO UPDATE SET
+            minimo = min(minimo, excluded.minimo),
+            maximo = max(maximo, excluded.maximo),
+            media = (media * coalesce(cobertura, amostras) + excluded.media * excluded.cobertura)
+                    / (coalesce(cobertura, amostras) + excluded.cobertura),
+            amostras = amostras + excluded.amostras,
+            cobertura = coalesce(cobertura, amostras) + excluded.cobertura
+        ''', linhas)
+        conn.commit()
+        menor = min(ts for _, ts in buffer)
+        with self._lock:
+            if self._sujo_desde is None or menor < self._sujo_desde:
+                self._sujo_desde = menor
+        return len(linhas)
+
+    def compactar(self, conn, agora=None):
+        """Gera os rollups dos buckets já fechados e aplica a retenção.
+
+        Amostras que chegam atrasadas (lotes de agentes, buffer de uma queda
+        do hub, relógio do agente atrasado) caem em buckets que o cursor já
+        passou: esses buckets são refeitos a partir do menor segundo gravado
+        desde a compactação anterior.
+        """
+        if agora is None:
+            agora = time.time()
+        with self._lock:
+            sujo_desde, self._sujo_desde = self._sujo_desde, None
+        # Folga para que amostras ainda no buffer entrem no bucket certo
+        limite_base = int(agora) - int(self.intervalo_gravacao) - 1
+        resolucoes = sorted(RESOLUCOES)
+        for origem, destino in zip(resolucoes, resolucoes[1:]):
+            tabela_origem = RESOLUCOES[origem]
+            tabela_destino = RESOLUCOES[destino]
+            chave = f'rollup_{tabela_destino}'
+            linha = conn.execute('SELECT valor FROM metricas_estado WHERE chave = ?', (chave,)).fetchone()
+            if linha is None:
+                linha = conn.execute(f'SELECT min(ts) FROM {tabela_origem}').fetchone()
+                if linha[0] is None:
+                    continue
+            inicio = linha[0] // destino * destino
+            if sujo_desde is not None and sujo_desde < inicio:
+                # Só refaz buckets ainda inteiros na origem (a retenção já pode ter apagado o resto)
+                retido_desde = -(-int(agora - self.retencao[origem]) // destino) * destino
+                inicio = min(inicio, max(sujo_desde // destino * destino, retido_desde))
+            fim = limite_base // destino * destino
+            if fim <= inicio:
+                continue
+            conn.execute(f'''
+            INSERT OR REPLACE INTO {tabela_destino} (metrica, ts, minimo, maximo, media, amostras, cobertura)
+            SELECT metrica, ts / {destino} * {destino}, min(minimo), max(maximo),
+                   sum(media * coalesce(cobertura, amostras)) / sum(coalesce(cobertura, amostras)),
+                   sum(amostras), sum(coalesce(cobertura, amostras))
+            FROM {tabela_origem}
+            WHERE ts >= ? AND ts < ?
+            GROUP BY metrica, ts / {destino}
+            ''', (inicio, fim))
+            conn.execute('INSERT OR REPLACE INTO metricas_estado (chave, valor) VALUES (?, ?)', (chave, fim))
+
+        for resolucao, tabela in RESOLUCOES.items():
+            conn.execute(f'DELETE FROM {tabela} WHERE ts < ?', (int(agora - self.retencao[resolucao]),))
+        conn.commit()
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name='taskmonitor-metricas', daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        conn = conectar(self.caminho)
+        ultima_compactacao = 0.0
+        try:
+            while not self._parar.wait(self.intervalo_gravacao):
+                try:
+                    self.gravar(conn)
+                    if time.monotonic() - ultima_compactacao >= self.intervalo_compactacao:
+                        self.compactar(conn)
+                        ultima_compactacao = time.monotonic()
+                except sqlite3.Error as e:
+                    print(f"❌ Erro no armazém de métricas: {e}")
+            self.gravar(conn)
+        finally:
+            conn.close()
+
+    # --- leitura -------------------------------------------------------
+
+    def _conexao_leitura(self):
+        conn = getattr(self._leitura, 'conn', None)
+        if conn is None:
+            conn = conectar(self.caminho)
+            self._leitura.conn = conn
+        return conn
+
+    def consultar(self, metrica, inicio, fim, resolucao=1):
+        """Retorna [(ts, minimo, maximo, media), ...] no intervalo [inicio, fim]"""
+        return self.iterar(metrica, inicio, fim, resolucao).fetchall()
+
+    def iterar(self, metrica, inicio, fim, resolucao=1):
+        """Como `consultar`, mas devolve o cursor (linhas lidas sob demanda, sem montar a lista)"""
+        tabela = RESOLUCOES[resolucao]
+        return self._conexao_leitura().execute(f'''
+        SELECT ts, minimo, maximo, media FROM {tabela}
+        WHERE metrica = ? AND ts >= ? AND ts <= ?
+        ORDER BY ts
+        ''', (metrica, int(inicio), int(fim)))
+
+    def metricas(self):
+        """Nomes das métricas registradas"""
+        linhas = self._conexao_leitura().execute(
+            'SELECT DISTINCT metrica FROM metricas_1m UNION SELECT DISTINCT metrica FROM metricas_1s')
+        return sorted(linha[0] for linha in linhas)
+
+
+_armazem = None
+
+
+def iniciar_armazem(caminho='database/tarefas.db', **kwargs):
+    """Cria e inicia o armazém global de métricas"""
+    global _armazem
+    if _armazem is None:
+        _armazem = ArmazemMetricas(caminho, **kwargs).iniciar()
+    return _armazem
+
+
+def abrir_armazem(caminho='database/tarefas.db', **kwargs):
+    """Abre o armazém só para leitura (workers: quem grava é o processo coletor)"""
+    global _armazem
+    if _armazem is None:
+        _armazem = ArmazemMetricas(caminho, **kwargs)
+    return _armazem
+
+
+def get_armazem():
+    return _armazem
@@ -1,56 +1,69 @@
+import fnmatch
+import os
 import psutil
 import platform
+import socket
+import threading
 from datetime import datetime, timedelta
+from .instrumentacao import cronometrado
+from .sensores import get_gerenciador
+from .ip_publico import get_ip_publico
+from .processos import get_tabela, resumo_processo
 
+
+def _tempos_cpu():
+    """(total, ocioso) acumulados da CPU, com a mesma conta do psutil.cpu_percent"""
+    tempos = psutil.cpu_times()
+    total = sum(tempos)
+    # No Linux, guest/guest_nice já estão somados em user/nice
+    total -= getattr(tempos, 'guest', 0) + getattr(tempos, 'guest_nice', 0)
+    return total, tempos.idle + getattr(tempos, 'iowait', 0)
+
+
+class MedidorCpu:
+    """Uso de CPU (%) desde a leitura anterior *deste* medidor.
+
+    `psutil.cpu_percent(interval=None)` guarda a base em um estado global:
+    qualquer chamada fora do coletor (benchmark, coleta síncrona) zerava a
+    janela do próximo tick. Cada chamador tem o seu medidor.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._anterior = _tempos_cpu()
+
+    def ler(self):
+        atual = _tempos_cpu()
+        with self._lock:
+            anterior, self._anterior = self._anterior, atual
+        total = atual[0] - anterior[0]
+        if total <= 0:
+            return 0.0
+        ocupado = total - (atual[1] - anterior[1])
+        return max(0.0, min(100.0, ocupado / total * 100))
+
+
+# Chamadas avulsas (get_status, coleta síncrona sem coletor, benchmark)
+_cpu_avulso = MedidorCpu()
+
+@cronometrado('coletores')
 def get_cpu_temperature_wmi():
-    """Tenta obter temperatura da CPU via WMI (OpenHardwareMonitor ou HWiNFO)"""
-    try:
-        import wmi
-        w = wmi.WMI(namespace="root\\OpenHardwareMonitor")
-        temperature_infos = w.Sensor()
-        
-        for sensor in temperature_infos:
-            if sensor.SensorType == 'Temperature' and 'CPU' in sensor.Name:
-                return round(sensor.Value, 1)
-        
-        # Se não encontrou via OpenHardwareMonitor, tenta namespace WMI padrão
-        w = wmi.WMI(namespace="root\\WMI")
-        temperature_infos = w.MSAcpi_ThermalZoneTemperature()
-        
-        if temperature_infos:
-            temp_kelvin = temperature_infos[0].CurrentTemperature / 10.0
-            temp_celsius = temp_kelvin - 273.15
-            return round(temp_celsius, 1)
-            
-    except Exception as e:
-        print(f"[INFO] Temperatura CPU não disponível: {e}")
-        pass
-    
-    return "N/A"
+    """Temperatura da CPU pelo primeiro backend de sensores disponível
+    (OpenHardwareMonitor/ACPI no Windows, hwmon/psutil no Linux)"""
+    return get_gerenciador().temperatura_cpu()
 
 
+@cronometrado('coletores')
 def get_ram_frequency_wmi():
-    """Tenta obter frequência da RAM via WMI (OpenHardwareMonitor ou HWiNFO)"""
-    try:
-        import wmi
-        w = wmi.WMI(namespace="root\\OpenHardwareMonitor")
-        clocks = w.Sensor()
-        
-        for sensor in clocks:
-            if sensor.SensorType == 'Clock' and 'Memory' in sensor.Name:
-                return round(sensor.Value, 1)
-                
-    except Exception as e:
-        print(f"[INFO] Frequência RAM não disponível: {e}")
-        pass
-    
-    return "N/A"
+    """Frequência da RAM via OpenHardwareMonitor (quando disponível)"""
+    return get_gerenciador().frequencia_ram()
 
 
-def calcular_energia_ram():
+def calcular_energia_ram(mem=None):
     """Calcula energia estimada da RAM baseada no uso"""
     try:
-        mem = psutil.virtual_memory()
+        if mem is None:
+            mem = psutil.virtual_memory()
         mem_gb = mem.total / (1024**3)
         
         # Estimativa: ~1.5W por 8GB de RAM em uso moderado
@@ -66,6 +79,7 @@ def calcular_energia_ram():
         return "N/A"
 
 
+@cronometrado('coletores')
 def get_battery_info():
     """Obtém informações da bateria (se disponível)"""
     try:
@@ -82,17 +96,26 @@ def get_battery_info():
     return "N/A"
 
 
-def get_status():
-    """Retorna status completo do sistema"""
+@cronometrado('coletores')
+def get_status(mem=None, disco_uso=None):
+    """Retorna status completo do sistema.
+
+    `mem` e `disco_uso` permitem reaproveitar leituras já feitas pelo chamador.
+    """
     try:
-        cpu = psutil.cpu_percent(interval=1)
-        memoria = psutil.virtual_memory().percent
-        disco = psutil.disk_usage('/').percent
+        # Não bloqueante: média desde a chamada avulsa anterior
+        cpu = _cpu_avulso.ler()
+        if mem is None:
+            mem = psutil.virtual_memory()
+        if disco_uso is None:
+            disco_uso = psutil.disk_usage('/')
+        memoria = mem.percent
+        disco = disco_uso.percent
         
         # Tenta obter temperatura e frequência via WMI
         cpu_temperatura = get_cpu_temperature_wmi()
         ram_frequencia = get_ram_frequency_wmi()
-        ram_energia = calcular_energia_ram()
+        ram_energia = calcular_energia_ram(mem)
         bateria = get_battery_info()
         
         return {
@@ -119,24 +142,17 @@ def get_status():
         }
 
 
+@cronometrado('coletores')
 def get_network_info():
     """Retorna informações de rede"""
     try:
-        import socket
-        import requests
-        
         stats = psutil.net_io_counters()
         
         ip_local = socket.gethostbyname(socket.gethostname())
         
-        try:
-            ip_publico = requests.get('https://api.ipify.org', timeout=3).text
-        except:
-            ip_publico = "Não disponível"
-        
         return {
             'ip_local': ip_local,
-            'ip_publico': ip_publico,
+            'ip_publico': get_ip_publico(),
             'enviado': round(stats.bytes_sent / (1024**2), 2),
             'recebido': round(stats.bytes_recv / (1024**2), 2)
         }
@@ -151,19 +167,34 @@ def get_network_info():
 
 
 def get_network_history():
-    """Retorna histórico de rede para gráfico"""
+    """Taxas de rede atuais (MB/s) para o gráfico, calculadas pelo coletor"""
+    from .coletor import get_snapshot
     try:
-        stats = psutil.net_io_counters()
+        total = get_snapshot().get('taxas', {}).get('rede_total', {})
         return {
-            'enviado': round(stats.bytes_sent / (1024**2), 2),
-            'recebido': round(stats.bytes_recv / (1024**2), 2)
+            'enviado': round(total['bytes_enviados_s'] / (1024**2), 4),
+            'recebido': round(total['bytes_recebidos_s'] / (1024**2), 4)
         }
     except:
         return {'erro': 'Dados não disponíveis'}
 
 
+_hardware_info = None
+
+
 def get_hardware_info():
-    """Retorna informações de hardware"""
+    """Retorna informações de hardware (estáticas: calculadas uma vez por processo)"""
+    global _hardware_info
+    if _hardware_info is not None:
+        return _hardware_info
+    info = _coletar_hardware_info()
+    if info['sistema'] != 'Erro':
+        _hardware_info = info
+    return info
+
+
+@cronometrado('coletores')
+def _coletar_hardware_info():
     try:
         uname = platform.uname()
         mem = psutil.virtual_memory()
@@ -193,6 +224,7 @@ def get_hardware_info():
         }
 
 
+@cronometrado('coletores')
 def get_uptime():
     """Retorna tempo de atividade do sistema"""
     try:
@@ -219,45 +251,324 @@ def get_uptime():
         }
 
 
+@cronometrado('coletores')
 def get_processes(filtro='todos'):
     """Retorna lista de processos"""
     try:
-        processos = []
-        
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                info = proc.info
-                processos.append({
-                    'pid': info['pid'],
-                    'name': info['name'],
-                    'cpu_percent': round(info['cpu_percent'] or 0, 1),
-                    'memory_percent': round(info['memory_percent'] or 0, 2)
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        tabela = get_tabela()
         
         if filtro == 'cpu':
-            processos = sorted(processos, key=lambda x: x['cpu_percent'], reverse=True)[:15]
+            processos = tabela.top(15, 'cpu_percent')
         elif filtro == 'memoria':
-            processos = sorted(processos, key=lambda x: x['memory_percent'], reverse=True)[:15]
+            processos = tabela.top(15, 'memory_percent')
         else:
-            processos = sorted(processos, key=lambda x: x['cpu_percent'], reverse=True)[:30]
+            processos = tabela.top(30, 'cpu_percent')
         
-        return processos
+        return [resumo_processo(p) for p in processos]
     except Exception as e:
         print(f"❌ Erro em get_processes: {e}")
         return []
 
 
-def kill_process(pid):
-    """Encerra um processo pelo PID"""
+@cronometrado('coletores')
+def _coletar_interfaces():
+    """Contadores cumulativos por interface de rede"""
+    try:
+        contadores = psutil.net_io_counters(pernic=True)
+    except Exception:
+        return {}
+    return {
+        nome: {
+            'bytes_enviados': c.bytes_sent,
+            'bytes_recebidos': c.bytes_recv,
+            'pacotes_enviados': c.packets_sent,
+            'pacotes_recebidos': c.packets_recv,
+            'erros_entrada': c.errin,
+            'erros_saida': c.errout,
+            'descartes_entrada': c.dropin,
+            'descartes_saida': c.dropout
+        }
+        for nome, c in contadores.items()
+    }
+
+
+@cronometrado('coletores')
+def _coletar_discos_io():
+    """Contadores cumulativos de I/O por disco (vazio se o SO não expõe)"""
+    try:
+        contadores = psutil.disk_io_counters(perdisk=True) or {}
+    except Exception:
+        return {}
+    return {
+        nome: {
+            'leituras': c.read_count,
+            'escritas': c.write_count,
+            'bytes_lidos': c.read_bytes,
+            'bytes_escritos': c.write_bytes
+        }
+        for nome, c in contadores.items()
+    }
+
+
+@cronometrado('coletores')
+def _coletar_particoes():
+    """Uso de todas as partições montadas"""
+    particoes = []
+    try:
+        montadas = psutil.disk_partitions(all=False)
+    except Exception:
+        return particoes
+    for particao in montadas:
+        try:
+            uso = psutil.disk_usage(particao.mountpoint)
+        except (OSError, PermissionError):
+            # Drive de CD vazio, mídia removível ejetada etc.
+            continue
+        particoes.append({
+            'dispositivo': particao.device,
+            'ponto_montagem': particao.mountpoint,
+            'tipo': particao.fstype,
+            'total': uso.total,
+            'usado': uso.used,
+            'livre': uso.free,
+            'percent': uso.percent
+        })
+    return particoes
+
+
+@cronometrado('coletores')
+def coletar_contadores(cpu=None):
+    """Parte barata da amostra (CPU, memória, disco '/', contadores de rede e de I/O).
+
+    É o que o coletor lê a cada tick, inclusive na amostragem rápida
+    (100–250 ms); o que é caro fica em `PARTES_LENTAS`. `cpu` é o
+    `MedidorCpu` do chamador (o coletor tem o seu).
+    """
+    mem = psutil.virtual_memory()
+    disco = psutil.disk_usage('/')
+    net = psutil.net_io_counters()
+    # Não bloqueante: média desde a leitura anterior do mesmo medidor
+    cpu = (cpu or _cpu_avulso).ler()
+    return {
+        'status': {
+            'cpu': round(cpu, 1),
+            'memoria': round(mem.percent, 1),
+            'disco': round(disco.percent, 1),
+            'status_servidor': 'Online',
+            'ram_energia': calcular_energia_ram(mem)
+        },
+        'memoria': {
+            'total': mem.total,
+            'usado': mem.used,
+            'disponivel': mem.available,
+            'percent': mem.percent
+        },
+        'disco': {
+            'total': disco.total,
+            'usado': disco.used,
+            'livre': disco.free,
+            'percent': disco.percent
+        },
+        'rede': {
+            'bytes_enviados': net.bytes_sent,
+            'bytes_recebidos': net.bytes_recv
+        },
+        'interfaces': _coletar_interfaces(),
+        'discos_io': _coletar_discos_io()
+    }
+
+
+@cronometrado('coletores')
+def coletar_sensores():
+    """Temperatura, frequência da RAM (WMI/hwmon), bateria e frequência da CPU"""
+    cpu_freq = psutil.cpu_freq()
+    return {
+        'cpu_temperatura': get_cpu_temperature_wmi(),
+        'ram_frequencia': get_ram_frequency_wmi(),
+        'bateria': get_battery_info(),
+        'cpu_frequencia': int(cpu_freq.current) if cpu_freq else 0
+    }
+
+
+@cronometrado('coletores')
+def coletar_sistema():
+    """Dados que quase nunca mudam: IP local, boot e núcleos físicos"""
     try:
-        processo = psutil.Process(pid)
-        processo.terminate()
+        addrs = psutil.net_if_addrs()
+        ip_local = next((addr.address for iface in addrs.values()
+                         for addr in iface if addr.family == 2 and not addr.address.startswith('127.')), 'N/A')
+    except:
+        ip_local = 'N/A'
+    return {
+        'ip_local': ip_local,
+        'boot_time': psutil.boot_time(),
+        'cpu_nucleos': psutil.cpu_count(logical=False)
+    }
+
+
+# Partes caras da amostra: o coletor as executa em agendas próprias (app/amostragem.py)
+PARTES_LENTAS = {
+    'sensores': coletar_sensores,
+    'sistema': coletar_sistema,
+    'particoes': _coletar_particoes
+}
+
+# Valores usados enquanto uma parte lenta nunca foi lida com sucesso
+PARTES_VAZIAS = {
+    'sensores': {'cpu_temperatura': 'N/A', 'ram_frequencia': 'N/A', 'bateria': 'N/A', 'cpu_frequencia': 0},
+    'sistema': {'ip_local': 'N/A', 'boot_time': 0, 'cpu_nucleos': 0},
+    'particoes': []
+}
+
+
+def montar_amostra(contadores, partes):
+    """Junta a parte barata com as últimas leituras das partes lentas no formato do snapshot"""
+    sensores = partes['sensores']
+    sistema = partes['sistema']
+    status = contadores['status']
+    return {
+        'status': {
+            'cpu': status['cpu'],
+            'memoria': status['memoria'],
+            'disco': status['disco'],
+            'status_servidor': status['status_servidor'],
+            'cpu_temperatura': sensores['cpu_temperatura'],
+            'ram_frequencia': sensores['ram_frequencia'],
+            'ram_energia': status['ram_energia'],
+            'bateria': sensores['bateria']
+        },
+        'hardware': get_hardware_info(),
+        'boot_time': sistema['boot_time'],
+        'cpu_frequencia': sensores['cpu_frequencia'],
+        'cpu_nucleos': sistema['cpu_nucleos'],
+        'memoria': contadores['memoria'],
+        'disco': contadores['disco'],
+        'rede': dict(contadores['rede'], ip_local=sistema['ip_local']),
+        'interfaces': contadores['interfaces'],
+        'discos_io': contadores['discos_io'],
+        'particoes': partes['particoes']
+    }
+
+
+@cronometrado('coletores')
+def coletar_amostra(cpu=None):
+    """Coleta, em uma única passada, tudo o que o snapshot do coletor publica"""
+    return montar_amostra(coletar_contadores(cpu), {nome: coletar() for nome, coletar in PARTES_LENTAS.items()})
+
+
+def selecionar_processos(pids=None, nome=None, arvore=None):
+    """PIDs alvo de um encerramento em lote.
+
+    `pids`: lista explícita; `nome`: padrão estilo glob sobre o nome do
+    processo (ex.: "msedge*", sem diferenciar maiúsculas); `arvore`: PID
+    raiz, incluindo todos os descendentes. Critérios combinados somam.
+    """
+    alvos = []
+    for pid in pids or []:
+        alvos.append(int(pid))
+    if nome:
+        padrao = nome.lower()
+        alvos.extend(linha['pid'] for linha in get_tabela().listar()
+                     if fnmatch.fnmatchcase(linha['name'].lower(), padrao))
+    if arvore is not None:
+        raiz = int(arvore)
+        try:
+            # Filhos primeiro: a raiz (ex.: o gerenciador de um pool) não recria workers no meio
+            alvos.extend(filho.pid for filho in psutil.Process(raiz).children(recursive=True))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        alvos.append(raiz)
+    # Remove repetidos mantendo a ordem
+    return list(dict.fromkeys(alvos))
+
+
+# PID do supervisor no modo multi-worker (python -m app serve); None no processo único
+_supervisor_pid = None
+
+
+def definir_supervisor(pid):
+    global _supervisor_pid
+    _supervisor_pid = pid
+
+
+def pids_protegidos():
+    """PIDs que nunca são encerrados: este processo, seus filhos e quem o iniciou.
+
+    No modo multi-worker inclui o supervisor e toda a sua árvore (coletor e
+    os outros workers), lida a cada chamada porque filhos são reiniciados.
+    """
+    protegidos = {os.getpid(), os.getppid()}
+    raizes = [psutil.Process()]
+    if _supervisor_pid is not None:
+        protegidos.add(_supervisor_pid)
+        try:
+            raizes.append(psutil.Process(_supervisor_pid))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    for raiz in raizes:
+        try:
+            protegidos.update(filho.pid for filho in raiz.children(recursive=True))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return protegidos
+
+
+def encerrar_processos(pids, timeout=3.0, forcar=True, timeout_kill=2.0):
+    """Encerra vários processos e confirma a saída de cada um.
+
+    Envia SIGTERM (terminate) a todos, espera em conjunto com
+    `psutil.wait_procs` e, para os que não saíram no prazo, escala para
+    SIGKILL (kill) se `forcar`. Retorna um resultado por PID com o status:
+    encerrado, forcado, sobreviveu, nao_encontrado, acesso_negado ou protegido.
+    """
+    # Nunca encerra o próprio servidor (nem quem o iniciou, nem os processos irmãos)
+    protegidos = pids_protegidos()
+    resultados = {}
+    enviados = []
+    for pid in pids:
+        if pid in protegidos:
+            resultados[pid] = {'pid': pid, 'status': 'protegido', 'mensagem': 'Processo do próprio TaskMonitor'}
+            continue
+        try:
+            proc = psutil.Process(pid)
+            nome = proc.name()
+            proc.terminate()
+            enviados.append(proc)
+            resultados[pid] = {'pid': pid, 'name': nome, 'status': 'sobreviveu', 'mensagem': ''}
+        except psutil.NoSuchProcess:
+            resultados[pid] = {'pid': pid, 'status': 'nao_encontrado', 'mensagem': 'Processo não encontrado'}
+        except psutil.AccessDenied:
+            resultados[pid] = {'pid': pid, 'status': 'acesso_negado', 'mensagem': 'Acesso negado'}
+
+    _, vivos = psutil.wait_procs(enviados, timeout=timeout)
+    for proc in enviados:
+        if proc not in vivos:
+            resultados[proc.pid].update(status='encerrado', codigo_saida=getattr(proc, 'returncode', None))
+
+    if vivos and forcar:
+        for proc in vivos:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied:
+                resultados[proc.pid].update(status='acesso_negado', mensagem='Acesso negado ao forçar')
+        _, vivos = psutil.wait_procs(vivos, timeout=timeout_kill)
+        for proc in vivos:
+            resultados[proc.pid]['mensagem'] = resultados[proc.pid]['mensagem'] or 'Não saiu após SIGKILL'
+        for pid, resultado in resultados.items():
+            if resultado['status'] == 'sobreviveu' and all(proc.pid != pid for proc in vivos):
+                resultado['status'] = 'forcado'
+    else:
+        for proc in vivos:
+            resultados[proc.pid]['mensagem'] = f'Ainda em execução após {timeout} s'
+
+    return [resultados[pid] for pid in pids]
+
+
+def kill_process(pid):
+    """Encerra um processo pelo PID (aguarda a saída; força se necessário)"""
+    resultado = encerrar_processos([pid])[0]
+    if resultado['status'] in ('encerrado', 'forcado'):
         return {'status': 'encerrado', 'pid': pid}
-    except psutil.NoSuchProcess:
-        return {'status': 'erro', 'pid': pid, 'mensagem': 'Processo não encontrado'}
-    except psutil.AccessDenied:
-        return {'status': 'erro', 'pid': pid, 'mensagem': 'Acesso negado'}
-    except Exception as e:
-        return {'status': 'erro', 'pid': pid, 'mensagem': str(e)}
+    return {'status': 'erro', 'pid': pid, 'mensagem': resultado['mensagem']}
@@ -0,0 +1,37 @@
+import importlib
+import threading
+
+_modulos = {}
+_lock = threading.Lock()
+
+
+def importar_opcional(nome):
+    """Importa `nome` uma única vez; retorna o módulo ou None se não estiver instalado.
+
+    O resultado negativo também fica em cache: um import que falha varre o
+    sys.path de novo a cada tentativa, e um pacote ausente não passa a
+    existir com o processo rodando.
+    """
+    try:
+        return _modulos[nome]
+    except KeyError:
+        pass
+    with _lock:
+        if nome not in _modulos:
+            try:
+                _modulos[nome] = importlib.import_module(nome)
+            except ImportError:
+                _modulos[nome] = None
+        return _modulos[nome]
+
+
+def carregar(nome):
+    """Como importar_opcional, para dependências obrigatórias (ImportError se faltar)"""
+    modulo = importar_opcional(nome)
+    if modulo is None:
+        raise ImportError(f"Módulo '{nome}' não instalado (veja requirements.txt)")
+    return modulo
+
+
+def disponivel(nome):
+    return importar_opcional(nome) is not None
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Código executado em um interpretador novo para cada modo. Cada um imprime,
+# na última linha, os módulos pesados que acabaram carregados.
+MODOS = {
+    'pacote': (
+        "import sys\n"
+        "import app\n"
+    ),
+    'cli': (
+        "import sys\n"
+        "from app.cli import criar_parser\n"
+        "criar_parser()\n"
+    ),
+    'agente': (
+        "import sys\n"
+        "from app.coletor import iniciar_coletor\n"
+        "from app.frota import Agente\n"
+        "coletor = iniciar_coletor(1.0)\n"
+        "coletor.assinar(Agente('http://127.0.0.1:9', 'partida').registrar_snapshot)\n"
+        "coletor.snapshot(timeout=10)\n"
+    ),
+    'servidor': (
+        "import sys\n"
+        "from app import create_app\n"
+        "create_app({'IP_PUBLICO_URL': '', 'BACKUP_AGENDA': None, 'COLETOR_ATIVO': False})\n"
+    )
+}
+
+# Limite de cada modo (segundos, interpretador incluso) e módulos que ele não deve importar
+ORCAMENTO_PADRAO = {'pacote': 0.3, 'cli': 0.5, 'agente': 0.8, 'servidor': 2.0}
+# NumPy e PyArrow só entram na primeira análise/exportação Parquet
+PESADOS = ('numpy', 'pyarrow')
+PROIBIDOS = {
+    'pacote': ('flask', 'requests', 'psutil', 'sqlite3') + PESADOS,
+    'cli': ('flask', 'requests', 'psutil', 'sqlite3') + PESADOS,
+    'agente': ('flask', 'requests', 'jinja2') + PESADOS,
+    'servidor': ('requests',) + PESADOS
+}
+
+_RELATORIO = "print('\\n' + __import__('json').dumps(sorted(m for m in {proibidos!r} if m in sys.modules)))\n"
+
+
+def medir_partida(modo, repeticoes=3):
+    """Menor tempo (s) de `repeticoes` partidas a frio do modo e os módulos proibidos carregados.
+
+    Roda em uma pasta temporária para não criar banco/backups no projeto.
+    """
+    codigo = MODOS[modo] + _RELATORIO.format(proibidos=PROIBIDOS[modo])
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [raiz, os.environ.get('PYTHONPATH')])))
+    tempos = []
+    carregados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = subprocess.run([sys.executable, '-c', codigo], cwd=pasta, env=ambiente,
+                                       capture_output=True, text=True, timeout=60)
+            tempos.append(time.perf_counter() - inicio)
+            if resultado.returncode != 0:
+                raise RuntimeError(f'Modo {modo} falhou:\n{resultado.stderr.strip()}')
+            carregados = json.loads(resultado.stdout.strip().splitlines()[-1])
+    return {'modo': modo, 'segundos': round(min(tempos), 3), 'proibidos_carregados': carregados}
+
+
+def verificar_partida(orcamento=None, repeticoes=3, modos=None):
+    """Mede os modos e compara com o orçamento; retorna (ok, resultados)"""
+    orcamento = dict(ORCAMENTO_PADRAO, **(orcamento or {}))
+    resultados = []
+    for modo in modos or MODOS:
+        medida = medir_partida(modo, repeticoes)
+        medida['orcamento'] = orcamento[modo]
+        medida['ok'] = medida['segundos'] <= orcamento[modo] and not medida['proibidos_carregados']
+        resultados.append(medida)
+    return all(r['ok'] for r in resultados), resultados
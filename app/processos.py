@@ -0,0 +1,303 @@
+import base64
+import bisect
+import heapq
+import json
+import sys
+import threading
+import time
+import psutil
+
+
+class TabelaProcessos:
+    """Tabela de processos de longa duração.
+
+    Mantém os objetos `psutil.Process` entre as atualizações: a cada tick
+    só cria entradas para PIDs novos e remove os que morreram. O uso de
+    CPU é calculado pela diferença de `cpu_times()` entre dois ticks,
+    normalizado pelo número de núcleos (0–100%), em vez de depender do
+    primeiro `cpu_percent()` de um objeto recém-criado (sempre 0.0).
+    """
+
+    def __init__(self):
+        self._entradas = {}
+        self._linhas = []
+        self._atualizado_em = None
+        self._lock = threading.Lock()
+        self._indice = None
+        self._num_cpus = psutil.cpu_count(logical=True) or 1
+        # Workers (modo multi-worker): as linhas vêm do processo coletor, nunca do psutil
+        self.remota = False
+
+    def _nova_entrada(self, pid):
+        proc = psutil.Process(pid)
+        with proc.oneshot():
+            entrada = {
+                'proc': proc,
+                'create_time': proc.create_time(),
+                'name': proc.name(),
+                'cpu_anterior': None,
+                't_anterior': None
+            }
+            # Atributos estáveis: lidos uma vez por processo, não a cada tick
+            for campo, ler in (('username', proc.username), ('exe', proc.exe),
+                               ('cmdline', lambda: ' '.join(proc.cmdline()))):
+                try:
+                    entrada[campo] = ler() or ''
+                except (psutil.AccessDenied, psutil.ZombieProcess, OSError):
+                    entrada[campo] = ''
+            return entrada
+
+    def atualizar(self):
+        """Sincroniza a tabela com o sistema e recalcula CPU/memória"""
+        with self._lock:
+            pids = set(psutil.pids())
+            if sys.platform == 'win32':
+                # "System Idle Process" não é consumo real
+                pids.discard(0)
+
+            for pid in self._entradas.keys() - pids:
+                del self._entradas[pid]
+
+            for pid in pids - self._entradas.keys():
+                try:
+                    self._entradas[pid] = self._nova_entrada(pid)
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+
+            mem_total = psutil.virtual_memory().total
+            linhas = []
+            mortos = []
+            for pid, entrada in self._entradas.items():
+                proc = entrada['proc']
+                cpu_percent = 0.0
+                rss = 0
+                ppid = entrada.get('ppid', 0)
+                try:
+                    with proc.oneshot():
+                        # PID reutilizado: o processo antigo morreu entre dois ticks
+                        if proc.create_time() != entrada['create_time']:
+                            mortos.append(pid)
+                            continue
+                        # Pode mudar se o pai morrer (processo adotado)
+                        ppid = entrada['ppid'] = proc.ppid()
+                        tempos = proc.cpu_times()
+                        rss = proc.memory_info().rss
+                    agora = time.monotonic()
+                    cpu_total = tempos.user + tempos.system
+                    if entrada['t_anterior'] is not None:
+                        decorrido = agora - entrada['t_anterior']
+                        if decorrido > 0:
+                            cpu_percent = (cpu_total - entrada['cpu_anterior']) / decorrido / self._num_cpus * 100
+                    entrada['cpu_anterior'] = cpu_total
+                    entrada['t_anterior'] = agora
+                except psutil.NoSuchProcess:
+                    mortos.append(pid)
+                    continue
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+
+                linhas.append({
+                    'pid': pid,
+                    'ppid': ppid,
+                    'name': entrada['name'],
+                    'username': entrada['username'],
+                    'exe': entrada['exe'],
+                    'cmdline': entrada['cmdline'],
+                    'create_time': entrada['create_time'],
+                    'cpu_percent': round(min(max(cpu_percent, 0.0), 100.0), 1),
+                    'memory_percent': round(rss / mem_total * 100, 2) if mem_total else 0,
+                    'rss': rss
+                })
+
+            for pid in mortos:
+                del self._entradas[pid]
+
+            # Publica a nova lista de uma vez; leitores nunca veem uma tabela parcial
+            self._linhas = linhas
+            self._atualizado_em = time.time()
+
+    def carregar(self, linhas, atualizado_em=None):
+        """Substitui o conteúdo por linhas vindas de outro processo (modo multi-worker)"""
+        self._linhas = linhas
+        self._atualizado_em = atualizado_em or time.time()
+
+    def processo(self, pid):
+        """Objeto `psutil.Process` mantido pela tabela (None se não estiver nela)"""
+        entrada = self._entradas.get(pid)
+        return entrada['proc'] if entrada else None
+
+    def listar(self):
+        if self._atualizado_em is None and not self.remota:
+            self.atualizar()
+        return self._linhas
+
+    def indice(self):
+        """Índice da lista atual (refeito só quando a lista muda)"""
+        linhas = self.listar()
+        indice = self._indice
+        if indice is None or indice.linhas is not linhas:
+            indice = self._indice = IndiceProcessos(linhas)
+        return indice
+
+    def top(self, n, chave='cpu_percent', minimo=None):
+        """Top-N por `chave` via heap (O(N log n)) em vez de ordenar a lista inteira"""
+        linhas = self.listar()
+        if minimo is not None:
+            linhas = (linha for linha in linhas if linha[chave] >= minimo)
+        return heapq.nlargest(n, linhas, key=lambda linha: linha[chave])
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# Colunas aceitas para ordenação e campos de busca textual
+COLUNAS = ('pid', 'ppid', 'name', 'username', 'exe', 'cmdline', 'create_time',
+           'cpu_percent', 'memory_percent', 'rss')
+CAMPOS_BUSCA = {'nome': 'name', 'cmdline': 'cmdline', 'usuario': 'username'}
+COLUNAS_GRUPO = ('executavel', 'processos', 'cpu_percent', 'memory_percent', 'rss')
+
+
+class IndiceProcessos:
+    """Índices de uma lista de processos publicada pela tabela.
+
+    Construído uma vez por tick (na primeira consulta): PID -> linha,
+    PPID -> filhos e textos de busca já em minúsculas. Ordenações e o
+    agrupamento por executável são calculados sob demanda e reaproveitados
+    até a próxima atualização da tabela.
+    """
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.por_pid = {linha['pid']: linha for linha in linhas}
+        self.filhos = {}
+        for linha in linhas:
+            if linha['ppid'] != linha['pid']:
+                self.filhos.setdefault(linha['ppid'], []).append(linha['pid'])
+        self.textos = {
+            campo: [linha[coluna].lower() for linha in linhas]
+            for campo, coluna in CAMPOS_BUSCA.items()
+        }
+        self._ordenacoes = {}
+        self._grupos = None
+        self._lock = threading.Lock()
+
+    def buscar(self, termo=None, padrao=None, campos=None):
+        """Linhas cujo nome/cmdline/usuário contém `termo` ou casa com a regex `padrao`"""
+        campos = campos or list(CAMPOS_BUSCA)
+        if termo:
+            termo = termo.lower()
+            textos = [self.textos[c] for c in campos]
+            return [linha for i, linha in enumerate(self.linhas) if any(termo in t[i] for t in textos)]
+        if padrao is not None:
+            colunas = [CAMPOS_BUSCA[c] for c in campos]
+            return [linha for linha in self.linhas if any(padrao.search(linha[c]) for c in colunas)]
+        return self.linhas
+
+    def ordenar(self, coluna):
+        """Linhas e chaves (valor, pid) em ordem crescente de `coluna`"""
+        with self._lock:
+            ordenacao = self._ordenacoes.get(coluna)
+            if ordenacao is None:
+                linhas = sorted(self.linhas, key=lambda linha: (linha[coluna], linha['pid']))
+                chaves = [(linha[coluna], linha['pid']) for linha in linhas]
+                ordenacao = self._ordenacoes[coluna] = (linhas, chaves)
+            return ordenacao
+
+    def grupos(self):
+        """Processos somados por executável, calculado uma vez por tick"""
+        with self._lock:
+            if self._grupos is None:
+                self._grupos = agrupar(self.linhas)
+            return self._grupos
+
+    def arvore(self, pid, visiveis=None, profundidade=64):
+        """Nó da árvore de processos a partir de `pid` (filhos restritos a `visiveis`, se dado)"""
+        linha = self.por_pid[pid]
+        filhos = []
+        if profundidade > 0:
+            for filho in sorted(self.filhos.get(pid, [])):
+                if filho in self.por_pid and (visiveis is None or filho in visiveis):
+                    filhos.append(self.arvore(filho, visiveis, profundidade - 1))
+        return dict(linha, filhos=filhos)
+
+
+def agrupar(linhas):
+    """Soma CPU/memória dos processos por executável (ou nome, sem acesso ao caminho)"""
+    grupos = {}
+    for linha in linhas:
+        executavel = linha['exe'] or linha['name']
+        grupo = grupos.get(executavel)
+        if grupo is None:
+            grupo = grupos[executavel] = {
+                'executavel': executavel,
+                'name': linha['name'],
+                'processos': 0,
+                'cpu_percent': 0.0,
+                'memory_percent': 0.0,
+                'rss': 0,
+                'pids': []
+            }
+        grupo['processos'] += 1
+        grupo['cpu_percent'] += linha['cpu_percent']
+        grupo['memory_percent'] += linha['memory_percent']
+        grupo['rss'] += linha['rss']
+        grupo['pids'].append(linha['pid'])
+    for grupo in grupos.values():
+        grupo['cpu_percent'] = round(grupo['cpu_percent'], 1)
+        grupo['memory_percent'] = round(grupo['memory_percent'], 2)
+    return list(grupos.values())
+
+
+def paginar(itens, chaves, limite, cursor=None, decrescente=False):
+    """Página de `itens` (já em ordem crescente de `chaves`) a partir do cursor.
+
+    O cursor é a chave do último item da página anterior, então a página
+    seguinte continua correta mesmo que a lista mude entre as requisições.
+    Retorna (pagina, chave_do_ultimo ou None se não houver mais itens).
+    """
+    if decrescente:
+        fim = bisect.bisect_left(chaves, cursor) if cursor is not None else len(chaves)
+        inicio = max(0, fim - limite)
+        pagina = itens[inicio:fim][::-1]
+        mais = inicio > 0
+    else:
+        inicio = bisect.bisect_right(chaves, cursor) if cursor is not None else 0
+        fim = inicio + limite
+        pagina = itens[inicio:fim]
+        mais = fim < len(itens)
+    ultima = None
+    if pagina and mais:
+        ultima = chaves[inicio] if decrescente else chaves[fim - 1]
+    return pagina, ultima
+
+
+def codificar_cursor(chave):
+    return base64.urlsafe_b64encode(json.dumps(chave, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii'))))
+
+
+_tabela = None
+_lock = threading.Lock()
+
+
+def get_tabela():
+    """Retorna a tabela global de processos (atualizada pelo coletor)"""
+    global _tabela
+    if _tabela is None:
+        with _lock:
+            if _tabela is None:
+                _tabela = TabelaProcessos()
+    return _tabela
+
+
+def resumo_processo(linha):
+    """Campos expostos pelas rotas (pid, name, cpu_percent, memory_percent)"""
+    return {
+        'pid': linha['pid'],
+        'name': linha['name'],
+        'cpu_percent': linha['cpu_percent'],
+        'memory_percent': linha['memory_percent']
+    }
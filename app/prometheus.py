@@ -0,0 +1,147 @@
+import gzip
+import threading
+from .processos import get_tabela
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Processos exportados (por CPU e por memória)
+TOP_PROCESSOS = 10
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Familia:
+    """Uma métrica no formato de exposição de texto (HELP, TYPE e amostras)"""
+
+    def __init__(self, nome, tipo, ajuda):
+        self.nome = nome
+        self.tipo = tipo
+        self.ajuda = ajuda
+        self.amostras = []
+
+    def adicionar(self, valor, **rotulos):
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            self.amostras.append((rotulos, valor))
+        return self
+
+    def linhas(self):
+        yield f'# HELP {self.nome} {self.ajuda}'
+        yield f'# TYPE {self.nome} {self.tipo}'
+        for rotulos, valor in self.amostras:
+            if rotulos:
+                texto = ','.join(f'{k}="{_escapar(v)}"' for k, v in rotulos.items())
+                yield f'{self.nome}{{{texto}}} {valor!r}'
+            else:
+                yield f'{self.nome} {valor!r}'
+
+
+def renderizar(snapshot, processos):
+    """Converte o snapshot do coletor (e a tabela de processos) em texto Prometheus"""
+    familias = []
+
+    def familia(nome, tipo, ajuda):
+        f = _Familia('taskmonitor_' + nome, tipo, ajuda)
+        familias.append(f)
+        return f
+
+    status = snapshot['status']
+    familia('cpu_percent', 'gauge', 'Uso de CPU (%)').adicionar(status['cpu'])
+    familia('cpu_frequency_mhz', 'gauge', 'Frequência atual da CPU (MHz)').adicionar(snapshot['cpu_frequencia'])
+    familia('cpu_temperature_celsius', 'gauge', 'Temperatura da CPU').adicionar(status.get('cpu_temperatura'))
+    familia('boot_time_seconds', 'gauge', 'Horário do boot (epoch)').adicionar(snapshot['boot_time'])
+    familia('snapshot_timestamp_seconds', 'gauge', 'Horário da coleta do snapshot (epoch)').adicionar(snapshot['coletado_em'])
+
+    memoria = snapshot['memoria']
+    f = familia('memory_bytes', 'gauge', 'Memória física (bytes)')
+    for estado, chave in (('total', 'total'), ('used', 'usado'), ('available', 'disponivel')):
+        f.adicionar(memoria[chave], state=estado)
+    familia('memory_percent', 'gauge', 'Uso de memória (%)').adicionar(memoria['percent'])
+
+    f_uso = familia('filesystem_bytes', 'gauge', 'Espaço por partição (bytes)')
+    f_pct = familia('filesystem_percent', 'gauge', 'Uso por partição (%)')
+    for particao in snapshot.get('particoes', []):
+        rotulos = {'device': particao['dispositivo'], 'mountpoint': particao['ponto_montagem'],
+                   'fstype': particao['tipo']}
+        for estado, chave in (('total', 'total'), ('used', 'usado'), ('free', 'livre')):
+            f_uso.adicionar(particao[chave], state=estado, **rotulos)
+        f_pct.adicionar(particao['percent'], **rotulos)
+
+    f_bytes = familia('network_bytes_total', 'counter', 'Bytes trafegados por interface')
+    f_pacotes = familia('network_packets_total', 'counter', 'Pacotes trafegados por interface')
+    f_erros = familia('network_errors_total', 'counter', 'Erros por interface')
+    f_descartes = familia('network_drops_total', 'counter', 'Pacotes descartados por interface')
+    for nome, c in sorted(snapshot.get('interfaces', {}).items()):
+        for direcao, sufixo_bytes, sufixo in (('sent', 'enviados', 'saida'), ('received', 'recebidos', 'entrada')):
+            f_bytes.adicionar(c['bytes_' + sufixo_bytes], interface=nome, direction=direcao)
+            f_pacotes.adicionar(c['pacotes_' + sufixo_bytes], interface=nome, direction=direcao)
+            f_erros.adicionar(c['erros_' + sufixo], interface=nome, direction=direcao)
+            f_descartes.adicionar(c['descartes_' + sufixo], interface=nome, direction=direcao)
+
+    f_bytes = familia('disk_io_bytes_total', 'counter', 'Bytes lidos/escritos por disco')
+    f_ops = familia('disk_io_operations_total', 'counter', 'Operações de leitura/escrita por disco')
+    for nome, c in sorted(snapshot.get('discos_io', {}).items()):
+        f_bytes.adicionar(c['bytes_lidos'], disk=nome, direction='read')
+        f_bytes.adicionar(c['bytes_escritos'], disk=nome, direction='write')
+        f_ops.adicionar(c['leituras'], disk=nome, direction='read')
+        f_ops.adicionar(c['escritas'], disk=nome, direction='write')
+
+    f_cpu = familia('process_cpu_percent', 'gauge', f'Uso de CPU dos {TOP_PROCESSOS} maiores processos (%)')
+    f_rss = familia('process_resident_memory_bytes', 'gauge', f'Memória residente dos {TOP_PROCESSOS} maiores processos')
+    for linha in processos:
+        rotulos = {'pid': linha['pid'], 'name': linha['name']}
+        f_cpu.adicionar(linha['cpu_percent'], **rotulos)
+        f_rss.adicionar(linha['rss'], **rotulos)
+
+    f = familia('alert_active', 'gauge', 'Alertas disparados (1 = ativo)')
+    for alerta in snapshot.get('alertas', {}).get('ativos', []):
+        f.adicionar(1, rule=alerta['regra'], severity=alerta['severidade'])
+
+    linhas = [linha for f in familias for linha in f.linhas()]
+    return '\n'.join(linhas) + '\n'
+
+
+class CacheMetricas:
+    """Resposta do /metrics codificada uma vez por snapshot.
+
+    O texto (e sua versão gzip) só é gerado no primeiro scrape depois de um
+    novo snapshot; os seguintes devolvem os mesmos bytes. Nada aqui chama
+    o psutil: tudo vem do snapshot e da tabela de processos do coletor.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chave = None
+        self._corpo = None
+        self._corpo_gzip = None
+
+    def obter(self, snapshot, comprimido=False):
+        chave = snapshot['coletado_em']
+        if chave != self._chave:
+            with self._lock:
+                # Outra thread pode ter gerado enquanto esperávamos o lock
+                if chave != self._chave:
+                    tabela = get_tabela()
+                    pids = set()
+                    processos = []
+                    for linha in tabela.top(TOP_PROCESSOS, 'cpu_percent') + tabela.top(TOP_PROCESSOS, 'rss'):
+                        if linha['pid'] not in pids:
+                            pids.add(linha['pid'])
+                            processos.append(linha)
+                    self._corpo = renderizar(snapshot, processos).encode('utf-8')
+                    self._corpo_gzip = None
+                    self._chave = chave
+        if comprimido:
+            with self._lock:
+                if self._corpo_gzip is None:
+                    self._corpo_gzip = gzip.compress(self._corpo, compresslevel=6, mtime=0)
+                return self._corpo_gzip
+        return self._corpo
+
+
+_cache = CacheMetricas()
+
+
+def get_cache():
+    return _cache
@@ -0,0 +1,221 @@
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+
+# Entrada do índice: timestamp (float64), offset (uint64), tamanho (uint32)
+FORMATO_INDICE = '<dQI'
+TAMANHO_ENTRADA = struct.calcsize(FORMATO_INDICE)
+
+PREFIXO_SEGMENTO = 'backup_'
+EXTENSAO_SEGMENTO = '.ndjson.gz'
+EXTENSAO_INDICE = '.idx'
+# Marca no nome dos segmentos de backups antigos importados (fora da retenção)
+SUFIXO_LEGADO = '_legado'
+
+
+class LogBackup:
+    """Log de backups append-only em segmentos NDJSON comprimidos.
+
+    Cada registro é gravado como um membro gzip independente no fim do
+    segmento atual (um arquivo gzip com vários membros continua válido
+    para `gzip.open`/`zcat`). Ao lado de cada segmento fica um índice
+    binário de tamanho fixo (timestamp, offset, tamanho) que permite ler
+    qualquer registro com um único `seek`, sem descomprimir o segmento
+    inteiro. O segmento é rotacionado por tamanho ou idade.
+    """
+
+    def __init__(self, pasta='backups/segmentos', tamanho_maximo=16 * 1024 * 1024,
+                 idade_maxima=86400.0, nivel_compressao=6, sufixo=''):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self.idade_maxima = idade_maxima
+        self.nivel_compressao = nivel_compressao
+        self.sufixo = sufixo
+        self._legados = {}
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._indice = None
+        self._segmento = None
+        self._aberto_em = None
+        os.makedirs(pasta, exist_ok=True)
+
+    # --- escrita -------------------------------------------------------
+
+    def _caminho(self, segmento, extensao=EXTENSAO_SEGMENTO):
+        return os.path.join(self.pasta, segmento + extensao)
+
+    def _abrir_segmento(self, ts):
+        self._fechar_segmento()
+        nome = PREFIXO_SEGMENTO + time.strftime('%Y%m%d_%H%M%S', time.localtime(ts)) + self.sufixo
+        # Dois segmentos no mesmo segundo (rotação por tamanho): sufixo incremental
+        segmento, n = nome, 1
+        while os.path.exists(self._caminho(segmento)):
+            segmento = f'{nome}_{n}'
+            n += 1
+        self._segmento = segmento
+        self._arquivo = open(self._caminho(segmento), 'ab')
+        self._indice = open(self._caminho(segmento, EXTENSAO_INDICE), 'ab')
+        self._aberto_em = ts
+
+    def _fechar_segmento(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._indice.close()
+        self._arquivo = self._indice = self._segmento = None
+
+    def _precisa_rotacionar(self, ts):
+        if self._arquivo is None:
+            return True
+        if self._arquivo.tell() >= self.tamanho_maximo:
+            return True
+        return ts - self._aberto_em >= self.idade_maxima
+
+    def anexar(self, registro, ts=None):
+        """Grava o registro e retorna (segmento, offset, tamanho)"""
+        if ts is None:
+            ts = time.time()
+        linha = json.dumps(registro, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        dados = gzip.compress(linha, compresslevel=self.nivel_compressao, mtime=0)
+        with self._lock:
+            if self._precisa_rotacionar(ts):
+                self._abrir_segmento(ts)
+            offset = self._arquivo.tell()
+            self._arquivo.write(dados)
+            self._arquivo.flush()
+            self._indice.write(struct.pack(FORMATO_INDICE, ts, offset, len(dados)))
+            self._indice.flush()
+            return self._segmento, offset, len(dados)
+
+    def fechar(self):
+        with self._lock:
+            self._fechar_segmento()
+
+    def podar(self, manter):
+        """Remove os registros cujas chaves (segmento, offset) não estão em `manter`.
+
+        Segmentos sem nenhum registro mantido são apagados; os parcialmente
+        mantidos são reescritos em um novo segmento (sufixo `_0c<n>`, que
+        preserva a ordem por nome) copiando os membros gzip sem recomprimir.
+        O segmento aberto para escrita nunca é tocado. Retorna o número de
+        registros removidos.
+        """
+        removidos = 0
+        for segmento in self.segmentos():
+            if segmento == self._segmento:
+                continue
+            entradas = self.indice(segmento)
+            mantidas = [e for e in entradas if (segmento, e[1]) in manter]
+            if len(mantidas) == len(entradas):
+                continue
+            removidos += len(entradas) - len(mantidas)
+            if mantidas:
+                self._reescrever(segmento, mantidas)
+            os.remove(self._caminho(segmento, EXTENSAO_INDICE))
+            os.remove(self._caminho(segmento))
+        return removidos
+
+    def _reescrever(self, segmento, entradas):
+        # "_0c" ordena logo após o original e antes de um "_1" de rotação no mesmo segundo
+        base = segmento.split('_0c')[0]
+        n = 1
+        while os.path.exists(self._caminho(f'{base}_0c{n:03d}')) or f'{base}_0c{n:03d}' <= segmento:
+            n += 1
+        novo = f'{base}_0c{n:03d}'
+        temporario = self._caminho(novo) + '.tmp'
+        indice = bytearray()
+        with open(self._caminho(segmento), 'rb') as origem, open(temporario, 'wb') as destino:
+            for ts, offset, tamanho in entradas:
+                origem.seek(offset)
+                indice += struct.pack(FORMATO_INDICE, ts, destino.tell(), tamanho)
+                destino.write(origem.read(tamanho))
+        with open(self._caminho(novo, EXTENSAO_INDICE), 'wb') as f:
+            f.write(indice)
+        os.replace(temporario, self._caminho(novo))
+
+    # --- leitura -------------------------------------------------------
+
+    def segmentos(self):
+        """Nomes dos segmentos, do mais antigo para o mais recente"""
+        nomes = [
+            nome[:-len(EXTENSAO_SEGMENTO)]
+            for nome in os.listdir(self.pasta)
+            if nome.startswith(PREFIXO_SEGMENTO) and nome.endswith(EXTENSAO_SEGMENTO)
+        ]
+        return sorted(nomes)
+
+    def legado(self, segmento):
+        """Segmento de backups antigos importados (`importar-legado`)?
+
+        Importações feitas antes do sufixo no nome são reconhecidas pelo
+        primeiro registro (`importado_de`); a resposta fica em cache.
+        """
+        if SUFIXO_LEGADO in segmento:
+            return True
+        if segmento not in self._legados:
+            entradas = self.indice(segmento)
+            self._legados[segmento] = bool(entradas) and 'importado_de' in self.ler(segmento, *entradas[0][1:])
+        return self._legados[segmento]
+
+    def indice(self, segmento):
+        """Entradas (ts, offset, tamanho) do índice de um segmento"""
+        try:
+            with open(self._caminho(segmento, EXTENSAO_INDICE), 'rb') as f:
+                dados = f.read()
+        except FileNotFoundError:
+            return []
+        # Ignora uma entrada final incompleta (queda durante a gravação)
+        dados = dados[:len(dados) - len(dados) % TAMANHO_ENTRADA]
+        return list(struct.iter_unpack(FORMATO_INDICE, dados))
+
+    def ler(self, segmento, offset, tamanho):
+        """Lê um único registro pelo offset"""
+        with open(self._caminho(segmento), 'rb') as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(tamanho)))
+
+    def recentes(self, n):
+        """As `n` entradas mais recentes como (ts, segmento, offset, tamanho), da mais nova para a mais antiga"""
+        resultado = []
+        for segmento in reversed(self.segmentos()):
+            for ts, offset, tamanho in reversed(self.indice(segmento)):
+                resultado.append((ts, segmento, offset, tamanho))
+                if len(resultado) >= n:
+                    return resultado
+        return resultado
+
+    def total(self):
+        return sum(len(self.indice(segmento)) for segmento in self.segmentos())
+
+    def iterar(self, inicio=None, fim=None):
+        """Percorre os registros em ordem cronológica, opcionalmente filtrando por tempo"""
+        for segmento in self.segmentos():
+            entradas = self.indice(segmento)
+            if not entradas:
+                continue
+            if fim is not None and entradas[0][0] > fim:
+                break
+            if inicio is not None and entradas[-1][0] < inicio:
+                continue
+            with open(self._caminho(segmento), 'rb') as f:
+                for ts, offset, tamanho in entradas:
+                    if (inicio is not None and ts < inicio) or (fim is not None and ts > fim):
+                        continue
+                    f.seek(offset)
+                    yield ts, json.loads(gzip.decompress(f.read(tamanho)))
+
+
+_log = None
+_lock = threading.Lock()
+
+
+def get_log(pasta='backups/segmentos'):
+    """Retorna o log de backups global"""
+    global _log
+    if _log is None:
+        with _lock:
+            if _log is None:
+                _log = LogBackup(pasta)
+    return _log
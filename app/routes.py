@@ -1,14 +1,77 @@
-from flask import Blueprint, render_template, jsonify, request
-from .monitor import get_status
+from flask import Blueprint, Response, current_app, render_template, jsonify, request
+from . import monitor
+from .coletor import get_coletor, get_snapshot
+from .ip_publico import get_ip_publico
+from .processos import (get_tabela, resumo_processo, agrupar, paginar, codificar_cursor,
+                        decodificar_cursor, COLUNAS, COLUNAS_GRUPO, CAMPOS_BUSCA)
+from .metricas import get_armazem
+from .series import escolher_resolucao, consultar_serie
+from .analise import ANALISES, analisar
+from .exportacao import (FORMATOS, FONTES, COLUNAS_BACKUP, COLUNAS_METRICAS, colunas_backup, exportar,
+                         linhas_backup, linhas_metricas, registros_backup, resolucao_padrao)
+from .opcionais import disponivel
+from .stream import get_difusor, estado_dashboard
 from .backup_new import criar_backup_novo
-import psutil
-import os
-import glob
+from .catalogo_backup import get_catalogo
+from .agendador_backup import get_agendador
+from .historico_processos import get_historico
+from .alertas import REGRAS_PADRAO, consultar_eventos, get_motor
+from .prometheus import TIPO_CONTEUDO, get_cache
+from .frota import get_frota
+from .instrumentacao import get_instrumentacao
+from .compartilhado import pedir
+import datetime
+import gzip
+import json
+import re
+import time
 
 
 main = Blueprint('main', __name__)
 
 
+@main.before_request
+def _iniciar_cronometro():
+    request.environ['taskmonitor.inicio'] = time.perf_counter()
+
+
+@main.after_request
+def _registrar_duracao(resposta):
+    """Tempo de cada rota (pelo padrão da URL, ex.: /api/processos/<int:pid>/historico)"""
+    instrumentacao = get_instrumentacao()
+    if not instrumentacao.ativa:
+        return resposta
+    # Um único acesso ao proxy `request` (cada acesso custa ~1 µs)
+    requisicao = request._get_current_object()
+    inicio = requisicao.environ.get('taskmonitor.inicio')
+    if inicio is None:
+        return resposta
+    decorrido = time.perf_counter() - inicio
+    regra = requisicao.url_rule.rule if requisicao.url_rule is not None else requisicao.path
+    instrumentacao.registrar('rotas', f'{requisicao.method} {regra}', decorrido)
+    if resposta.status_code >= 500:
+        instrumentacao.contar(f'erros.rotas.{regra}')
+    resposta.headers['Server-Timing'] = f'app;dur={decorrido * 1000:.2f}'
+    return resposta
+
+
+def _marcar_espectador():
+    """Alguém está olhando o dashboard: o coletor entra em rajada (amostragem adaptativa)"""
+    coletor = get_coletor()
+    if coletor is not None:
+        coletor.registrar_espectador()
+
+
+def _quadros_assistidos(quadros):
+    """Repassa os quadros do /stream mantendo o coletor em rajada enquanto houver cliente"""
+    try:
+        for quadro in quadros:
+            _marcar_espectador()
+            yield quadro
+    finally:
+        quadros.close()
+
+
 
 @main.route('/')
 def index():
@@ -17,66 +80,106 @@ def index():
 
 @main.route('/status')  
 def status():
-    return jsonify(get_status())  
+    _marcar_espectador()
+    snapshot = get_snapshot()
+    dados = dict(snapshot['status'])
+    dados['idade_snapshot'] = snapshot['idade_snapshot']
+    if 'amostragem' in snapshot:
+        dados['amostragem'] = {'modo': snapshot['amostragem']['modo'], 'intervalo': snapshot['amostragem']['proximo']}
+    return jsonify(dados)
+
+
+
+# Seções aceitas por /api/snapshot?fields=
+CAMPOS_SNAPSHOT = ('status', 'rede', 'hardware', 'uptime', 'processos')
+
+
+@main.route('/api/snapshot')
+def api_snapshot():
+    """
+    Status, rede, hardware, uptime e processos em uma única resposta, montada
+    a partir do snapshot do coletor. Suporta ETag/If-None-Match (304).
+    """
+    campos = [c for c in request.args.get('fields', ','.join(CAMPOS_SNAPSHOT)).split(',') if c]
+    invalidos = [c for c in campos if c not in CAMPOS_SNAPSHOT]
+    if invalidos:
+        return jsonify({'erro': f'Campos inválidos: {", ".join(invalidos)}', 'disponiveis': CAMPOS_SNAPSHOT}), 400
+    
+    _marcar_espectador()
+    snapshot = get_snapshot()
+    estado = estado_dashboard(snapshot)
+    dados = {campo: estado[campo] for campo in campos if campo in estado}
+    if 'processos' in campos:
+        dados['processos'] = [resumo_processo(p) for p in get_tabela().top(30, 'cpu_percent')]
+    
+    # A idade fica no cabeçalho para não invalidar o ETag a cada requisição
+    resposta = jsonify(dados)
+    resposta.headers['X-Idade-Snapshot'] = str(snapshot['idade_snapshot'])
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.add_etag()
+    return resposta.make_conditional(request)
+
+
+
+@main.route('/stream')
+def stream():
+    """Server-Sent Events: envia o estado do coletor (só os campos alterados)"""
+    difusor = get_difusor()
+    if not difusor.reservar():
+        return jsonify({'erro': 'Limite de conexões do stream atingido'}), 503
+    
+    resposta = Response(_quadros_assistidos(difusor.quadros()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # A vaga volta no fechamento da resposta, mesmo que nenhum quadro tenha sido enviado
+    resposta.call_on_close(difusor.liberar)
+    return resposta
 
 
 
 @main.route('/logs')
 def logs():
     """
-    Lista todos os arquivos de backup da pasta backups/
+    Lista os backups do catálogo (log append-only e antigos .txt)
     Retorna conteúdo dos últimos 10 backups.
     """
     try:
-        # Verifica se a pasta backups existe
-        if not os.path.exists('backups'):
-            return "📁 Nenhum backup encontrado. Crie um backup primeiro!"
-        
-        # Lista todos os arquivos .txt na pasta backups
-        arquivos_backup = glob.glob('backups/resumo_backup_*.txt')
+        catalogo = get_catalogo()
+        total = catalogo.total()
+        entradas, _ = catalogo.listar(limite=10)
         
-        if not arquivos_backup:
+        if not entradas:
             return "📁 Nenhum backup encontrado. Crie um backup primeiro!"
         
-        # Ordena por data de modificação (mais recente primeiro)
-        arquivos_backup.sort(key=os.path.getmtime, reverse=True)
-        
-        # Pega os 10 mais recentes
-        arquivos_recentes = arquivos_backup[:10]
-        
         # Monta lista com informações dos backups
         logs_conteudo = []
         logs_conteudo.append("=" * 60)
         logs_conteudo.append("📋 HISTÓRICO DE BACKUPS - TASKMONITOR PRO 2")
         logs_conteudo.append("=" * 60)
-        logs_conteudo.append(f"\nTotal de backups encontrados: {len(arquivos_backup)}")
-        logs_conteudo.append(f"Mostrando os {len(arquivos_recentes)} mais recentes:\n")
+        logs_conteudo.append(f"\nTotal de backups encontrados: {total}")
+        logs_conteudo.append(f"Mostrando os {len(entradas)} mais recentes:\n")
         
-        for i, arquivo in enumerate(arquivos_recentes, 1):
-            nome_arquivo = os.path.basename(arquivo)
-            tamanho = os.path.getsize(arquivo)
-            data_mod = os.path.getmtime(arquivo)
-            
-            import datetime
-            data_formatada = datetime.datetime.fromtimestamp(data_mod).strftime('%d/%m/%Y %H:%M:%S')
-            
+        for i, entrada in enumerate(entradas, 1):
             logs_conteudo.append(f"\n{'=' * 60}")
-            logs_conteudo.append(f"📄 BACKUP #{i}: {nome_arquivo}")
-            logs_conteudo.append(f"   📅 Data: {data_formatada}")
-            logs_conteudo.append(f"   📦 Tamanho: {tamanho / 1024:.2f} KB")
+            logs_conteudo.append(f"📄 BACKUP #{i}: {entrada['id']}")
+            logs_conteudo.append(f"   📅 Data: {entrada['data']}")
+            logs_conteudo.append(f"   📦 Tamanho: {entrada['tamanho'] / 1024:.2f} KB")
             logs_conteudo.append(f"{'=' * 60}\n")
             
-            # Lê o conteúdo do backup
+            # Lê só o necessário: limita a 2000 caracteres para não sobrecarregar
             try:
-                with open(arquivo, 'r', encoding='utf-8') as f:
-                    conteudo = f.read()
-                    # Limita a 2000 caracteres para não sobrecarregar
+                conteudo = ''
+                for bloco in catalogo.conteudo(entrada['id'], tamanho_bloco=2048):
+                    conteudo += bloco
                     if len(conteudo) > 2000:
-                        logs_conteudo.append(conteudo[:2000] + "\n\n... [CONTEÚDO TRUNCADO] ...\n")
-                    else:
-                        logs_conteudo.append(conteudo)
+                        break
+                if len(conteudo) > 2000:
+                    logs_conteudo.append(conteudo[:2000] + "\n\n... [CONTEÚDO TRUNCADO] ...\n")
+                else:
+                    logs_conteudo.append(conteudo)
             except Exception as e:
-                logs_conteudo.append(f"   ⚠️ Erro ao ler arquivo: {str(e)}\n")
+                logs_conteudo.append(f"   ⚠️ Erro ao ler backup: {str(e)}\n")
         
         logs_conteudo.append("\n" + "=" * 60)
         logs_conteudo.append("FIM DO HISTÓRICO DE BACKUPS")
@@ -89,117 +192,628 @@ def logs():
 
 
 
+@main.route('/api/backups')
+def api_backups():
+    """
+    Lista paginada de backups (mais recentes primeiro).
+    Parâmetros: limite, cursor (proximo_cursor da página anterior), de/ate (epoch).
+    """
+    try:
+        limite = max(1, min(int(request.args.get('limite', 20)), 500))
+        inicio = request.args.get('de', type=float)
+        fim = request.args.get('ate', type=float)
+        itens, proximo = get_catalogo().listar(limite, request.args.get('cursor'), inicio, fim)
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetro inválido: {e}'}), 400
+    
+    return jsonify({'itens': itens, 'proximo_cursor': proximo})
+
+
+
+@main.route('/api/backups/<path:backup_id>')
+def api_backup_conteudo(backup_id):
+    """Conteúdo de um backup em texto, enviado em blocos"""
+    catalogo = get_catalogo()
+    if catalogo.obter(backup_id) is None:
+        return jsonify({'erro': 'Backup não encontrado'}), 404
+    return Response(catalogo.conteudo(backup_id), mimetype='text/plain; charset=utf-8')
+
+
+
+# Parâmetros que ativam a resposta paginada de /processos
+PARAMETROS_BUSCA_PROCESSOS = ('q', 'regex', 'campos', 'ordem', 'direcao', 'visao', 'limite', 'cursor')
+
+
 @main.route('/processos')
 def processos():
+    """
+    Sem parâmetros de busca: lista simples (filtro=cpu|memoria|todos), como sempre foi.
+    
+    Com qualquer um dos parâmetros abaixo, responde {itens, total, proximo_cursor}:
+      q       busca por substring (sem diferenciar maiúsculas)
+      regex   busca por expressão regular
+      campos  onde buscar: nome, cmdline, usuario (separados por vírgula; padrão todos)
+      ordem   coluna de ordenação (padrão cpu_percent); direcao asc|desc (padrão desc)
+      visao   lista | arvore (pais com filhos aninhados) | grupo (somado por executável)
+      limite  itens por página (padrão 50, máx. 1000); cursor da página anterior
+    """
     filtro = request.args.get('filtro', 'todos')
-    lista = []
+    tabela = get_tabela()
     
-    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-        try:
-            info = proc.info
-            if filtro == 'cpu' and info['cpu_percent'] < 5:
-                continue
-            if filtro == 'memoria' and info['memory_percent'] < 5:
-                continue
-            lista.append(info)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
+    if not any(p in request.args for p in PARAMETROS_BUSCA_PROCESSOS):
+        if filtro == 'cpu':
+            lista = tabela.top(20, 'cpu_percent', minimo=5)
+        elif filtro == 'memoria':
+            lista = tabela.top(20, 'memory_percent', minimo=5)
+        else:
+            lista = tabela.top(50, 'cpu_percent')
+        return jsonify([resumo_processo(p) for p in lista])
+    
+    visao = request.args.get('visao', 'lista')
+    colunas = COLUNAS_GRUPO if visao == 'grupo' else COLUNAS
+    ordem = request.args.get('ordem', 'cpu_percent')
+    campos = [c for c in request.args.get('campos', '').split(',') if c] or None
+    try:
+        if visao not in ('lista', 'arvore', 'grupo'):
+            raise ValueError(f'visao inválida: {visao}')
+        if ordem not in colunas:
+            raise ValueError(f'ordem inválida: {ordem} (use {", ".join(colunas)})')
+        if campos and any(c not in CAMPOS_BUSCA for c in campos):
+            raise ValueError(f'campos inválidos (use {", ".join(CAMPOS_BUSCA)})')
+        limite = min(max(int(request.args.get('limite', 50)), 1), 1000)
+        cursor = decodificar_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        padrao = re.compile(request.args['regex'], re.IGNORECASE) if request.args.get('regex') else None
+    except re.error as e:
+        return jsonify({'erro': f'regex inválida: {e}'}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'erro': str(e)}), 400
+    decrescente = request.args.get('direcao', 'desc') != 'asc'
     
+    indice = tabela.indice()
+    encontrados = indice.buscar(request.args.get('q'), padrao, campos)
     if filtro == 'cpu':
-        lista = sorted(lista, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:20]
+        encontrados = [linha for linha in encontrados if linha['cpu_percent'] >= 5]
     elif filtro == 'memoria':
-        lista = sorted(lista, key=lambda x: x['memory_percent'] or 0, reverse=True)[:20]
+        encontrados = [linha for linha in encontrados if linha['memory_percent'] >= 5]
+    filtrado = encontrados is not indice.linhas
+    
+    if visao == 'grupo':
+        grupos = agrupar(encontrados) if filtrado else indice.grupos()
+        itens = sorted(grupos, key=lambda g: (g[ordem], g['executavel']))
+        chaves = [(g[ordem], g['executavel']) for g in itens]
     else:
-        lista = sorted(lista, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:50]
+        # Reaproveita a ordenação em cache da tabela inteira e só filtra
+        itens, chaves = indice.ordenar(ordem)
+        visiveis = {linha['pid'] for linha in encontrados} if filtrado else None
+        if visao == 'arvore':
+            # Raízes: processos cujo pai não está no resultado
+            incluidos = visiveis if visiveis is not None else indice.por_pid
+            raizes = [i for i, linha in enumerate(itens)
+                      if linha['pid'] in incluidos and (linha['ppid'] not in incluidos or linha['ppid'] == linha['pid'])]
+            itens, chaves = [itens[i] for i in raizes], [chaves[i] for i in raizes]
+        elif visiveis is not None:
+            selecionados = [i for i, linha in enumerate(itens) if linha['pid'] in visiveis]
+            itens, chaves = [itens[i] for i in selecionados], [chaves[i] for i in selecionados]
+    
+    try:
+        pagina, ultima = paginar(itens, chaves, limite, cursor, decrescente)
+    except TypeError:
+        # Cursor de outra ordenação (tipos incompatíveis na comparação)
+        return jsonify({'erro': 'cursor não corresponde à ordenação pedida'}), 400
+    if visao == 'arvore':
+        pagina = [indice.arvore(linha['pid'], visiveis) for linha in pagina]
     
-    return jsonify(lista)
+    return jsonify({
+        'itens': pagina,
+        'total': len(itens),
+        'proximo_cursor': codificar_cursor(ultima) if ultima is not None else None
+    })
+
+
+
+@main.route('/api/processos/<int:pid>/historico')
+def processo_historico(pid):
+    """
+    Série de CPU, RSS, I/O (bytes/s), threads e descritores de um processo.
+    Só existe para processos que passaram pelo top-K de algum tick.
+    Parâmetros: since (epoch), create_time (escolhe a instância se o PID foi reutilizado).
+    """
+    historico = get_historico()
+    if historico is None:
+        return jsonify({'erro': 'Histórico de processos desativado'}), 503
+    try:
+        desde = float(request.args['since']) if 'since' in request.args else None
+        create_time = float(request.args['create_time']) if 'create_time' in request.args else None
+    except ValueError:
+        return jsonify({'erro': 'since e create_time devem ser números (epoch)'}), 400
+    
+    try:
+        serie = historico.serie(pid, create_time, desde)
+    except (OSError, RuntimeError) as e:
+        return jsonify({'erro': f'Histórico indisponível: {e}'}), 503
+    if serie is None:
+        return jsonify({'erro': f'Sem histórico para o PID {pid}'}), 404
+    return jsonify(serie)
+
+
+
+@main.route('/api/processos/top')
+def processos_top_consumidores():
+    """
+    Maiores consumidores no período.
+    Parâmetros: janela (segundos, padrão 3600), n (padrão 10), ordem (cpu, memoria ou io).
+    """
+    historico = get_historico()
+    if historico is None:
+        return jsonify({'erro': 'Histórico de processos desativado'}), 503
+    try:
+        janela = float(request.args.get('janela', 3600))
+        n = min(max(int(request.args.get('n', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'erro': 'janela e n devem ser números'}), 400
+    
+    try:
+        consumidores = historico.top_consumidores(janela, n, request.args.get('ordem', 'cpu'))
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except (OSError, RuntimeError) as e:
+        return jsonify({'erro': f'Histórico indisponível: {e}'}), 503
+    return jsonify({'janela': janela, 'consumidores': consumidores})
 
 
 
 @main.route('/encerrar', methods=['POST'])
 def encerrar():
+    """
+    Encerra processos e confirma a saída (SIGTERM, espera, SIGKILL se preciso).
+    
+    {"pid": 123} mantém a resposta simples de sempre. Em lote:
+    {"pids": [...], "nome": "msedge*", "arvore": 456, "timeout": 3, "forcar": true}
+    -> {"resultados": [{pid, name, status, mensagem}, ...], "resumo": {status: quantidade}}
+    """
+    dados = request.get_json(silent=True) or {}
+    lote = any(chave in dados for chave in ('pids', 'nome', 'arvore'))
+    
+    if not lote:
+        try:
+            return jsonify(monitor.kill_process(int(dados.get('pid'))))
+        except (TypeError, ValueError):
+            return jsonify({'status': 'erro', 'mensagem': 'pid inválido'})
+    
     try:
-        dados = request.get_json()
-        pid = dados.get('pid')
-        proc = psutil.Process(pid)
-        proc.terminate()
-        return jsonify({'status': 'encerrado', 'pid': pid})
-    except Exception as e:
-        return jsonify({'status': 'erro', 'mensagem': str(e)})
+        alvos = monitor.selecionar_processos(dados.get('pids'), dados.get('nome'), dados.get('arvore'))
+        timeout = min(max(float(dados.get('timeout', 3.0)), 0.0), 30.0)
+    except (TypeError, ValueError):
+        return jsonify({'erro': 'pids, arvore e timeout devem ser numéricos'}), 400
+    if not alvos:
+        return jsonify({'erro': 'Nenhum processo corresponde aos critérios'}), 404
+    
+    inicio = time.monotonic()
+    resultados = monitor.encerrar_processos(alvos, timeout=timeout, forcar=bool(dados.get('forcar', True)))
+    resumo = {}
+    for resultado in resultados:
+        resumo[resultado['status']] = resumo.get(resultado['status'], 0) + 1
+    
+    return jsonify({
+        'resultados': resultados,
+        'resumo': resumo,
+        'duracao': round(time.monotonic() - inicio, 3)
+    })
 
 
 
 @main.route('/rede')
 def rede():
-    net = psutil.net_io_counters()
-    addrs = psutil.net_if_addrs()
-    
-    ip_local = 'N/A'
-    for iface, enderecos in addrs.items():
-        for addr in enderecos:
-            if addr.family == 2 and not addr.address.startswith('127.'):
-                ip_local = addr.address
-                break
-    
-    try:
-        import requests
-        ip_publico = requests.get('https://api.ipify.org', timeout=5).text
-    except:
-        ip_publico = 'N/A'
+    snapshot = get_snapshot()
+    net = snapshot['rede']
+    taxas = snapshot.get('taxas', {})
     
     return jsonify({
-        'ip_local': ip_local,
-        'ip_publico': ip_publico,
-        'enviado': round(net.bytes_sent / (1024**2), 2),
-        'recebido': round(net.bytes_recv / (1024**2), 2)
+        'ip_local': net['ip_local'],
+        'ip_publico': get_ip_publico(),
+        'enviado': round(net['bytes_enviados'] / (1024**2), 2),
+        'recebido': round(net['bytes_recebidos'] / (1024**2), 2),
+        'taxa_enviado': taxas.get('rede_total', {}).get('bytes_enviados_s'),
+        'taxa_recebido': taxas.get('rede_total', {}).get('bytes_recebidos_s'),
+        'interfaces': taxas.get('rede', {}),
+        'idade_snapshot': snapshot['idade_snapshot']
     })
 
 
 
 @main.route('/rede/historico')
 def rede_historico():
-    try:
-        net = psutil.net_io_counters()
-        return jsonify({
-            'enviado': round(net.bytes_sent / (1024**2), 2),
-            'recebido': round(net.bytes_recv / (1024**2), 2)
-        })
-    except Exception as e:
-        return jsonify({'erro': str(e)})
+    """Taxas de rede atuais (MB/s), já calculadas pelo coletor"""
+    _marcar_espectador()
+    snapshot = get_snapshot()
+    total = snapshot.get('taxas', {}).get('rede_total', {})
+    if 'bytes_enviados_s' not in total:
+        return jsonify({'erro': 'Taxas ainda não disponíveis (aguardando segunda coleta)'})
+    
+    return jsonify({
+        'enviado': round(total['bytes_enviados_s'] / (1024**2), 4),
+        'recebido': round(total['bytes_recebidos_s'] / (1024**2), 4),
+        'intervalo': snapshot['taxas']['intervalo'],
+        'idade_snapshot': snapshot['idade_snapshot']
+    })
 
 
 
-@main.route('/hardware')
-def hardware():
-    import platform
-    
+@main.route('/api/io')
+def api_io():
+    """
+    Taxas de I/O por interface e por disco (por segundo) e uso de todas as partições.
+    Rede: bytes, pacotes, erros e descartes/s. Disco: leituras/escritas/s (IOPS) e bytes/s.
+    """
+    snapshot = get_snapshot()
+    taxas = snapshot.get('taxas', {})
     return jsonify({
-        'sistema': platform.system(),
-        'versao': platform.version(),
-        'arquitetura': platform.machine(),
-        'processador': platform.processor(),
-        'cpu_cores': psutil.cpu_count(logical=False),
-        'cpu_threads': psutil.cpu_count(logical=True),
-        'memoria_total': round(psutil.virtual_memory().total / (1024**3), 2),
-        'disco_total': round(psutil.disk_usage('/').total / (1024**3), 2)
+        'intervalo': taxas.get('intervalo'),
+        'rede_total': taxas.get('rede_total', {}),
+        'rede': taxas.get('rede', {}),
+        'discos': taxas.get('discos', {}),
+        'particoes': snapshot.get('particoes', []),
+        'coletado_em': snapshot['coletado_em'],
+        'idade_snapshot': snapshot['idade_snapshot']
     })
 
 
 
+@main.route('/hardware')
+def hardware():
+    snapshot = get_snapshot()
+    dados = dict(snapshot['hardware'])
+    dados['idade_snapshot'] = snapshot['idade_snapshot']
+    return jsonify(dados)
+
+
+
 @main.route('/uptime')
 def uptime():
-    import datetime
-    boot_time = datetime.datetime.fromtimestamp(psutil.boot_time())
+    snapshot = get_snapshot()
+    boot_time = datetime.datetime.fromtimestamp(snapshot['boot_time'])
     uptime = datetime.datetime.now() - boot_time
     
     return jsonify({
         'horas': int(uptime.total_seconds() // 3600),
         'minutos': int((uptime.total_seconds() % 3600) // 60),
-        'inicio': boot_time.strftime('%d/%m/%Y %H:%M:%S')
+        'inicio': boot_time.strftime('%d/%m/%Y %H:%M:%S'),
+        'idade_snapshot': snapshot['idade_snapshot']
     })
 
 
 
 @main.route('/backup')
 def backup():
-    return criar_backup_novo()
+    agendador = get_agendador()
+    if agendador is None:
+        return criar_backup_novo()
+    return agendador.executar()
+
+
+
+@main.route('/backup', methods=['POST'])
+def backup_assincrono():
+    """Enfileira um backup e retorna imediatamente o id da tarefa"""
+    agendador = get_agendador()
+    if agendador is None:
+        return jsonify({'erro': 'Agendador de backups desativado'}), 503
+    
+    try:
+        tarefa = agendador.enviar('manual')
+    except (OSError, RuntimeError) as e:
+        # Modo multi-worker: processo coletor fora do ar
+        return jsonify({'erro': f'Agendador de backups indisponível: {e}'}), 503
+    if tarefa is None:
+        return jsonify({'erro': 'Fila de backups cheia, tente novamente'}), 429
+    return jsonify(tarefa), 202
+
+
+
+@main.route('/backup/<tarefa_id>')
+def backup_status(tarefa_id):
+    agendador = get_agendador()
+    try:
+        tarefa = agendador.status(tarefa_id) if agendador else None
+    except (OSError, RuntimeError) as e:
+        return jsonify({'erro': f'Agendador de backups indisponível: {e}'}), 503
+    if tarefa is None:
+        return jsonify({'erro': 'Tarefa não encontrada'}), 404
+    return jsonify(tarefa)
+
+
+
+@main.route('/api/series')
+def api_series():
+    """
+    Histórico de métricas para gráficos.
+    Parâmetros: metric (uma ou mais, separadas por vírgula), from/to (epoch em
+    segundos), points (máx. de pontos por série) e modo (lttb ou minmax).
+    """
+    armazem = get_armazem()
+    if armazem is None:
+        return jsonify({'erro': 'Histórico de métricas desativado'}), 503
+    
+    try:
+        metricas = [m for m in request.args.get('metric', '').split(',') if m]
+        fim = float(request.args.get('to', time.time()))
+        inicio = float(request.args.get('from', fim - 3600))
+        pontos = min(int(request.args.get('points', 1000)), 10000)
+        modo = request.args.get('modo', 'lttb')
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetro inválido: {e}'}), 400
+    
+    if not metricas:
+        return jsonify({'erro': 'Informe ?metric=', 'disponiveis': armazem.metricas()}), 400
+    if fim <= inicio or modo not in ('lttb', 'minmax'):
+        return jsonify({'erro': 'Intervalo ou modo inválido'}), 400
+    
+    resolucao = escolher_resolucao(inicio, fim, armazem.retencao)
+    series = {
+        metrica: consultar_serie(armazem, metrica, inicio, fim, pontos, modo, resolucao)['pontos']
+        for metrica in metricas
+    }
+    return jsonify({
+        'from': inicio,
+        'to': fim,
+        'resolucao': resolucao,
+        'modo': modo,
+        'series': series
+    })
+
+
+
+@main.route('/api/analise')
+def api_analise():
+    """
+    Análises sobre o histórico de uma métrica (requer NumPy).
+    Parâmetros: metric, from/to (padrão: últimos 7 dias), analises (separadas
+    por vírgula: percentis, ewma, zscore, sazonal, tendencia, mudanca), alfa
+    (EWMA), janela (segundos, z-score móvel), limiar (|z| de anomalia),
+    limite (valor a prever na tendência), recente (segundos avaliados contra
+    a base sazonal) e resolucao (1, 60 ou 3600).
+    """
+    armazem = get_armazem()
+    if armazem is None:
+        return jsonify({'erro': 'Histórico de métricas desativado'}), 503
+    if not disponivel('numpy'):
+        return jsonify({'erro': 'Análises indisponíveis: instale o NumPy (pip install numpy)'}), 503
+    
+    try:
+        metrica = request.args.get('metric', '')
+        fim = float(request.args.get('to', time.time()))
+        inicio = float(request.args.get('from', fim - 7 * 86400))
+        analises = [a for a in request.args.get('analises', ','.join(ANALISES)).split(',') if a]
+        alfa = float(request.args.get('alfa', 0.1))
+        janela = float(request.args.get('janela', 3600))
+        limiar = float(request.args.get('limiar', 3))
+        recente = float(request.args.get('recente', 3600))
+        limite = float(request.args['limite']) if 'limite' in request.args else None
+        resolucao = int(request.args['resolucao']) if 'resolucao' in request.args else None
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetro inválido: {e}'}), 400
+    
+    if not metrica:
+        return jsonify({'erro': 'Informe ?metric=', 'disponiveis': armazem.metricas()}), 400
+    desconhecidas = [a for a in analises if a not in ANALISES]
+    if desconhecidas:
+        return jsonify({'erro': f'Análises desconhecidas: {", ".join(desconhecidas)}', 'disponiveis': list(ANALISES)}), 400
+    if fim <= inicio or not 0 < alfa <= 1 or janela <= 0 or recente <= 0:
+        return jsonify({'erro': 'Intervalo, alfa, janela ou recente inválidos'}), 400
+    if resolucao is not None and resolucao not in armazem.retencao:
+        return jsonify({'erro': f'Resolução inválida (use {", ".join(map(str, sorted(armazem.retencao)))})'}), 400
+    
+    return jsonify(analisar(armazem, metrica, inicio, fim, analises, resolucao,
+                            alfa=alfa, janela=janela, limiar=limiar, limite=limite, recente=recente))
+
+
+
+@main.route('/api/export')
+def api_exportar():
+    """
+    Exporta o histórico de métricas ou os backups em CSV, NDJSON ou Parquet.
+    As linhas são lidas e enviadas em blocos (transferência chunked), sem
+    montar a resposta inteira na memória.
+    Parâmetros: fonte (metricas ou backups), formato (csv, ndjson, parquet),
+    metric (separadas por vírgula; padrão: todas), from/to (epoch) e
+    resolucao (só metricas; padrão: a mais fina que cobre o intervalo).
+    """
+    try:
+        fonte = request.args.get('fonte', 'metricas')
+        formato = request.args.get('formato', 'csv')
+        metricas = [m for m in request.args.get('metric', '').split(',') if m]
+        fim = float(request.args.get('to', time.time()))
+        inicio = float(request.args['from']) if 'from' in request.args else None
+        resolucao = int(request.args['resolucao']) if 'resolucao' in request.args else None
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetro inválido: {e}'}), 400
+    
+    if fonte not in FONTES or formato not in FORMATOS:
+        return jsonify({'erro': f'Use fonte={"|".join(FONTES)} e formato={"|".join(FORMATOS)}'}), 400
+    if inicio is not None and fim <= inicio:
+        return jsonify({'erro': 'Intervalo inválido'}), 400
+    if formato == 'parquet' and not disponivel('pyarrow'):
+        return jsonify({'erro': 'Parquet indisponível: instale o PyArrow (pip install pyarrow)'}), 503
+    
+    if fonte == 'metricas':
+        armazem = get_armazem()
+        if armazem is None:
+            return jsonify({'erro': 'Histórico de métricas desativado'}), 503
+        if inicio is None:
+            inicio = fim - 86400
+        if resolucao is None:
+            resolucao = resolucao_padrao(inicio, armazem.retencao, time.time())
+        elif resolucao not in armazem.retencao:
+            return jsonify({'erro': f'Resolução inválida (use {", ".join(map(str, sorted(armazem.retencao)))})'}), 400
+        colunas = COLUNAS_METRICAS
+        linhas = linhas_metricas(armazem, metricas or armazem.metricas(), inicio, fim, resolucao)
+    else:
+        indices = colunas_backup(metricas)
+        if indices is None:
+            return jsonify({'erro': 'Nenhuma coluna corresponde a metric=',
+                            'disponiveis': [nome for nome, _ in COLUNAS_BACKUP]}), 400
+        colunas = [COLUNAS_BACKUP[i] for i in indices]
+        linhas = linhas_backup(registros_backup(get_catalogo(), inicio, fim), indices)
+    
+    nome = f'taskmonitor_{fonte}_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.{formato}'
+    return Response(exportar(formato, colunas, linhas), mimetype=FORMATOS[formato], headers={
+        'Content-Disposition': f'attachment; filename="{nome}"',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+
+@main.route('/api/alerts')
+def api_alertas():
+    """
+    Alertas ativos, eventos de disparo/resolução e regras configuradas.
+    Parâmetros: limit (padrão 50, máx. 500), since (epoch).
+    """
+    try:
+        limite = min(max(int(request.args.get('limit', 50)), 1), 500)
+        desde = float(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({'erro': 'Parâmetros inválidos: limit deve ser inteiro e since um epoch'}), 400
+    
+    snapshot = get_snapshot()
+    alertas = snapshot.get('alertas', {'ativos': [], 'recentes': []})
+    
+    if current_app.config['METRICAS_ATIVO']:
+        eventos = consultar_eventos(current_app.config['METRICAS_DB'], limite, desde)
+    else:
+        # Sem banco: só os eventos recentes mantidos em memória pelo motor
+        motor = get_motor()
+        eventos = motor.recentes(limite) if motor else alertas['recentes']
+        if desde is not None:
+            eventos = [e for e in eventos if e['ts'] >= desde]
+    
+    regras = current_app.config['ALERTAS_REGRAS']
+    return jsonify({
+        'ativos': alertas['ativos'],
+        'eventos': eventos,
+        'regras': REGRAS_PADRAO if regras is None else regras
+    })
+
+
+
+@main.route('/metrics')
+def metricas_prometheus():
+    """Exportador Prometheus (formato de texto), gerado a partir do snapshot do coletor"""
+    snapshot = get_snapshot()
+    comprimido = 'gzip' in request.headers.get('Accept-Encoding', '')
+    resposta = Response(get_cache().obter(snapshot, comprimido), content_type=TIPO_CONTEUDO)
+    if comprimido:
+        resposta.headers['Content-Encoding'] = 'gzip'
+    resposta.headers['Vary'] = 'Accept-Encoding'
+    return resposta
+
+
+
+@main.route('/api/agentes/ingestao', methods=['POST'])
+def agentes_ingestao():
+    """Recebe um lote (JSON, opcionalmente gzip) de um agente: python -m app agente --hub URL"""
+    frota = get_frota()
+    if frota is None:
+        return jsonify({'erro': 'Este TaskMonitor não está configurado como hub (HUB_ATIVO)'}), 404
+    token = current_app.config['HUB_TOKEN']
+    if token and request.headers.get('X-TaskMonitor-Token') != token:
+        return jsonify({'erro': 'Token inválido'}), 401
+    
+    try:
+        corpo = request.get_data()
+        if request.headers.get('Content-Encoding') == 'gzip':
+            corpo = gzip.decompress(corpo)
+        lote = json.loads(corpo)
+        aceitas = frota.ingerir(lote, request.remote_addr)
+    except (OSError, EOFError, ValueError, KeyError, TypeError) as e:
+        return jsonify({'erro': f'Lote inválido: {e}'}), 400
+    except RuntimeError as e:
+        return jsonify({'erro': f'Hub indisponível: {e}'}), 503
+    return jsonify({'aceitas': aceitas}), 202
+
+
+
+@main.route('/api/frota')
+def api_frota():
+    """Visão geral dos hosts que enviam para este hub (último valor de cada métrica)"""
+    frota = get_frota()
+    if frota is None:
+        return jsonify({'erro': 'Este TaskMonitor não está configurado como hub (HUB_ATIVO)'}), 404
+    try:
+        return jsonify(frota.visao_geral())
+    except (OSError, RuntimeError) as e:
+        return jsonify({'erro': f'Hub indisponível: {e}'}), 503
+
+
+
+@main.route('/frota')
+def pagina_frota():
+    """Página da frota (usa /api/frota e /api/series?metric=cpu@host)"""
+    return render_template('frota.html')
+
+
+
+def _coletor_remoto():
+    """(host, porta) do processo coletor no modo multi-worker, ou None"""
+    remoto = current_app.config['COLETOR_REMOTO']
+    if not remoto:
+        return None
+    host, porta = remoto.rsplit(':', 1)
+    return host, int(porta)
+
+
+@main.route('/debug/perf.json')
+def debug_perf_json():
+    """
+    Histogramas de duração (rotas, coletores, assinantes, sensores, chamadas
+    externas), tick/atrasos do coletor, contadores de erro e o profiler.
+    No modo multi-worker, `coletor` traz os números do processo coletor.
+    """
+    dados = {'processo': get_instrumentacao().estado()}
+    endereco = _coletor_remoto()
+    if endereco is not None:
+        try:
+            dados['coletor'] = pedir(endereco, {'tipo': 'perf'}, timeout=5)
+        except (OSError, RuntimeError) as e:
+            dados['coletor'] = {'erro': str(e)}
+    return jsonify(dados)
+
+
+@main.route('/debug/perf/profiler', methods=['POST'])
+def debug_perf_profiler():
+    """
+    Liga/desliga o profiler por amostragem: {"ativo": true, "intervalo": 0.01}.
+    No modo multi-worker vale para este worker e para o processo coletor.
+    """
+    dados = request.get_json(silent=True) or {}
+    profiler = get_instrumentacao().profiler
+    if dados.get('ativo'):
+        profiler.iniciar(dados.get('intervalo'))
+    else:
+        profiler.parar()
+    endereco = _coletor_remoto()
+    if endereco is not None:
+        try:
+            pedir(endereco, {'tipo': 'perf', 'profiler': bool(dados.get('ativo')),
+                             'intervalo': dados.get('intervalo')}, timeout=5)
+        except (OSError, RuntimeError) as e:
+            return jsonify({'erro': f'Coletor indisponível: {e}'}), 503
+    return jsonify(profiler.estado())
+
+
+@main.route('/debug/perf/zerar', methods=['POST'])
+def debug_perf_zerar():
+    get_instrumentacao().zerar()
+    endereco = _coletor_remoto()
+    if endereco is not None:
+        try:
+            pedir(endereco, {'tipo': 'perf', 'zerar': True}, timeout=5)
+        except (OSError, RuntimeError) as e:
+            return jsonify({'erro': f'Coletor indisponível: {e}'}), 503
+    return jsonify({'mensagem': 'Contadores zerados'})
+
+
+@main.route('/debug/perf')
+def debug_perf():
+    """Página com os histogramas de /debug/perf.json"""
+    return render_template('debug_perf.html')
@@ -0,0 +1,293 @@
+import glob
+import os
+import sys
+import threading
+import time
+from .instrumentacao import get_instrumentacao
+from .opcionais import importar_opcional, disponivel
+
+
+class BackendSensor:
+    """Base dos backends de sensores.
+
+    Cada backend é sondado uma vez; se não estiver disponível, o resultado
+    negativo fica em cache e a nova tentativa só acontece após um backoff
+    que dobra a cada falha (até `backoff_maximo`).
+    """
+
+    nome = 'base'
+
+    def __init__(self, backoff_inicial=30.0, backoff_maximo=600.0):
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+        self._backoff = backoff_inicial
+        self._indisponivel_ate = 0.0
+        self._conectado = False
+        self._ultimo_erro = None
+
+    def conectar(self):
+        """Abre a conexão de longa duração. Deve lançar exceção se indisponível."""
+        raise NotImplementedError
+
+    def ler_temperatura_cpu(self):
+        return None
+
+    def ler_frequencia_ram(self):
+        return None
+
+    def disponivel(self):
+        """Sonda o backend respeitando o cache negativo"""
+        if self._conectado:
+            return True
+        if time.monotonic() < self._indisponivel_ate:
+            return False
+        try:
+            # Sondas WMI podem levar segundos: ficam visíveis no /debug/perf
+            with get_instrumentacao().medir('sensores', f'{self.nome}.conectar'):
+                self.conectar()
+            self._conectado = True
+            self._backoff = self.backoff_inicial
+            self._ultimo_erro = None
+            return True
+        except Exception as e:
+            self._marcar_indisponivel(e)
+            return False
+
+    def _marcar_indisponivel(self, erro):
+        # Só registra no log quando o motivo muda, para não poluir a saída
+        if str(erro) != self._ultimo_erro:
+            print(f"[INFO] Sensor {self.nome} não disponível: {erro}")
+        self._ultimo_erro = str(erro)
+        self._conectado = False
+        self._indisponivel_ate = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self.backoff_maximo)
+
+    def _ler(self, leitura):
+        if not self.disponivel():
+            return None
+        try:
+            with get_instrumentacao().medir('sensores', self.nome):
+                return leitura()
+        except Exception as e:
+            # Conexão perdida (ex.: OpenHardwareMonitor fechado): derruba e aplica backoff
+            self._marcar_indisponivel(e)
+            return None
+
+    def temperatura_cpu(self):
+        return self._ler(self.ler_temperatura_cpu)
+
+    def frequencia_ram(self):
+        return self._ler(self.ler_frequencia_ram)
+
+    def estado(self):
+        return {
+            'nome': self.nome,
+            'conectado': self._conectado,
+            'ultimo_erro': self._ultimo_erro,
+            'nova_tentativa_em': round(max(0.0, self._indisponivel_ate - time.monotonic()), 1)
+        }
+
+
+def _inicializar_com():
+    # Conexões WMI pertencem à thread que as criou; a thread precisa do COM inicializado
+    pythoncom = importar_opcional('pythoncom')
+    if pythoncom is not None:
+        pythoncom.CoInitialize()
+
+
+class SensorOpenHardwareMonitor(BackendSensor):
+    """Sensores do OpenHardwareMonitor/LibreHardwareMonitor via WMI"""
+
+    nome = 'ohm'
+
+    def conectar(self):
+        _inicializar_com()
+        self._wmi = importar_opcional('wmi').WMI(namespace="root\\OpenHardwareMonitor")
+        if not self._wmi.Sensor():
+            raise RuntimeError('namespace sem sensores (OpenHardwareMonitor fechado?)')
+
+    def _sensor(self, tipo, trecho):
+        for sensor in self._wmi.Sensor(SensorType=tipo):
+            if trecho in sensor.Name:
+                return round(sensor.Value, 1)
+        return None
+
+    def ler_temperatura_cpu(self):
+        return self._sensor('Temperature', 'CPU')
+
+    def ler_frequencia_ram(self):
+        return self._sensor('Clock', 'Memory')
+
+
+class SensorACPI(BackendSensor):
+    """Zona térmica ACPI via WMI (requer administrador)"""
+
+    nome = 'acpi'
+
+    def conectar(self):
+        _inicializar_com()
+        self._wmi = importar_opcional('wmi').WMI(namespace="root\\WMI")
+        if not self._wmi.MSAcpi_ThermalZoneTemperature():
+            raise RuntimeError('nenhuma zona térmica ACPI')
+
+    def ler_temperatura_cpu(self):
+        zonas = self._wmi.MSAcpi_ThermalZoneTemperature()
+        if zonas:
+            temp_kelvin = zonas[0].CurrentTemperature / 10.0
+            return round(temp_kelvin - 273.15, 1)
+        return None
+
+
+# Chips de CPU conhecidos, em ordem de preferência
+CHIPS_CPU = ('coretemp', 'k10temp', 'zenpower', 'cpu_thermal', 'acpitz')
+ROTULOS_CPU = ('Package id 0', 'Tctl', 'Tdie', 'CPU')
+
+
+def _escolher_temperatura(leituras):
+    """Escolhe a temperatura da CPU a partir de {chip: [(rotulo, valor), ...]}"""
+    for chip in CHIPS_CPU:
+        entradas = leituras.get(chip)
+        if not entradas:
+            continue
+        for rotulo_preferido in ROTULOS_CPU:
+            for rotulo, valor in entradas:
+                if rotulo and rotulo.startswith(rotulo_preferido):
+                    return round(valor, 1)
+        return round(max(valor for _, valor in entradas), 1)
+    return None
+
+
+class SensorHwmon(BackendSensor):
+    """Leitura direta de /sys/class/hwmon (Linux).
+
+    Os arquivos de interesse são descobertos uma única vez na conexão;
+    cada leitura apenas abre os `temp*_input` já conhecidos.
+    """
+
+    nome = 'hwmon'
+
+    def __init__(self, raiz='/sys/class/hwmon', **kwargs):
+        super().__init__(**kwargs)
+        self.raiz = raiz
+        self._entradas = {}
+
+    def conectar(self):
+        entradas = {}
+        for pasta in sorted(glob.glob(os.path.join(self.raiz, 'hwmon*'))):
+            try:
+                with open(os.path.join(pasta, 'name')) as f:
+                    chip = f.read().strip()
+            except OSError:
+                continue
+            if chip not in CHIPS_CPU:
+                continue
+            for caminho in sorted(glob.glob(os.path.join(pasta, 'temp*_input'))):
+                rotulo = None
+                try:
+                    with open(caminho.replace('_input', '_label')) as f:
+                        rotulo = f.read().strip()
+                except OSError:
+                    pass
+                entradas.setdefault(chip, []).append((rotulo, caminho))
+        if not entradas:
+            raise RuntimeError(f'nenhum sensor de CPU em {self.raiz}')
+        self._entradas = entradas
+
+    def ler_temperatura_cpu(self):
+        leituras = {}
+        for chip, arquivos in self._entradas.items():
+            for rotulo, caminho in arquivos:
+                with open(caminho) as f:
+                    leituras.setdefault(chip, []).append((rotulo, int(f.read()) / 1000.0))
+        return _escolher_temperatura(leituras)
+
+
+class SensorPsutil(BackendSensor):
+    """psutil.sensors_temperatures() (Linux/FreeBSD)"""
+
+    nome = 'psutil'
+
+    def conectar(self):
+        import psutil
+        if not hasattr(psutil, 'sensors_temperatures'):
+            raise RuntimeError('psutil.sensors_temperatures() não suportado nesta plataforma')
+        self._psutil = psutil
+        if _escolher_temperatura(self._leituras()) is None:
+            raise RuntimeError('nenhum sensor de CPU reportado pelo psutil')
+
+    def _leituras(self):
+        return {
+            chip: [(s.label, s.current) for s in sensores]
+            for chip, sensores in self._psutil.sensors_temperatures().items()
+        }
+
+    def ler_temperatura_cpu(self):
+        return _escolher_temperatura(self._leituras())
+
+
+class GerenciadorSensores:
+    """Sonda os backends uma vez e consulta apenas os disponíveis.
+
+    As conexões WMI pertencem ao apartamento COM da thread que sondou (a do
+    coletor): só ela lê os sensores. Chamadas de outras threads (rotas,
+    coleta síncrona) recebem a última leitura feita por ela.
+    """
+
+    def __init__(self, backends=None):
+        if backends is None:
+            backends = backends_padrao()
+        self.backends = backends
+        self._dono = None
+        self._ultimas = {}
+
+    def sondar(self):
+        self._dono = threading.get_ident()
+        return [b.nome for b in self.backends if b.disponivel()]
+
+    def _primeiro(self, metodo):
+        if threading.get_ident() != self._dono:
+            return self._ultimas.get(metodo, "N/A")
+        valor = "N/A"
+        for backend in self.backends:
+            leitura = getattr(backend, metodo)()
+            if leitura is not None:
+                valor = leitura
+                break
+        self._ultimas[metodo] = valor
+        return valor
+
+    def temperatura_cpu(self):
+        return self._primeiro('temperatura_cpu')
+
+    def frequencia_ram(self):
+        return self._primeiro('frequencia_ram')
+
+    def estado(self):
+        return [b.estado() for b in self.backends]
+
+
+def backends_padrao():
+    """Backends aplicáveis à plataforma atual"""
+    if sys.platform == 'win32':
+        # Sem o pacote wmi os dois backends nunca conectariam: nem entram na lista
+        if not disponivel('wmi'):
+            print("[INFO] Pacote wmi não instalado; sensores via WMI desativados")
+            return []
+        return [SensorOpenHardwareMonitor(), SensorACPI()]
+    return [SensorHwmon(), SensorPsutil()]
+
+
+_gerenciador = None
+_lock = threading.Lock()
+
+
+def get_gerenciador():
+    """Retorna o gerenciador global, sondando os backends na primeira chamada"""
+    global _gerenciador
+    if _gerenciador is None:
+        with _lock:
+            if _gerenciador is None:
+                gerenciador = GerenciadorSensores()
+                gerenciador.sondar()
+                _gerenciador = gerenciador
+    return _gerenciador
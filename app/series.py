@@ -0,0 +1,91 @@
+import time
+from .metricas import RESOLUCOES
+
+# Máximo de linhas lidas do banco por consulta antes de passar para a resolução seguinte
+LIMITE_LINHAS = 20000
+
+
+def escolher_resolucao(inicio, fim, retencao, agora=None):
+    """Escolhe a resolução mais fina que cobre o intervalo sem ler linhas demais"""
+    if agora is None:
+        agora = time.time()
+    resolucoes = sorted(RESOLUCOES)
+    for resolucao in resolucoes:
+        if inicio < agora - retencao[resolucao]:
+            continue
+        if (fim - inicio) / resolucao <= LIMITE_LINHAS:
+            return resolucao
+    return resolucoes[-1]
+
+
+def lttb(pontos, limite):
+    """Largest-Triangle-Three-Buckets: reduz [(ts, valor), ...] para `limite` pontos
+    preservando a forma visual da série"""
+    n = len(pontos)
+    if limite >= n or limite < 3:
+        return list(pontos)
+
+    resultado = [pontos[0]]
+    tamanho = (n - 2) / (limite - 2)
+    a = 0
+    for i in range(limite - 2):
+        # Média do próximo bucket (terceiro vértice do triângulo)
+        inicio_prox = int((i + 1) * tamanho) + 1
+        fim_prox = min(int((i + 2) * tamanho) + 1, n)
+        prox = pontos[inicio_prox:fim_prox]
+        media_x = sum(p[0] for p in prox) / len(prox)
+        media_y = sum(p[1] for p in prox) / len(prox)
+
+        ax, ay = pontos[a]
+        melhor_area = -1.0
+        melhor = None
+        for j in range(int(i * tamanho) + 1, int((i + 1) * tamanho) + 1):
+            bx, by = pontos[j]
+            area = abs((ax - media_x) * (by - ay) - (ax - bx) * (media_y - ay))
+            if area > melhor_area:
+                melhor_area = area
+                melhor = j
+        resultado.append(pontos[melhor])
+        a = melhor
+
+    resultado.append(pontos[-1])
+    return resultado
+
+
+def minmax(linhas, limite):
+    """Para cada bucket, mantém o ponto de mínimo e o de máximo (picos não somem).
+
+    `linhas` são (ts, minimo, maximo, media) como devolvidas pelo armazém.
+    """
+    n = len(linhas)
+    if n * 2 <= limite:
+        return [(ts, media) for ts, _, _, media in linhas]
+
+    buckets = max(1, limite // 2)
+    tamanho = n / buckets
+    resultado = []
+    for i in range(buckets):
+        bucket = linhas[int(i * tamanho):int((i + 1) * tamanho)]
+        if not bucket:
+            continue
+        menor = min(bucket, key=lambda linha: linha[1])
+        maior = max(bucket, key=lambda linha: linha[2])
+        for linha, valor in sorted(((menor, menor[1]), (maior, maior[2])), key=lambda x: x[0][0]):
+            resultado.append((linha[0], valor))
+    return resultado
+
+
+def consultar_serie(armazem, metrica, inicio, fim, pontos=1000, modo='lttb', resolucao=None):
+    """Lê a série na resolução adequada e reduz para no máximo `pontos` pontos"""
+    if resolucao is None:
+        resolucao = escolher_resolucao(inicio, fim, armazem.retencao)
+    linhas = armazem.consultar(metrica, inicio, fim, resolucao)
+    if modo == 'minmax':
+        dados = minmax(linhas, pontos)
+    else:
+        dados = lttb([(ts, media) for ts, _, _, media in linhas], pontos)
+    return {
+        'resolucao': resolucao,
+        'linhas_lidas': len(linhas),
+        'pontos': [[ts, round(valor, 3)] for ts, valor in dados]
+    }
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from .ip_publico import get_ip_publico
+
+
+def estado_dashboard(snapshot):
+    """Monta, a partir do snapshot do coletor, o estado enviado ao dashboard"""
+    boot_time = snapshot['boot_time']
+    uptime = snapshot['coletado_em'] - boot_time
+    rede = snapshot['rede']
+    taxas_rede = snapshot.get('taxas', {}).get('rede_total', {})
+    return {
+        'status': snapshot['status'],
+        'rede': {
+            'ip_local': rede['ip_local'],
+            'ip_publico': get_ip_publico(),
+            'enviado': round(rede['bytes_enviados'] / (1024**2), 2),
+            'recebido': round(rede['bytes_recebidos'] / (1024**2), 2),
+            'taxa_enviado': taxas_rede.get('bytes_enviados_s'),
+            'taxa_recebido': taxas_rede.get('bytes_recebidos_s')
+        },
+        'uptime': {
+            'horas': int(uptime // 3600),
+            'minutos': int((uptime % 3600) // 60),
+            'inicio': time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(boot_time))
+        },
+        'hardware': snapshot['hardware'],
+        'alertas': snapshot.get('alertas', {'ativos': [], 'recentes': []})
+    }
+
+
+def diferenca(anterior, atual):
+    """Campos de `atual` que mudaram em relação a `anterior` (por seção)"""
+    delta = {}
+    for secao, valores in atual.items():
+        antigos = anterior.get(secao)
+        if antigos == valores:
+            continue
+        if isinstance(valores, dict) and isinstance(antigos, dict):
+            mudou = {k: v for k, v in valores.items() if antigos.get(k) != v}
+            if mudou:
+                delta[secao] = mudou
+        else:
+            delta[secao] = valores
+    return delta
+
+
+def _evento(nome, seq, dados):
+    return f"event: {nome}\nid: {seq}\ndata: {json.dumps(dados, separators=(',', ':'))}\n\n"
+
+
+class Difusor:
+    """Distribui um estado único para todos os assinantes do /stream.
+
+    Cada publicação gera, uma única vez, o quadro com os campos alterados
+    (delta) e o estado completo já codificados. Um assinante que acompanhou
+    a sequência recebe o delta; um assinante lento, que perdeu quadros,
+    recebe apenas o estado completo mais recente. Não há fila por cliente:
+    quadros intermediários são descartados, então um cliente lento nunca
+    acumula memória no servidor.
+    """
+
+    def __init__(self, max_assinantes=100, intervalo_ping=15.0):
+        self.max_assinantes = max_assinantes
+        self.intervalo_ping = intervalo_ping
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._estado = {}
+        self._quadro_delta = None
+        self._quadro_completo = None
+        self._assinantes = 0
+
+    def publicar(self, estado):
+        delta = diferenca(self._estado, estado)
+        if not delta and self._seq:
+            # Nada mudou: nenhum quadro é enviado
+            return
+        with self._cond:
+            self._seq += 1
+            self._estado = estado
+            self._quadro_delta = _evento('delta', self._seq, delta)
+            self._quadro_completo = _evento('completo', self._seq, estado)
+            self._cond.notify_all()
+
+    def publicar_snapshot(self, snapshot):
+        """Assinante do coletor"""
+        self.publicar(estado_dashboard(snapshot))
+
+    def assinantes(self):
+        return self._assinantes
+
+    def reservar(self):
+        """Reserva uma vaga de assinante; retorna False se o limite foi atingido"""
+        with self._cond:
+            if self._assinantes >= self.max_assinantes:
+                return False
+            self._assinantes += 1
+            return True
+
+    def liberar(self):
+        """Devolve a vaga reservada (no fechamento da resposta, mesmo que o gerador nem tenha começado)"""
+        with self._cond:
+            self._assinantes = max(0, self._assinantes - 1)
+
+    def quadros(self):
+        """Gerador de eventos SSE para um assinante.
+
+        A vaga já deve estar reservada e é devolvida por quem fecha a
+        resposta (`liberar`): se o cliente cair antes do primeiro quadro,
+        este gerador nunca chega a executar.
+        """
+        visto = 0
+        yield 'retry: 3000\n\n'
+        while True:
+            with self._cond:
+                if self._seq == visto:
+                    self._cond.wait(self.intervalo_ping)
+                seq = self._seq
+                if seq == visto:
+                    quadro = ': ping\n\n'
+                elif seq == visto + 1 and visto != 0:
+                    quadro = self._quadro_delta
+                else:
+                    quadro = self._quadro_completo
+            visto = seq
+            yield quadro
+
+
+_difusor = Difusor()
+
+
+def get_difusor():
+    return _difusor
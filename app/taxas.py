@@ -0,0 +1,129 @@
+import os
+import re
+import time
+
+# Contadores de 32 bits (alguns drivers/SOs) voltam a zero depois deste valor
+LIMITE_32_BITS = 2 ** 32
+
+
+def delta_contador(atual, anterior):
+    """Diferença entre duas leituras de um contador cumulativo.
+
+    Se o contador diminuiu e a leitura anterior cabia em 32 bits, trata como
+    estouro (wrap) de 32 bits. Caso contrário foi um reset (interface
+    recriada, driver recarregado): retorna None e a taxa é descartada nesse tick.
+    """
+    delta = atual - anterior
+    if delta >= 0:
+        return delta
+    if anterior < LIMITE_32_BITS and atual < LIMITE_32_BITS:
+        return delta + LIMITE_32_BITS
+    return None
+
+
+def taxas_dispositivos(atuais, anteriores, decorrido):
+    """{dispositivo: {contador: valor}} -> {dispositivo: {contador_s: valor/s}}.
+
+    Dispositivos que acabaram de aparecer (hot-plug) só ganham taxa a partir
+    da segunda leitura; os que sumiram simplesmente deixam de ser reportados.
+    """
+    resultado = {}
+    for nome, contadores in atuais.items():
+        antigos = anteriores.get(nome)
+        if antigos is None:
+            continue
+        taxas = {}
+        for chave, valor in contadores.items():
+            if chave not in antigos:
+                continue
+            delta = delta_contador(valor, antigos[chave])
+            if delta is not None:
+                taxas[chave + '_s'] = round(delta / decorrido, 2)
+        resultado[nome] = taxas
+    return resultado
+
+
+# Linux: cada dispositivo de bloco tem uma entrada aqui; partições têm o arquivo `partition`
+RAIZ_SYSFS_BLOCOS = '/sys/class/block'
+
+# Nomenclatura de partições: sda1/vdb2/xvda1, e "p<n>" após nome terminado em dígito
+# (nvme0n1p2, mmcblk0p1). loop10, dm-10 e PhysicalDrive12 são discos inteiros.
+PARTICAO_SCSI = re.compile(r'((?:sd|hd|vd|xvd)[a-z]+)\d+')
+PARTICAO_P = re.compile(r'(.*\d)p\d+')
+
+_pais = {}
+
+
+def disco_pai(nome, raiz_sysfs=RAIZ_SYSFS_BLOCOS):
+    """Disco a que a partição `nome` pertence, ou None se `nome` é um disco inteiro.
+
+    Usa o sysfs quando o dispositivo aparece nele; senão, a nomenclatura.
+    O resultado fica em cache (o coletor chama isto a cada tick).
+    """
+    chave = (nome, raiz_sysfs)
+    if chave in _pais:
+        return _pais[chave]
+    caminho = os.path.join(raiz_sysfs, nome)
+    if os.path.exists(caminho):
+        pai = None
+        if os.path.exists(os.path.join(caminho, 'partition')):
+            pai = os.path.basename(os.path.dirname(os.path.realpath(caminho)))
+    else:
+        encontrado = PARTICAO_SCSI.fullmatch(nome) or PARTICAO_P.fullmatch(nome)
+        pai = encontrado.group(1) if encontrado else None
+    _pais[chave] = pai
+    return pai
+
+
+def discos_inteiros(discos, raiz_sysfs=RAIZ_SYSFS_BLOCOS):
+    """Remove partições (sda1, nvme0n1p2) quando o disco inteiro também está listado,
+    para que somatórios não contem o mesmo I/O duas vezes"""
+    return {
+        nome: valores for nome, valores in discos.items()
+        if disco_pai(nome, raiz_sysfs) not in discos
+    }
+
+
+class CalculadoraTaxas:
+    """Converte os contadores cumulativos do snapshot em taxas por segundo.
+
+    Usa o relógio monotônico entre duas coletas (imune a ajustes do relógio
+    do sistema). Calcula bytes/s, pacotes/s, erros/s e descartes/s por
+    interface e leituras/s, escritas/s (IOPS) e bytes/s por disco.
+    """
+
+    def __init__(self):
+        self._anterior = None
+        self._t_anterior = None
+
+    def atualizar(self, amostra, agora=None):
+        if agora is None:
+            agora = time.monotonic()
+        anterior, t_anterior = self._anterior, self._t_anterior
+        self._anterior = {
+            'rede_total': {'total': {
+                'bytes_enviados': amostra['rede']['bytes_enviados'],
+                'bytes_recebidos': amostra['rede']['bytes_recebidos']
+            }},
+            'interfaces': amostra.get('interfaces', {}),
+            'discos_io': amostra.get('discos_io', {})
+        }
+        self._t_anterior = agora
+
+        taxas = {'intervalo': None, 'rede_total': {}, 'rede': {}, 'discos': {}}
+        if anterior is None:
+            return taxas
+        decorrido = agora - t_anterior
+        if decorrido <= 0:
+            return taxas
+
+        taxas['intervalo'] = round(decorrido, 3)
+        taxas['rede_total'] = taxas_dispositivos(self._anterior['rede_total'], anterior['rede_total'],
+                                                 decorrido).get('total', {})
+        taxas['rede'] = taxas_dispositivos(self._anterior['interfaces'], anterior['interfaces'], decorrido)
+        discos = taxas_dispositivos(self._anterior['discos_io'], anterior['discos_io'], decorrido)
+        for disco in discos.values():
+            if 'leituras_s' in disco and 'escritas_s' in disco:
+                disco['iops'] = round(disco['leituras_s'] + disco['escritas_s'], 2)
+        taxas['discos'] = discos
+        return taxas
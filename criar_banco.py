@@ -18,6 +18,15 @@ CREATE TABLE IF NOT EXISTS tarefas (
 ''')
 
 conn.commit()
+
+# Cria as tabelas de séries temporais (1 s, 1 min, 1 h)
+from app.metricas import criar_tabelas
+criar_tabelas(conn)
+
+# Cria a tabela de eventos de alerta
+from app.alertas import criar_tabela_alertas
+criar_tabela_alertas(conn)
+
 conn.close()
 
 print("✅ Banco de dados criado com sucesso.")
\ No newline at end of file
@@ -0,0 +1,135 @@
+import datetime
+import os
+import shutil
+import time
+import pytest
+from app import agendador_backup
+from app.agendador_backup import AgendadorBackup, Cron, PoliticaRetencao
+from app.exportacao import importar_legado
+from app.registro_backup import LogBackup
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGADO = os.path.join(RAIZ, 'backups', 'resumo_backup_20251120_101816.txt')
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    log = LogBackup(str(tmp_path / 'segmentos'))
+    monkeypatch.setattr(agendador_backup, 'get_log', lambda: log)
+    yield log
+    log.fechar()
+
+
+def _agendados(log, quantidade, desde):
+    for n in range(quantidade):
+        log.anexar({'timestamp': n}, desde + n * 3600)
+
+
+def test_retencao_poda_backups_agendados_antigos(log):
+    agora = time.time()
+    _agendados(log, 5, agora - 90 * 86400)
+    _agendados(log, 3, agora - 3 * 3600)
+    removidos = AgendadorBackup(retencao=PoliticaRetencao(manter_ultimos=3, por_hora=0, por_dia=0,
+                                                          por_semana=0)).podar()
+    assert removidos == 5
+    assert log.total() == 3
+
+
+def test_retencao_nao_poda_backups_importados(log, tmp_path):
+    pasta = tmp_path / 'backups'
+    pasta.mkdir()
+    shutil.copy(LEGADO, pasta)
+    importados, erros = importar_legado([str(pasta)], log.pasta)
+    assert (importados, erros) == (1, 0)
+    assert any(segmento.endswith('_legado') for segmento in log.segmentos())
+
+    _agendados(log, 30, time.time() - 30 * 3600)
+    AgendadorBackup(retencao=PoliticaRetencao()).podar()
+    registros = [registro for _, registro in log.iterar()]
+    assert [r['importado_de'] for r in registros if 'importado_de' in r] == [os.path.basename(LEGADO)]
+
+
+def test_importacao_sem_sufixo_reconhecida_pelo_registro(log):
+    # Segmento gravado por uma versão anterior do importar-legado, sem o sufixo no nome
+    antigo = LogBackup(log.pasta, idade_maxima=float('inf'))
+    antigo.anexar({'timestamp': 'x', 'importado_de': 'system_data_1.json'}, 1_600_000_000)
+    antigo.fechar()
+    AgendadorBackup(retencao=PoliticaRetencao(manter_ultimos=0, por_hora=0, por_dia=0, por_semana=0)).podar()
+    assert log.total() == 1
+
+
+def test_cron_campos_basicos():
+    depois = datetime.datetime(2026, 10, 18, 12, 7, 30)  # domingo
+    assert Cron('*/15 * * * *').proxima(depois) == datetime.datetime(2026, 10, 18, 12, 15)
+    assert Cron('0 3 * * *').proxima(depois) == datetime.datetime(2026, 10, 19, 3, 0)
+    assert Cron('30 4 * * 1-5').proxima(depois) == datetime.datetime(2026, 10, 19, 4, 30)
+    assert Cron('0 0 1 1,7 *').proxima(depois) == datetime.datetime(2027, 1, 1, 0, 0)
+    # Estritamente posterior
+    assert Cron('0 12 * * *').proxima(datetime.datetime(2026, 10, 18, 12, 0)) == \
+        datetime.datetime(2026, 10, 19, 12, 0)
+
+
+def test_cron_dia_ou_dia_da_semana():
+    depois = datetime.datetime(2026, 10, 18, 12, 0)
+    cron = Cron('0 0 1 * 1')
+    assert cron.proxima(depois) == datetime.datetime(2026, 10, 19)   # segunda
+    assert cron.proxima(datetime.datetime(2026, 10, 26, 1)) == datetime.datetime(2026, 11, 1)  # dia 1, domingo
+    # Com um dos dois livre, vale só o outro
+    assert Cron('0 0 * * 1').proxima(depois) == datetime.datetime(2026, 10, 19)
+    assert Cron('0 0 1 * *').proxima(depois) == datetime.datetime(2026, 11, 1)
+
+
+def test_cron_29_de_fevereiro():
+    assert Cron('0 0 29 2 *').proxima(datetime.datetime(2026, 10, 18)) == datetime.datetime(2028, 2, 29)
+
+
+@pytest.mark.parametrize('expressao', ['0 0 * *', '60 * * * *', '* * 0 * *', 'a * * * *'])
+def test_cron_invalida(expressao):
+    with pytest.raises(ValueError):
+        Cron(expressao)
+
+
+def test_agenda_sem_ocorrencia_falha_na_partida():
+    Cron('0 0 31 2 *')
+    with pytest.raises(ValueError, match='sem ocorrência'):
+        AgendadorBackup('0 0 31 2 *')
+
+
+def test_erro_na_agenda_nao_derruba_a_thread(monkeypatch, capsys):
+    agendador = AgendadorBackup('0 * * * *')
+
+    def falhar(depois):
+        raise ValueError('falhou')
+    monkeypatch.setattr(agendador.cron, 'proxima', falhar)
+    antes = time.time()
+    assert agendador._proxima_segura() >= antes + 60
+    assert 'falhou' in capsys.readouterr().out
+
+
+def _ts(*data):
+    return datetime.datetime(*data).timestamp()
+
+
+def test_retencao_mantem_os_ultimos():
+    itens = [(_ts(2026, 10, 18, 12, m), m) for m in range(10)]
+    politica = PoliticaRetencao(manter_ultimos=3, por_hora=0, por_dia=0, por_semana=0)
+    assert politica.selecionar(itens) == {7, 8, 9}
+
+
+def test_retencao_um_por_hora_dia_e_semana():
+    # Um backup a cada 6 h por 30 dias
+    itens = [(_ts(2026, 9, 1) + n * 6 * 3600, n) for n in range(120)]
+    politica = PoliticaRetencao(manter_ultimos=0, por_hora=2, por_dia=3, por_semana=2)
+    manter = politica.selecionar(itens)
+    # Horas: os dois mais recentes; dias: o último de cada um dos três dias mais recentes
+    horas = {119, 118}
+    dias = {119, 115, 111}
+    # Semanas: o mais recente da semana atual e o último da anterior
+    ultimo = datetime.datetime.fromtimestamp(itens[-1][0]).isocalendar()[:2]
+    anterior = max(n for ts, n in itens
+                   if datetime.datetime.fromtimestamp(ts).isocalendar()[:2] != ultimo)
+    assert manter == horas | dias | {119, anterior}
+
+
+def test_retencao_vazia():
+    assert PoliticaRetencao().selecionar([]) == set()
@@ -0,0 +1,63 @@
+import random
+from app.amostragem import AgendaPartes, AmostragemAdaptativa
+
+
+def _status(cpu, memoria=50.0):
+    return {'cpu': cpu, 'memoria': memoria}
+
+
+def _rodar(amostragem, leituras, agora=0.0):
+    """Alimenta o amostrador seguindo o intervalo que ele mesmo devolve; retorna [(agora, modo)]
+
+    Cada leitura recebe o instante e o intervalo desde a anterior.
+    """
+    modos = []
+    intervalo = amostragem.intervalo
+    for leitura in leituras:
+        intervalo = amostragem.proximo(_status(leitura(agora, intervalo)), agora)
+        modos.append((agora, amostragem.modo))
+        agora += intervalo
+    return modos
+
+
+def test_espectador_liga_a_rajada_e_ela_expira():
+    amostragem = AmostragemAdaptativa(duracao_rajada=10.0, tempo_espectador=10.0)
+    amostragem.registrar_espectador(0.0)
+    modos = _rodar(amostragem, [lambda t, dt: 30.0] * 200)
+    assert modos[0][1] == 'rajada'
+    assert all(modo == 'rajada' for t, modo in modos if t < 20.0)
+    assert modos[-1][1] == 'normal'
+
+
+def test_host_ocioso_recua_ate_o_maximo():
+    amostragem = AmostragemAdaptativa(tempo_para_ocioso=30.0, intervalo_maximo=5.0)
+    _rodar(amostragem, [lambda t, dt: 1.0] * 60)
+    assert amostragem.modo == 'ocioso'
+    assert amostragem.intervalo_atual == 5.0
+
+
+def test_ruido_de_cpu_em_host_ocupado_nao_prende_a_rajada():
+    aleatorio = random.Random(7)
+    amostragem = AmostragemAdaptativa()
+    # ~60% com desvio de 5 pontos por leitura de 1 s; leituras mais curtas
+    # são mais ruidosas (10 pontos em 250 ms)
+    ruido = lambda t, dt: min(100.0, max(0.0, aleatorio.gauss(60.0, 5.0 / dt ** 0.5)))
+    modos = _rodar(amostragem, [ruido] * 1200)
+    tempo_rajada = sum(1 for t, modo in modos if modo == 'rajada') * amostragem.intervalo_rajada
+    # fica quase sempre em 1 s; a comparação crua de ticks de 250 ms ficava presa na rajada
+    assert tempo_rajada < 0.25 * modos[-1][0]
+
+
+def test_mudanca_real_de_cpu_dispara_a_rajada_em_um_segundo():
+    amostragem = AmostragemAdaptativa()
+    modos = _rodar(amostragem, [lambda t, dt: 10.0 if t < 20.0 else 70.0] * 40)
+    primeira = next(t for t, modo in modos if modo == 'rajada')
+    assert 20.0 <= primeira <= 22.0
+
+
+def test_agenda_das_partes_lentas():
+    agenda = AgendaPartes({'processos': 2.0})
+    assert set(agenda.vencidas(0.0)) == {'processos', 'sensores', 'sistema', 'particoes'}
+    assert agenda.vencidas(1.0) == []
+    assert agenda.vencidas(2.0) == ['processos']
+    assert sorted(agenda.vencidas(5.0)) == ['processos', 'sensores']
@@ -0,0 +1,110 @@
+import math
+import time
+import pytest
+from app.analise import (analisar, anomalias_sazonais, carregar_serie, escolher_resolucao_analise, ewma,
+                         inicio_tendencia, tendencia_linear, zscore_movel)
+from app.metricas import RETENCAO_PADRAO, ArmazemMetricas, conectar
+
+np = pytest.importorskip('numpy')
+
+
+def _ewma_laco(valores, alfa):
+    saida, anterior = [], valores[0]
+    for x in valores:
+        anterior = alfa * x + (1 - alfa) * anterior
+        saida.append(anterior)
+    return saida
+
+
+@pytest.mark.parametrize('alfa', [0.001, 0.1, 0.5, 0.99])
+def test_ewma_igual_ao_laco(alfa):
+    valores = np.random.default_rng(1).uniform(0, 100, 20000)
+    assert np.allclose(ewma(valores, alfa), _ewma_laco(list(valores), alfa), rtol=1e-9, atol=1e-9)
+
+
+def test_ewma_casos_limite():
+    assert ewma(np.array([]), 0.1).size == 0
+    assert list(ewma(np.array([1.0, 5.0]), 1.0)) == [1.0, 5.0]
+    with pytest.raises(ValueError):
+        ewma(np.array([1.0]), 0.0)
+
+
+def test_zscore_movel_igual_a_janela_direta():
+    valores = np.random.default_rng(2).normal(50, 5, 500) + 1e6
+    janela = 30
+    z = zscore_movel(valores, janela)
+    assert np.isnan(z[:janela]).all()
+    for i in (janela, 100, 499):
+        anteriores = valores[i - janela:i]
+        assert z[i] == pytest.approx((valores[i] - anteriores.mean()) / anteriores.std(), rel=1e-6)
+
+
+def test_tendencia_de_uma_reta():
+    ts = np.arange(0, 10 * 86400, 3600, dtype=np.float64)
+    valores = 20.0 + 2.0 * ts / 86400
+    tendencia = tendencia_linear(ts, valores, limite=100.0)
+    assert tendencia['inclinacao_por_dia'] == pytest.approx(2.0)
+    assert tendencia['valor_ajustado_atual'] == pytest.approx(valores[-1], abs=1e-3)
+    assert tendencia['r2'] == pytest.approx(1.0)
+    assert tendencia['dias_ate_limite'] == pytest.approx((100.0 - valores[-1]) / 2.0, abs=0.01)
+
+
+def test_inicio_da_tendencia():
+    ts = np.arange(0, 20 * 86400, 3600, dtype=np.float64)
+    mudanca = 12 * 86400
+    valores = np.where(ts < mudanca, 30.0, 30.0 + 3.0 * (ts - mudanca) / 86400)
+    resultado = inicio_tendencia(ts, valores)
+    assert abs(resultado['inicio_em'] - mudanca) <= 2 * 3600
+    assert resultado['nivel_antes'] == pytest.approx(30.0)
+    assert resultado['inclinacao_por_dia_depois'] == pytest.approx(3.0, rel=0.05)
+
+
+def test_pico_sazonal_e_sinalizado():
+    # Oito semanas de hora em hora: perfil diário + ruído; um pico na última hora
+    rng = np.random.default_rng(3)
+    ts = np.arange(0, 56 * 86400, 3600, dtype=np.float64)
+    valores = 40 + 20 * np.sin(2 * math.pi * ts / 86400) + rng.normal(0, 1, len(ts))
+    valores[-1] += 15
+    resultado = anomalias_sazonais(ts, valores, desde=ts[-24], limiar=3.0)
+    assert resultado['slots_com_base'] == 168
+    # O pico (~50) fica dentro da faixa diária (20 a 60): só a base da mesma hora o denuncia
+    assert resultado['anomalias'][0]['ts'] == ts[-1]
+    assert resultado['atual']['z'] > 5
+    sem_pico = valores.copy()
+    sem_pico[-1] -= 15
+    assert anomalias_sazonais(ts, sem_pico, desde=ts[-24], limiar=3.0)['atual']['z'] < 3
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    armazem = ArmazemMetricas(str(tmp_path / 'metricas.db'))
+    conn = conectar(armazem.caminho)
+    yield armazem, conn
+    conn.close()
+
+
+def test_carregar_serie(armazem):
+    armazem, conn = armazem
+    for k in range(5):
+        armazem.registrar(1000 + k, {'cpu': float(k)})
+    armazem.gravar(conn)
+    ts, valores = carregar_serie(armazem, 'cpu', 1000, 1010, 1)
+    assert list(ts) == [1000, 1001, 1002, 1003, 1004]
+    assert list(valores) == [0, 1, 2, 3, 4]
+
+
+def test_janela_igual_a_retencao_usa_a_resolucao_dela(armazem):
+    armazem, conn = armazem
+    fim = time.time()
+    for k in range(120):
+        armazem.registrar(fim - 3600 + k, {'cpu': 10.0})
+    armazem.gravar(conn)
+    armazem.compactar(conn)
+    inicio = fim - RETENCAO_PADRAO[60]
+    time.sleep(0.01)
+    assert escolher_resolucao_analise(inicio, fim, armazem.retencao) == 60
+    resultado = analisar(armazem, 'cpu', inicio, fim, analises=('percentis',))
+    assert resultado['resolucao'] == 60
+    assert resultado['amostras'] >= 2
+    # Além da retenção (e da folga) passa para a próxima
+    assert escolher_resolucao_analise(inicio - 3600, fim, armazem.retencao) == 3600
@@ -0,0 +1,76 @@
+import socket
+import pytest
+from app import compartilhado
+from app.compartilhado import ServidorSnapshots, _ler_quadro, _quadro
+from app.processos import TabelaProcessos
+
+
+class _ColetorFalso:
+    def __init__(self):
+        self.espectadores = 0
+
+    def assinar(self, callback):
+        pass
+
+    def registrar_espectador(self):
+        self.espectadores += 1
+
+
+class _TabelaFalsa:
+    def __init__(self):
+        self.linhas = []
+
+    def listar(self):
+        return self.linhas
+
+
+def _snapshot(ts, atualizados):
+    return {'coletado_em': ts, '_monotonic': 0.0,
+            'amostragem': {'atualizados': atualizados, 'processos_em': 100.0}}
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    tabela = _TabelaFalsa()
+    monkeypatch.setattr(compartilhado, 'get_tabela', lambda: tabela)
+    coletor = _ColetorFalso()
+    servidor = ServidorSnapshots(coletor).iniciar()
+    yield servidor, tabela, coletor
+    servidor._socket.close()
+
+
+def _primeiro_quadro(endereco):
+    with socket.create_connection(endereco, timeout=5) as conexao:
+        conexao.sendall(_quadro({'tipo': 'snapshots'}))
+        return _ler_quadro(conexao)
+
+
+def test_worker_novo_recebe_a_ultima_tabela_de_processos(servidor):
+    servidor, tabela, _ = servidor
+    tabela.linhas = [{'pid': 1, 'name': 'init'}]
+    servidor.publicar(_snapshot(100.0, ['processos']))
+    tabela.linhas = [{'pid': 2, 'name': 'nao-publicado'}]
+    # Tick só de contadores: o quadro compartilhado não leva a tabela...
+    servidor.publicar(_snapshot(100.25, []))
+    assert servidor._com_processos is False
+
+    # ...mas o primeiro quadro de uma conexão nova leva a última publicada
+    quadro = _primeiro_quadro(servidor.endereco)
+    assert quadro['snapshot']['coletado_em'] == 100.25
+    assert '_monotonic' not in quadro['snapshot']
+    assert quadro['processos'] == [{'pid': 1, 'name': 'init'}]
+
+
+def test_pedido_de_espectador_chega_ao_coletor(servidor):
+    servidor, _, coletor = servidor
+    assert compartilhado.pedir(servidor.endereco, {'tipo': 'espectador'}, timeout=5) is True
+    assert coletor.espectadores == 1
+
+
+def test_tabela_remota_nao_percorre_processos(monkeypatch):
+    tabela = TabelaProcessos()
+    tabela.remota = True
+    monkeypatch.setattr(tabela, 'atualizar', lambda: pytest.fail('worker chamou o psutil'))
+    assert tabela.listar() == []
+    tabela.carregar([{'pid': 1}], 100.0)
+    assert tabela.listar() == [{'pid': 1}]
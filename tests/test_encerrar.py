@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import pytest
+from app import create_app, monitor
+
+
+@pytest.fixture
+def supervisor():
+    """Simula `serve`: um supervisor com dois filhos (coletor e outro worker)"""
+    codigo = ('import subprocess, sys, time\n'
+              'filhos = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"]) for _ in range(2)]\n'
+              'print(" ".join(str(f.pid) for f in filhos), flush=True)\n'
+              'time.sleep(60)\n')
+    processo = subprocess.Popen([sys.executable, '-c', codigo], stdout=subprocess.PIPE, text=True)
+    filhos = [int(pid) for pid in processo.stdout.readline().split()]
+    yield processo.pid, filhos
+    monitor.definir_supervisor(None)
+    for pid in filhos + [processo.pid]:
+        try:
+            os.kill(pid, 9)
+        except OSError:
+            pass
+    processo.wait()
+
+
+def test_arvore_do_supervisor_e_protegida(supervisor):
+    pid_supervisor, filhos = supervisor
+    monitor.definir_supervisor(pid_supervisor)
+    alvos = monitor.selecionar_processos(arvore=pid_supervisor)
+    assert set(alvos) == set(filhos) | {pid_supervisor}
+    resultados = monitor.encerrar_processos(alvos, timeout=1.0)
+    assert {r['status'] for r in resultados} == {'protegido'}
+    assert all(monitor.psutil.pid_exists(pid) for pid in alvos)
+
+
+def test_sem_supervisor_protege_o_proprio_processo():
+    assert os.getpid() in monitor.pids_protegidos()
+    assert monitor.encerrar_processos([os.getpid()])[0]['status'] == 'protegido'
+
+
+def test_filho_deste_processo_e_protegido():
+    processo = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    try:
+        assert monitor.encerrar_processos([processo.pid])[0]['status'] == 'protegido'
+    finally:
+        processo.kill()
+        processo.wait()
+
+
+def test_processo_fora_da_arvore_continua_encerravel():
+    # O intermediário sai logo: o neto fica órfão, fora da árvore deste processo
+    codigo = ('import subprocess, sys\n'
+              'neto = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)\n'
+              'print(neto.pid)\n')
+    pid = int(subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True).stdout)
+    resultado = monitor.encerrar_processos([pid], timeout=5.0)[0]
+    assert resultado['status'] in ('encerrado', 'forcado')
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    return create_app({
+        'TESTING': True,
+        'COLETOR_ATIVO': False,
+        'METRICAS_ATIVO': False,
+        'BACKUP_AGENDA': None,
+        'IP_PUBLICO_URL': None,
+        'METRICAS_DB': str(tmp_path / 'metricas.db')
+    }).test_client()
+
+
+@pytest.mark.parametrize('dados', [
+    {'nome': 123},
+    {'nome': ['msedge*']},
+    {'arvore': True},
+    {'arvore': 'abc'},
+    {'pids': '123'},
+    {'pids': [True]},
+    {'pids': [1], 'forcar': 'false'},
+])
+def test_lote_com_tipos_invalidos_responde_400(cliente, dados):
+    resposta = cliente.post('/encerrar', json=dados)
+    assert resposta.status_code == 400
+    assert 'erro' in resposta.get_json()
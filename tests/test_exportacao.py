@@ -0,0 +1,43 @@
+import os
+import shutil
+from app.exportacao import importar_legado
+from app.registro_backup import LogBackup
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JSON_LEGADO = os.path.join(RAIZ, 'backup', 'system_data_20251111_164420.json')
+TEXTO_LEGADO = os.path.join(RAIZ, 'backup', 'resumo_backup_20251111_164420.txt')
+
+
+def _registros(pasta_log):
+    log = LogBackup(pasta_log)
+    try:
+        return [registro for _, registro in log.iterar()]
+    finally:
+        log.fechar()
+
+
+def test_par_json_e_resumo_vira_um_registro(tmp_path):
+    pasta = tmp_path / 'backup'
+    pasta.mkdir()
+    shutil.copy(JSON_LEGADO, pasta)
+    shutil.copy(TEXTO_LEGADO, pasta)
+    pasta_log = str(tmp_path / 'segmentos')
+
+    assert importar_legado([str(pasta)], pasta_log) == (1, 0)
+    registros = _registros(pasta_log)
+    assert [r['importado_de'] for r in registros] == [os.path.basename(JSON_LEGADO)]
+    # A cópia em texto também sai da pasta: uma segunda importação não a traz de volta
+    assert sorted(os.listdir(pasta / 'importados')) == sorted(
+        [os.path.basename(JSON_LEGADO), os.path.basename(TEXTO_LEGADO)])
+    assert importar_legado([str(pasta)], pasta_log) == (0, 0)
+    assert len(_registros(pasta_log)) == 1
+
+
+def test_resumo_sem_json_e_importado(tmp_path):
+    pasta = tmp_path / 'backups'
+    pasta.mkdir()
+    shutil.copy(TEXTO_LEGADO, pasta)
+    pasta_log = str(tmp_path / 'segmentos')
+
+    assert importar_legado([str(pasta)], pasta_log, mover=False) == (1, 0)
+    assert [r['importado_de'] for r in _registros(pasta_log)] == [os.path.basename(TEXTO_LEGADO)]
@@ -0,0 +1,83 @@
+import json
+import pytest
+from app import frota
+from app.frota import VERSAO_PROTOCOLO, Agente, Frota
+from app.metricas import ArmazemMetricas, conectar
+
+
+@pytest.fixture
+def armazem(tmp_path, monkeypatch):
+    armazem = ArmazemMetricas(str(tmp_path / 'hub.db'))
+    monkeypatch.setattr(frota, 'get_armazem', lambda: armazem)
+    return armazem
+
+
+def _lote(host_id='srv-01', amostras=None, versao=VERSAO_PROTOCOLO):
+    return {
+        'versao': versao,
+        'host': {'id': host_id, 'hostname': host_id},
+        'amostras': amostras if amostras is not None else [[1000.0, {'cpu': 12.5, 'memoria': 40}]]
+    }
+
+
+def _snapshot(ts, cpu):
+    return {
+        'coletado_em': ts,
+        'status': {'cpu': cpu, 'cpu_temperatura': 'N/A'},
+        'memoria': {'percent': 50.0, 'total': 8 * 1024 ** 3},
+        'disco': {'percent': 70.0, 'total': 100 * 1024 ** 3},
+        'rede': {'bytes_enviados': 0, 'bytes_recebidos': 0},
+        'hardware': {'processador': 'x86_64'},
+        'boot_time': 0,
+        'amostragem': {'intervalo': 0.25}
+    }
+
+
+def test_rejeita_versao_desconhecida(armazem):
+    with pytest.raises(ValueError, match='Versão de protocolo'):
+        Frota().ingerir(_lote(versao=VERSAO_PROTOCOLO + 1))
+
+
+@pytest.mark.parametrize('host_id', ['cpu@srv-01', ''])
+def test_rejeita_host_invalido(armazem, host_id):
+    with pytest.raises(ValueError, match='Identificador de host'):
+        Frota().ingerir(_lote(host_id))
+    assert not armazem._buffer
+
+
+def test_grava_series_por_host(armazem):
+    hub = Frota()
+    aceitas = hub.ingerir(_lote(amostras=[
+        [1000.0, {'cpu': 10.0, 'memoria': 40.0, 'nome': 'ignorado'}],
+        [1001.0, {'cpu': 30.0}, 0.5]
+    ]), origem='127.0.0.1')
+    hub.ingerir(_lote('srv-02', [[1000.0, {'cpu': 99.0}]]))
+    assert aceitas == 2
+
+    conn = conectar(armazem.caminho)
+    armazem.gravar(conn)
+    conn.close()
+    assert armazem.metricas() == ['cpu@srv-01', 'cpu@srv-02', 'memoria@srv-01']
+    assert armazem.consultar('cpu@srv-01', 0, 2000) == [(1000, 10.0, 10.0, 10.0), (1001, 30.0, 30.0, 30.0)]
+
+    hosts = {h['id']: h for h in hub.visao_geral()['hosts']}
+    assert hosts['srv-01']['valores'] == {'cpu': 30.0, 'memoria': 40.0}
+    assert hosts['srv-01']['series'] == ['cpu@srv-01', 'memoria@srv-01']
+    assert hosts['srv-01']['ultima_amostra_em'] == 1001.0
+    assert hosts['srv-01']['online']
+
+
+def test_lote_do_agente_chega_ao_hub(armazem):
+    agente = Agente('http://hub:5000', 'srv-03')
+    agente.registrar_snapshot(_snapshot(2000.0, 20.0))
+    agente.registrar_snapshot(_snapshot(2000.25, 60.0))
+    lote, quantidade = agente._montar_lote()
+    # O lote passa por JSON, como no POST
+    assert Frota().ingerir(json.loads(json.dumps(lote))) == quantidade == 2
+
+    conn = conectar(armazem.caminho)
+    armazem.gravar(conn)
+    linha = conn.execute('SELECT amostras, media, cobertura FROM metricas_1s WHERE metrica = ?',
+                         ('cpu@srv-03',)).fetchone()
+    conn.close()
+    assert linha == (2, 40.0, 0.5)
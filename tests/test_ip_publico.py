@@ -0,0 +1,72 @@
+import http.server
+import threading
+import time
+import pytest
+from app.ip_publico import ResolvedorIPPublico
+
+
+class _Servico(http.server.BaseHTTPRequestHandler):
+    """Substituto local do api.ipify.org"""
+
+    respostas = []
+    chamadas = 0
+    atraso = 0.0
+
+    def do_GET(self):
+        type(self).chamadas += 1
+        time.sleep(self.atraso)
+        status, corpo = self.respostas[0] if len(self.respostas) == 1 else self.respostas.pop(0)
+        self.send_response(status)
+        self.end_headers()
+        self.wfile.write(corpo.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servico():
+    _Servico.respostas = [(200, '203.0.113.7\n')]
+    _Servico.chamadas = 0
+    _Servico.atraso = 0.0
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Servico)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield _Servico, f'http://127.0.0.1:{servidor.server_address[1]}/'
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_resolve_e_serve_do_cache(servico):
+    stub, url = servico
+    resolvedor = ResolvedorIPPublico(url, ttl=300.0)
+    assert resolvedor.obter() == 'N/A'
+    assert resolvedor.atualizar() == '203.0.113.7'
+    assert resolvedor.obter() == '203.0.113.7'
+    assert stub.chamadas == 1
+
+
+def test_falha_mantem_o_ultimo_ip_e_fica_em_cache(servico):
+    stub, url = servico
+    resolvedor = ResolvedorIPPublico(url, ttl=0.0, ttl_falha=300.0)
+    resolvedor.atualizar()
+    stub.respostas = [(503, 'indisponivel')]
+    resolvedor.atualizar()
+    assert resolvedor.obter() == '203.0.113.7'
+    assert '503' in resolvedor.estado()['erro']
+    # Dentro do ttl_falha, obter() não dispara nova consulta
+    resolvedor.obter()
+    assert stub.chamadas == 2
+
+
+def test_atualizacoes_concorrentes_compartilham_uma_consulta(servico):
+    stub, url = servico
+    stub.atraso = 0.3
+    resolvedor = ResolvedorIPPublico(url)
+    threads = [resolvedor.atualizar_em_segundo_plano() for _ in range(20)]
+    for thread in threads:
+        thread.join()
+    assert stub.chamadas == 1
+
+
+def test_url_vazia_desativa_a_consulta():
+    assert ResolvedorIPPublico('').obter() == 'N/A'
@@ -0,0 +1,53 @@
+import pytest
+from app.metricas import ArmazemMetricas, conectar
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    armazem = ArmazemMetricas(str(tmp_path / 'metricas.db'))
+    conn = conectar(armazem.caminho)
+    yield armazem, conn
+    conn.close()
+
+
+def _minuto(conn, ts):
+    return conn.execute('SELECT minimo, maximo, media, amostras FROM metricas_1m WHERE metrica = ? AND ts = ?',
+                        ('cpu@agente', ts)).fetchone()
+
+
+def test_media_ponderada_pelo_tempo_representado(armazem):
+    armazem, conn = armazem
+    for k in range(4):
+        armazem.registrar(1000 + k * 0.25, {'cpu': 90.0}, 0.25)
+    armazem.registrar(1005, {'cpu': 0.0}, 5.0)
+    armazem.gravar(conn)
+    armazem.compactar(conn, agora=1200)
+    media, = conn.execute('SELECT media FROM metricas_1m WHERE metrica = ?', ('cpu',)).fetchone()
+    assert media == pytest.approx(15.0)
+
+
+def test_amostra_atrasada_refaz_o_bucket_ja_compactado(armazem):
+    armazem, conn = armazem
+    armazem.registrar(60_000, {'cpu@agente': 10.0})
+    armazem.gravar(conn)
+    armazem.compactar(conn, agora=60_200)
+    assert _minuto(conn, 60_000) == (10.0, 10.0, 10.0, 1)
+
+    # Lote de um agente que ficou 5 min sem falar com o hub
+    armazem.registrar(60_030, {'cpu@agente': 30.0})
+    armazem.gravar(conn)
+    armazem.compactar(conn, agora=60_400)
+    assert _minuto(conn, 60_000) == (10.0, 30.0, 20.0, 2)
+
+
+def test_amostra_alem_da_retencao_nao_apaga_o_rollup(armazem):
+    armazem, conn = armazem
+    armazem.retencao[1] = 600
+    armazem.registrar(60_000, {'cpu@agente': 10.0})
+    armazem.gravar(conn)
+    armazem.compactar(conn, agora=60_200)
+    # Chega depois que os segundos desse minuto já saíram da retenção de 1 s
+    armazem.registrar(60_030, {'cpu@agente': 30.0})
+    armazem.gravar(conn)
+    armazem.compactar(conn, agora=61_000)
+    assert _minuto(conn, 60_000) == (10.0, 10.0, 10.0, 1)
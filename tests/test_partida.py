@@ -0,0 +1,13 @@
+import os
+import pytest
+from app.partida import MODOS, ORCAMENTO_PADRAO, medir_partida
+
+# Máquinas de CI lentas podem esticar os orçamentos (ex.: 2 dobra todos)
+FATOR = float(os.environ.get('TASKMONITOR_FATOR_PARTIDA', '1'))
+
+
+@pytest.mark.parametrize('modo', list(MODOS))
+def test_partida_dentro_do_orcamento(modo):
+    medida = medir_partida(modo, repeticoes=3)
+    assert medida['proibidos_carregados'] == [], f"{modo} importou {medida['proibidos_carregados']}"
+    assert medida['segundos'] <= ORCAMENTO_PADRAO[modo] * FATOR
@@ -0,0 +1,57 @@
+import threading
+from app.sensores import GerenciadorSensores, SensorHwmon
+
+
+def _chip(raiz, pasta, nome, sensores):
+    """Cria um hwmonN falso: {'temp1': (rotulo, milligraus), ...}"""
+    caminho = raiz / pasta
+    caminho.mkdir()
+    (caminho / 'name').write_text(nome + '\n')
+    for sensor, (rotulo, valor) in sensores.items():
+        (caminho / f'{sensor}_input').write_text(f'{valor}\n')
+        if rotulo is not None:
+            (caminho / f'{sensor}_label').write_text(rotulo + '\n')
+
+
+def test_hwmon_prefere_package_do_coretemp(tmp_path):
+    _chip(tmp_path, 'hwmon0', 'nvme', {'temp1': ('Composite', 38850)})
+    _chip(tmp_path, 'hwmon1', 'coretemp', {'temp1': ('Core 0', 52000), 'temp2': ('Package id 0', 47500)})
+    sensor = SensorHwmon(raiz=str(tmp_path))
+    assert sensor.temperatura_cpu() == 47.5
+    assert sensor.estado()['conectado']
+
+
+def test_hwmon_sem_rotulo_usa_a_maior_leitura(tmp_path):
+    _chip(tmp_path, 'hwmon0', 'k10temp', {'temp1': (None, 61250), 'temp3': (None, 58000)})
+    assert SensorHwmon(raiz=str(tmp_path)).temperatura_cpu() == 61.2
+
+
+def test_hwmon_sem_chip_de_cpu_fica_em_cache_negativo(tmp_path):
+    _chip(tmp_path, 'hwmon0', 'nvme', {'temp1': ('Composite', 38850)})
+    sensor = SensorHwmon(raiz=str(tmp_path), backoff_inicial=60.0)
+    assert sensor.temperatura_cpu() is None
+    # O chip aparece, mas a nova sonda só acontece depois do backoff
+    _chip(tmp_path, 'hwmon1', 'coretemp', {'temp1': ('Package id 0', 40000)})
+    assert sensor.temperatura_cpu() is None
+    assert 'nenhum sensor de CPU' in sensor.estado()['ultimo_erro']
+    assert sensor.estado()['nova_tentativa_em'] > 0
+
+
+def test_gerenciador_so_le_na_thread_que_sondou(tmp_path):
+    _chip(tmp_path, 'hwmon0', 'coretemp', {'temp1': ('Package id 0', 45000)})
+    gerenciador = GerenciadorSensores([SensorHwmon(raiz=str(tmp_path))])
+
+    def em_outra_thread():
+        resultado = []
+        thread = threading.Thread(target=lambda: resultado.append(gerenciador.temperatura_cpu()))
+        thread.start()
+        thread.join()
+        return resultado[0]
+
+    gerenciador.sondar()
+    assert em_outra_thread() == 'N/A'
+    assert gerenciador.temperatura_cpu() == 45.0
+    (tmp_path / 'hwmon0' / 'temp1_input').write_text('70000\n')
+    # Outras threads recebem a última leitura da thread dona, sem tocar nos sensores
+    assert em_outra_thread() == 45.0
+    assert gerenciador.temperatura_cpu() == 70.0
@@ -0,0 +1,64 @@
+import pytest
+from werkzeug.test import EnvironBuilder
+from app import create_app
+from app.stream import get_difusor
+
+
+@pytest.fixture
+def app(tmp_path):
+    return create_app({
+        'TESTING': True,
+        'COLETOR_ATIVO': False,
+        'METRICAS_ATIVO': False,
+        'BACKUP_AGENDA': None,
+        'IP_PUBLICO_URL': None,
+        'METRICAS_DB': str(tmp_path / 'metricas.db')
+    })
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+def test_vaga_do_stream_volta_se_o_cliente_cai_antes_do_primeiro_quadro(app):
+    difusor = get_difusor()
+    antes = difusor.assinantes()
+    # WSGI direto: o cliente de teste do Werkzeug já consome o primeiro quadro
+    status = []
+    corpo = app(EnvironBuilder(path='/stream').get_environ(), lambda s, h, e=None: status.append(s))
+    assert status == ['200 OK']
+    assert difusor.assinantes() == antes + 1
+    # O servidor fecha a resposta sem iterar: o gerador nunca chega a executar
+    corpo.close()
+    assert difusor.assinantes() == antes
+
+
+def test_vaga_do_stream_volta_depois_de_receber_quadros(cliente):
+    difusor = get_difusor()
+    antes = difusor.assinantes()
+    resposta = cliente.get('/stream', buffered=False)
+    assert next(resposta.response) == b'retry: 3000\n\n'
+    resposta.close()
+    assert difusor.assinantes() == antes
+
+
+def test_stream_recusa_alem_do_limite(cliente, monkeypatch):
+    difusor = get_difusor()
+    monkeypatch.setattr(difusor, 'max_assinantes', difusor.assinantes())
+    assert cliente.get('/stream').status_code == 503
+
+
+def test_limite_stream_deixa_threads_livres():
+    from app.cli import limite_stream
+    assert limite_stream(8) == 4
+    assert limite_stream(3) == 1
+    assert limite_stream(2) == 0
+    assert all(threads - limite_stream(threads) >= 2 for threads in range(2, 64))
+    assert limite_stream(1) == 0
+
+
+def test_create_app_aplica_o_limite_do_stream():
+    create_app({'COLETOR_ATIVO': False, 'METRICAS_ATIVO': False, 'BACKUP_AGENDA': None,
+                'IP_PUBLICO_URL': None, 'STREAM_MAX_ASSINANTES': 4})
+    assert get_difusor().max_assinantes == 4
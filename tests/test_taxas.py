@@ -0,0 +1,82 @@
+from app.taxas import LIMITE_32_BITS, CalculadoraTaxas, delta_contador, discos_inteiros, taxas_dispositivos
+
+
+def test_delta_contador_crescente():
+    assert delta_contador(1500, 1000) == 500
+    assert delta_contador(1000, 1000) == 0
+
+
+def test_delta_contador_estouro_32_bits():
+    assert delta_contador(100, LIMITE_32_BITS - 50) == 150
+
+
+def test_delta_contador_reset_descarta_a_taxa():
+    # Contador de 64 bits que voltou a zero: interface recriada, não estouro
+    assert delta_contador(10, LIMITE_32_BITS * 3) is None
+
+
+def test_taxas_dispositivos_ignora_reset_e_hot_plug():
+    anteriores = {'eth0': {'bytes_enviados': 1000, 'erros': 5 * LIMITE_32_BITS}}
+    atuais = {
+        'eth0': {'bytes_enviados': 3000, 'erros': 0},
+        'wlan0': {'bytes_enviados': 42}
+    }
+    taxas = taxas_dispositivos(atuais, anteriores, 2.0)
+    assert taxas == {'eth0': {'bytes_enviados_s': 1000.0}}
+
+
+def _amostra(enviados, recebidos, lidos):
+    return {
+        'rede': {'bytes_enviados': enviados, 'bytes_recebidos': recebidos},
+        'interfaces': {'eth0': {'bytes_enviados': enviados, 'bytes_recebidos': recebidos}},
+        'discos_io': {'sda': {'bytes_lidos': lidos, 'leituras': lidos // 512, 'escritas': 0}}
+    }
+
+
+def test_calculadora_usa_o_intervalo_monotonico():
+    calculadora = CalculadoraTaxas()
+    primeira = calculadora.atualizar(_amostra(0, 0, 0), agora=10.0)
+    assert primeira['intervalo'] is None and primeira['rede_total'] == {}
+
+    taxas = calculadora.atualizar(_amostra(4096, 2048, 1024 * 512), agora=10.5)
+    assert taxas['intervalo'] == 0.5
+    assert taxas['rede_total'] == {'bytes_enviados_s': 8192.0, 'bytes_recebidos_s': 4096.0}
+    assert taxas['rede']['eth0']['bytes_enviados_s'] == 8192.0
+    assert taxas['discos']['sda']['bytes_lidos_s'] == 1024 * 1024
+    assert taxas['discos']['sda']['iops'] == 2048.0
+
+
+def test_calculadora_sem_tempo_decorrido_nao_divide_por_zero():
+    calculadora = CalculadoraTaxas()
+    calculadora.atualizar(_amostra(0, 0, 0), agora=5.0)
+    assert calculadora.atualizar(_amostra(10, 10, 0), agora=5.0)['intervalo'] is None
+
+
+NOMES_DISCOS = ['loop1', 'loop10', 'dm-1', 'dm-10', 'PhysicalDrive1', 'PhysicalDrive12',
+                'sda', 'sda1', 'nvme0n1', 'nvme0n1p1', 'mmcblk0', 'mmcblk0p2', 'xvdb', 'xvdb3']
+
+
+def test_discos_inteiros_pela_nomenclatura(tmp_path):
+    discos = {nome: {} for nome in NOMES_DISCOS}
+    inteiros = discos_inteiros(discos, raiz_sysfs=str(tmp_path / 'inexistente'))
+    assert sorted(inteiros) == sorted(['loop1', 'loop10', 'dm-1', 'dm-10', 'PhysicalDrive1',
+                                       'PhysicalDrive12', 'sda', 'nvme0n1', 'mmcblk0', 'xvdb'])
+
+
+def test_discos_inteiros_mantem_particao_sem_o_disco():
+    assert list(discos_inteiros({'sdb1': {}}, raiz_sysfs='/inexistente')) == ['sdb1']
+
+
+def test_discos_inteiros_pelo_sysfs(tmp_path):
+    # /sys/class/block/<dev> aponta para o dispositivo; partições ficam dentro do disco
+    dispositivos = tmp_path / 'devices'
+    (dispositivos / 'md0').mkdir(parents=True)
+    (dispositivos / 'md0' / 'md0p1').mkdir()
+    (dispositivos / 'md0' / 'md0p1' / 'partition').write_text('1\n')
+    (dispositivos / 'loop10').mkdir()
+    blocos = tmp_path / 'block'
+    blocos.mkdir()
+    for nome, alvo in (('md0', 'md0'), ('md0p1', 'md0/md0p1'), ('loop10', 'loop10')):
+        (blocos / nome).symlink_to(dispositivos / alvo)
+    discos = {'md0': {}, 'md0p1': {}, 'loop10': {}, 'loop1': {}}
+    assert sorted(discos_inteiros(discos, raiz_sysfs=str(blocos))) == ['loop1', 'loop10', 'md0']